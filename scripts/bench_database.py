@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+数据库写入/读取基准测试
+对比旧的"每次操作新建连接 + 回滚日志"模式与持久连接 + WAL 模式
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import Config
+from src.utils.database import DatabaseManager
+
+
+INSERT_SQL = '''
+    INSERT INTO generation_logs
+    (timestamp, text_length, voice, format, speed, mode, duration, audio_size, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+READ_SQL = 'SELECT * FROM generation_logs ORDER BY id DESC LIMIT 50'
+
+
+def sample_row(i: int) -> tuple:
+    return (datetime.now().isoformat(), 100 + i % 300, 'zh-CN-XiaoxiaoNeural', 'mp3', 1.0, '普通', 1.5, 20480, 'success')
+
+
+class LegacyBackend:
+    """旧实现：每次操作新建连接，默认回滚日志与 synchronous=FULL"""
+
+    name = "legacy (connect per op, rollback journal)"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        manager = make_manager(db_path, journal_mode='DELETE', synchronous='FULL')
+        manager.close()
+
+    def insert(self, i: int) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(INSERT_SQL, sample_row(i))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def read(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(READ_SQL).fetchall()
+        finally:
+            conn.close()
+
+
+class TunedBackend:
+    """新实现：线程内持久连接 + WAL + synchronous=NORMAL"""
+
+    name = "tuned (persistent, WAL, synchronous=NORMAL)"
+
+    def __init__(self, db_path: str):
+        self.manager = make_manager(db_path)
+
+    def insert(self, i: int) -> None:
+        with self.manager.get_connection() as conn:
+            conn.execute(INSERT_SQL, sample_row(i))
+            conn.commit()
+
+    def read(self) -> None:
+        with self.manager.get_connection() as conn:
+            conn.execute(READ_SQL).fetchall()
+
+
+def make_manager(db_path: str, **overrides) -> DatabaseManager:
+    """绕过单例创建独立的数据库管理器"""
+    config = Config()
+    config.update({
+        'DB_PATH': db_path,
+        'DB_JOURNAL_MODE': overrides.get('journal_mode', 'WAL'),
+        'DB_SYNCHRONOUS': overrides.get('synchronous', 'NORMAL'),
+    })
+    DatabaseManager._instance = None
+    manager = DatabaseManager(config)
+    DatabaseManager._instance = None
+    return manager
+
+
+def run_sequential(backend, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        backend.insert(i)
+    return count / (time.perf_counter() - start)
+
+
+def run_concurrent(backend, count: int, writers: int) -> dict:
+    """多个写线程并发写入，同时一个读线程测量读取延迟"""
+    per_writer = count // writers
+    done = threading.Event()
+    read_latencies = []
+
+    def writer(offset: int):
+        for i in range(per_writer):
+            backend.insert(offset + i)
+
+    def reader():
+        while not done.is_set():
+            start = time.perf_counter()
+            backend.read()
+            read_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(w * per_writer,)) for w in range(writers)]
+    reader_thread = threading.Thread(target=reader)
+
+    start = time.perf_counter()
+    reader_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    reader_thread.join()
+
+    latencies = sorted(read_latencies) or [0.0]
+    return {
+        "inserts_per_sec": per_writer * writers / elapsed,
+        "reads": len(read_latencies),
+        "read_p50_ms": statistics.median(latencies) * 1000,
+        "read_p95_ms": latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库基准测试")
+    parser.add_argument('--count', type=int, default=2000, help='每个场景的插入次数')
+    parser.add_argument('--writers', type=int, default=4, help='并发写线程数')
+    args = parser.parse_args()
+
+    print(f"数据库基准测试 | 插入次数: {args.count} | 并发写线程: {args.writers}")
+    print("=" * 72)
+
+    for backend_class in (LegacyBackend, TunedBackend):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'bench.db')
+            backend = backend_class(db_path)
+
+            sequential = run_sequential(backend, args.count)
+            concurrent = run_concurrent(backend, args.count, args.writers)
+
+            print(backend.name)
+            print(f"  顺序插入:   {sequential:10.0f} 次/秒")
+            print(f"  并发插入:   {concurrent['inserts_per_sec']:10.0f} 次/秒")
+            print(f"  并发读延迟: p50 {concurrent['read_p50_ms']:.2f}ms | p95 {concurrent['read_p95_ms']:.2f}ms"
+                  f" | 读取次数 {concurrent['reads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+generation_logs 结构基准测试
+在大表上对比 v1（ISO文本时间戳、无索引）与当前结构（毫秒时间戳、索引、按月分区）的查询耗时
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import Config
+from src.utils.database import DatabaseManager, days_ago_ms
+
+
+V1_SCHEMA = '''
+    CREATE TABLE generation_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        text_length INTEGER NOT NULL,
+        voice TEXT NOT NULL,
+        format TEXT NOT NULL,
+        speed REAL DEFAULT 1.0,
+        mode TEXT NOT NULL,
+        duration REAL,
+        audio_size INTEGER,
+        status TEXT DEFAULT 'success',
+        error_message TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        request_id TEXT
+    )
+'''
+
+# 用递归CTE在SQLite内部生成数据，时间戳按ID递增、均匀分布在最近一年
+FILL_SQL = '''
+    WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < :rows)
+    INSERT INTO generation_logs (timestamp, text_length, voice, format, speed, mode,
+                                 duration, audio_size, status, error_message)
+    SELECT
+        strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime', '-365 days',
+                 '+' || (x * 31536000 / :rows) || ' seconds'),
+        50 + abs(random()) % 2000,
+        'zh-CN-Voice' || (abs(random()) % 50) || 'Neural',
+        'mp3',
+        1.0,
+        CASE WHEN abs(random()) % 4 = 0 THEN '流式' ELSE '普通' END,
+        0.5 + (abs(random()) % 5000) / 1000.0,
+        10000 + abs(random()) % 500000,
+        CASE WHEN abs(random()) % 20 = 0 THEN 'error' ELSE 'success' END,
+        NULL
+    FROM seq
+'''
+
+# (名称, v1查询, v2查询, 参数生成函数)
+QUERIES = [
+    (
+        "最近30天每日统计",
+        '''SELECT DATE(timestamp) as date, COUNT(*) as count, SUM(text_length) as chars
+           FROM generation_logs WHERE status = 'success'
+           GROUP BY DATE(timestamp) ORDER BY date DESC LIMIT 30''',
+        '''SELECT DATE(ts_ms / 1000, 'unixepoch', 'localtime') as date, COUNT(*) as count, SUM(text_length) as chars
+           FROM generation_logs WHERE status = 'success' AND ts_ms >= ?
+           GROUP BY date ORDER BY date DESC''',
+        lambda: (days_ago_ms(29, align_to_day=True),),
+    ),
+    (
+        "历史页每日统计（7天）",
+        '''SELECT DATE(timestamp) as date, COUNT(*) as total_count, SUM(text_length) as total_chars
+           FROM generation_logs WHERE DATE(timestamp) >= DATE('now', '-7 days')
+           GROUP BY DATE(timestamp) ORDER BY date DESC''',
+        '''SELECT DATE(ts_ms / 1000, 'unixepoch', 'localtime') as date, COUNT(*) as total_count,
+                  SUM(text_length) as total_chars
+           FROM generation_logs WHERE ts_ms >= ?
+           GROUP BY date ORDER BY date DESC''',
+        lambda: (days_ago_ms(7, align_to_day=True),),
+    ),
+    (
+        "最近50条记录",
+        "SELECT * FROM generation_logs ORDER BY timestamp DESC LIMIT 50",
+        "SELECT * FROM generation_logs ORDER BY ts_ms DESC LIMIT 50",
+        lambda: (),
+    ),
+    (
+        "单个语音最近7天",
+        '''SELECT COUNT(*), AVG(duration) FROM generation_logs
+           WHERE voice = 'zh-CN-Voice7Neural' AND timestamp >= datetime('now', '-7 days')''',
+        '''SELECT COUNT(*), AVG(duration) FROM generation_logs
+           WHERE voice = 'zh-CN-Voice7Neural' AND ts_ms >= ?''',
+        lambda: (days_ago_ms(7),),
+    ),
+    (
+        "清理范围（30天前，仅计数）",
+        "SELECT COUNT(*) FROM generation_logs WHERE timestamp < datetime('now', '-30 days')",
+        "SELECT COUNT(*) FROM generation_logs WHERE ts_ms < ?",
+        lambda: (days_ago_ms(30),),
+    ),
+    (
+        "错误记录最近时间",
+        "SELECT COUNT(*), MAX(timestamp) FROM generation_logs WHERE status = 'error'",
+        "SELECT COUNT(*), MAX(ts_ms) FROM generation_logs WHERE status = 'error'",
+        lambda: (),
+    ),
+]
+
+
+def timed(conn: sqlite3.Connection, sql: str, params: tuple, repeat: int) -> float:
+    """执行查询 repeat 次，返回耗时中位数（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple) -> str:
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def build_v1_database(db_path: str, rows: int) -> float:
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute(V1_SCHEMA)
+    start = time.perf_counter()
+    conn.execute(FILL_SQL, {"rows": rows})
+    conn.execute('PRAGMA user_version = 1')
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def migrate(db_path: str) -> float:
+    """用 DatabaseManager 把数据库升级到最新结构"""
+    config = Config()
+    config.update({'DB_PATH': db_path})
+    DatabaseManager._instance = None
+    start = time.perf_counter()
+    manager = DatabaseManager(config)
+    elapsed = time.perf_counter() - start
+    manager.close()
+    DatabaseManager._instance = None
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generation_logs 结构基准测试")
+    parser.add_argument('--rows', type=int, default=10_000_000, help='生成的记录数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个查询的重复次数')
+    parser.add_argument('--db', help='数据库文件路径（默认使用临时目录）')
+    parser.add_argument('--plans', action='store_true', help='输出查询计划')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_path = args.db
+    if not db_path:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, 'bench_schema.db')
+
+    try:
+        print(f"生成 {args.rows:,} 条记录 ...")
+        print(f"  耗时 {build_v1_database(db_path, args.rows):.1f}s")
+
+        conn = sqlite3.connect(db_path)
+        legacy = []
+        for name, v1_sql, _, params in QUERIES:
+            legacy.append((timed(conn, v1_sql, (), args.repeat), query_plan(conn, v1_sql, ())))
+        conn.close()
+
+        print("迁移到最新结构（回填 ts_ms 并建立索引）...")
+        print(f"  耗时 {migrate(db_path):.1f}s")
+
+        conn = sqlite3.connect(db_path)
+        print("=" * 72)
+        print(f"{'查询':<24}{'v1 (ms)':>12}{'当前 (ms)':>12}{'加速':>10}")
+        for (name, _, v2_sql, params), (v1_ms, v1_plan) in zip(QUERIES, legacy):
+            values = params()
+            v2_ms = timed(conn, v2_sql, values, args.repeat)
+            print(f"{name:<24}{v1_ms:>12.1f}{v2_ms:>12.1f}{v1_ms / max(v2_ms, 1e-6):>9.1f}x")
+            if args.plans:
+                print(f"    v1: {v1_plan}")
+                print(f"    v2: {query_plan(conn, v2_sql, values)}")
+        conn.close()
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
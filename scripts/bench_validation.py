@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+语音校验基准测试
+对比旧的列表查找（constants.VOICES）与语音目录的 frozenset 查找
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.constants import VOICES
+from src.models.voice_catalog import get_voice_catalog
+from src.utils.validators import TTSValidator, RequestValidator
+
+
+def timed(func, iterations: int, repeat: int) -> float:
+    """执行 func iterations 次，重复 repeat 轮，返回单次耗时中位数（纳秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        samples.append((time.perf_counter() - start) / iterations * 1e9)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音校验基准测试")
+    parser.add_argument('--iterations', type=int, default=200_000, help='每轮执行次数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复轮数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = get_voice_catalog()
+    load_ms = (time.perf_counter() - start) * 1000
+    valid_names = catalog.valid_names
+    print(f"语音目录: {len(catalog)} 个语音，{len(valid_names)} 个合法名称 | 加载耗时 {load_ms:.1f}ms")
+    print(f"旧列表: {len(VOICES)} 个名称（目录中另有 {len(valid_names - set(VOICES))} 个语音会被旧校验拒绝）")
+
+    # 列表查找的耗时取决于位置：首个、末尾、不存在
+    cases = [
+        ("列表首个语音", VOICES[0]),
+        ("列表末尾语音", VOICES[-1]),
+        ("不存在的语音", "xx-XX-UnknownNeural"),
+    ]
+
+    print("=" * 72)
+    print(f"{'场景':<20}{'list (ns)':>14}{'frozenset (ns)':>18}{'加速':>10}")
+    for name, voice in cases:
+        list_ns = timed(lambda: voice in VOICES, args.iterations, args.repeat)
+        set_ns = timed(lambda: voice in valid_names, args.iterations, args.repeat)
+        print(f"{name:<20}{list_ns:>14.1f}{set_ns:>18.1f}{list_ns / max(set_ns, 1e-9):>9.1f}x")
+
+    print("=" * 72)
+    voice = VOICES[-1]
+    print(f"TTSValidator.validate_voice: {timed(lambda: TTSValidator.validate_voice(voice), args.iterations, args.repeat):.1f} ns")
+
+    validator = RequestValidator()
+    data = {'input': '你好，世界。' * 20, 'voice': voice, 'response_format': 'mp3',
+            'model': 'tts-1', 'speed': 1.0, 'api_key': 'sk-test'}
+    iterations = max(args.iterations // 10, 1)
+    print(f"RequestValidator.validate_tts_request: {timed(lambda: validator.validate_tts_request(data), iterations, args.repeat):.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
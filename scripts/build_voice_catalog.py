@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+生成预编译语音目录
+为 src/config 下的语音JSON生成同名 .bin 文件，并对比两种格式的加载耗时
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.models.voice_catalog import VoiceCatalog, VOICE_FILES
+from src.models.catalog_format import compiled_path
+
+
+def timed(func, repeat: int) -> float:
+    """执行 func repeat 次，返回耗时中位数（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成预编译语音目录")
+    parser.add_argument('files', nargs='*', help='语音JSON文件，默认为 src/config 下的语音文件')
+    parser.add_argument('--bench', action='store_true', help='对比JSON与预编译文件的加载耗时')
+    parser.add_argument('--repeat', type=int, default=20, help='对比时的重复次数')
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.files or VOICE_FILES:
+        if not Path(path).exists():
+            continue
+        try:
+            result = VoiceCatalog.compile(path)
+        except Exception as e:
+            print(f"❌ 生成失败: {path} | {e}")
+            failed = True
+            continue
+
+        json_size = Path(path).stat().st_size
+        print(f"✅ {result['path']}: {result['voices']} 个语音，"
+              f"{result['size'] / 1024:.1f}KB（JSON {json_size / 1024:.1f}KB）")
+
+        if args.bench:
+            bin_path = Path(compiled_path(path))
+            bin_ms = timed(lambda: VoiceCatalog.load([path]), args.repeat)
+            # 临时移走预编译文件，测量解析JSON的耗时
+            moved = bin_path.with_suffix('.bin.bench')
+            bin_path.rename(moved)
+            try:
+                json_ms = timed(lambda: VoiceCatalog.load([path]), args.repeat)
+            finally:
+                moved.rename(bin_path)
+            print(f"   加载耗时: JSON {json_ms:.2f}ms | 预编译 {bin_ms:.2f}ms")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,10 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Any
 
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
 try:
     import edge_tts
 except ImportError:
@@ -172,15 +176,23 @@ class EdgeVoiceFetcher:
                     "generated_at": asyncio.get_event_loop().time(),
                     "description": "Complete Edge-TTS voices list generated automatically"
                 },
-                "voices_by_language": self.grouped_voices,
+                # 与运行时读取的格式一致（按语言分组的 voices）
+                "voices": self.grouped_voices,
                 "all_voices": self.voices
             }
             
-            # 写入文件
-            with open(output_path, 'w', encoding='utf-8') as f:
+            # 先写临时文件再原子替换，运行中的服务不会读到写了一半的文件
+            tmp_path = output_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(output_data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, output_path)
+            
+            # 同时生成预编译目录，运行时无需再解析JSON
+            from src.models.voice_catalog import VoiceCatalog
+            compiled = VoiceCatalog.compile(output_path)
             
             print(f"语音列表已保存到: {output_path}")
+            print(f"预编译目录已保存到: {compiled['path']}")
             print(f"总计: {len(self.voices)} 个语音，{len(self.grouped_voices)} 种语言")
             return True
             
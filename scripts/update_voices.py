@@ -91,12 +91,20 @@ async def update_voices():
             "voices": grouped_voices
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # 先写临时文件再原子替换，运行中的服务不会读到写了一半的文件
+        tmp_file = output_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(output_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, output_file)
+        
+        # 同时生成预编译目录，运行时无需再解析JSON
+        from src.models.voice_catalog import VoiceCatalog
+        compiled = VoiceCatalog.compile(str(output_file))
         
         print(f"✅ 成功更新语音列表!")
         print(f"📊 总计: {len(voices)} 个语音，{len(grouped_voices)} 种语言")
         print(f"📁 保存位置: {output_file}")
+        print(f"📦 预编译目录: {compiled['path']} ({compiled['size'] / 1024:.1f}KB)")
         
         # 显示语言统计
         print("\n📈 语言统计:")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+预生成语音预览
+为语音目录中的全部语音生成默认文本的预览音频（已缓存的跳过），
+然后打包成单个预览包文件，供各 worker mmap 共享
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import get_config
+from src.models.voice_catalog import get_voice_catalog
+from src.services.tts_service import TTSService
+from src.services.voice_service import VoiceService
+from src.utils.database import DatabaseManager
+from src.utils.helpers import get_language_from_voice, get_preview_text
+from src.utils.preview_cache import start_preview_cache, preview_key, write_preview_pack
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预生成语音预览")
+    parser.add_argument('--api-key', default=os.getenv('DEFAULT_API_KEY', ''), help='上游 API Key，默认取 DEFAULT_API_KEY')
+    parser.add_argument('--workers', type=int, default=4, help='并发生成数')
+    parser.add_argument('--pack-only', action='store_true', help='不调用上游，只把已缓存的预览打包')
+    args = parser.parse_args()
+
+    config = get_config(os.getenv('FLASK_ENV', 'production'))
+    cache = start_preview_cache(config)
+    if not cache.directory or not cache.pack_path:
+        print("❌ 需要配置 PREVIEW_CACHE_DIR 与 PREVIEW_PACK_PATH")
+        sys.exit(1)
+
+    voice_service = VoiceService(config, TTSService(config, DatabaseManager(config)))
+    voices = [voice.name for voice in get_voice_catalog().voices]
+    print(f"语音目录: {len(voices)} 个语音 | 缓存目录: {cache.directory}")
+
+    start = time.time()
+    failed = []
+    if not args.pack_only:
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            futures = {executor.submit(voice_service.get_preview_audio, name, args.api_key): name for name in voices}
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                if not result["success"]:
+                    failed.append((futures[future], result["error"]))
+                if done % 50 == 0 or done == len(voices):
+                    print(f"  {done}/{len(voices)} | 失败 {len(failed)} | {time.time() - start:.1f}s")
+
+    # 只打包当前目录中语音的预览
+    entries = []
+    for name in voices:
+        text = get_preview_text(get_language_from_voice(name))
+        audio = cache.get(name, text)
+        if audio is not None:
+            entries.append((preview_key(name, text), bytes(audio)))
+    result = write_preview_pack(entries, cache.pack_path)
+
+    print(f"✅ 预览包: {cache.pack_path} | {result['entries']} 个预览，{result['size'] / 1024 / 1024:.1f}MB")
+    for name, error in failed[:10]:
+        print(f"  ❌ {name}: {error}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
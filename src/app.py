@@ -2,7 +2,8 @@
 Flask应用工厂
 """
 
-from flask import Flask
+import time
+from flask import Flask, request, g
 from typing import Optional
 
 from .config.settings import Config
@@ -32,6 +33,36 @@ def create_app(config: Optional[Config] = None) -> Flask:
     if config:
         db_manager = DatabaseManager(config)
         app.config['DB_MANAGER'] = db_manager
+        
+        # 生成日志交给后台线程批量写入
+        from .utils.log_writer import start_log_writer
+        log_writer = start_log_writer(db_manager, config)
+        if log_writer:
+            # 每批日志写入后统计缓存失效
+            log_writer.add_flush_listener(lambda batch: db_manager.stats_cache.invalidate())
+        
+        # 日志分区预建、过期分区删除与增量回收
+        from .utils.maintenance import start_maintenance
+        start_maintenance(db_manager, config)
+        
+        # 用历史生成记录预热队列耗时估计
+        from .utils.queue_manager import get_queue_manager
+        get_queue_manager().estimator.bootstrap_from_db(db_manager)
+    
+    # 启动常驻采样分析器
+    if config:
+        from .utils.sampler import start_sampler
+        start_sampler(config)
+    
+    # 监视语音文件，变化时后台重新加载语音目录
+    if config:
+        from .models.voice_catalog import start_catalog_watcher
+        start_catalog_watcher(config)
+    
+    # 语音预览持久缓存
+    if config:
+        from .utils.preview_cache import start_preview_cache
+        start_preview_cache(config)
     
     # 注册蓝图
     register_blueprints(app)
@@ -42,6 +73,12 @@ def create_app(config: Optional[Config] = None) -> Flask:
     # 注册上下文处理器
     register_context_processors(app)
     
+    # 注册请求指标
+    register_metrics(app)
+    
+    # 注册请求追踪
+    register_tracing(app)
+    
     return app
 
 
@@ -50,10 +87,14 @@ def register_blueprints(app: Flask) -> None:
     from .controllers.main_controller import main_bp
     from .controllers.api_controller import api_bp
     from .controllers.voice_controller import voice_bp
+    from .controllers.metrics_controller import metrics_bp
+    from .controllers.admin_controller import admin_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(voice_bp, url_prefix='/voice')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
 
 def register_error_handlers(app: Flask) -> None:
@@ -81,3 +122,66 @@ def register_context_processors(app: Flask) -> None:
                 'app_version': '2.0.0'
             }
         return {}
+
+
+def register_metrics(app: Flask) -> None:
+    """注册HTTP请求指标"""
+    from .utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_start_time = time.time()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        # 使用路由规则作为标签，避免路径参数导致标签基数爆炸
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+        
+        start_time = g.get('request_start_time')
+        if start_time is not None:
+            HTTP_REQUEST_SECONDS.labels(endpoint).observe(time.time() - start_time)
+        return response
+
+
+def register_tracing(app: Flask) -> None:
+    """注册请求追踪，为每个请求分配请求ID"""
+    from .utils.tracing import Trace, finish_trace
+    from .utils.admin import is_admin_request
+    from .utils.profiling import RequestProfiler
+    
+    def start_profiling(trace):
+        config = app.config.get('VOICEFORGE_CONFIG')
+        if not is_admin_request(request, config):
+            return
+        trace.profiler = RequestProfiler(trace.request_id, config.get('PROFILE_DIR', 'profiles'))
+        trace.profiler.start()
+    
+    @app.before_request
+    def start_trace():
+        g.trace = Trace(
+            name='http.request',
+            client_request_id=request.headers.get('X-Request-Id'),
+            method=request.method,
+            path=request.path
+        )
+        
+        # 管理员可通过请求头或查询参数对单个请求开启性能分析
+        if request.headers.get('X-Profile') or request.args.get('profile'):
+            start_profiling(g.trace)
+    
+    @app.after_request
+    def attach_request_id(response):
+        trace = g.get('trace')
+        if trace is not None:
+            response.headers['X-Request-Id'] = trace.request_id
+            if trace.client_request_id:
+                response.headers['X-Client-Request-Id'] = trace.client_request_id
+            if trace.profiler is not None:
+                response.headers['X-Profile-Output'] = f"{trace.request_id}.prof"
+            trace.root.attributes['status'] = response.status_code
+            # 流式响应在数据发送完毕后由控制器结束追踪
+            if not g.get('trace_deferred'):
+                config = app.config.get('VOICEFORGE_CONFIG')
+                finish_trace(trace, config.get('SLOW_REQUEST_THRESHOLD') if config else None)
+        return response
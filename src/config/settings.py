@@ -26,6 +26,26 @@ class Config:
             
             # 数据库配置
             'DB_PATH': os.getenv('DB_PATH', 'tts_stats.db'),
+            'DB_JOURNAL_MODE': os.getenv('DB_JOURNAL_MODE', 'WAL'),
+            'DB_SYNCHRONOUS': os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+            'DB_CACHE_SIZE_KB': int(os.getenv('DB_CACHE_SIZE_KB', '8192')),
+            'DB_BUSY_TIMEOUT_MS': int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000')),
+            
+            # 生成日志异步批量写入
+            'LOG_WRITER_ENABLED': os.getenv('LOG_WRITER_ENABLED', 'True').lower() == 'true',
+            'LOG_WRITER_BATCH_SIZE': int(os.getenv('LOG_WRITER_BATCH_SIZE', '100')),
+            'LOG_WRITER_FLUSH_INTERVAL': float(os.getenv('LOG_WRITER_FLUSH_INTERVAL', '1.0')),
+            'LOG_WRITER_MAX_QUEUE': int(os.getenv('LOG_WRITER_MAX_QUEUE', '10000')),
+            'LOG_WRITER_OVERFLOW': os.getenv('LOG_WRITER_OVERFLOW', 'block'),  # block / drop / sync
+            
+            # 数据库后台维护：日志按月分区保留，0 表示不自动清理
+            'MAINTENANCE_ENABLED': os.getenv('MAINTENANCE_ENABLED', 'True').lower() == 'true',
+            'MAINTENANCE_INTERVAL': int(os.getenv('MAINTENANCE_INTERVAL', '3600')),
+            'LOG_RETENTION_DAYS': int(os.getenv('LOG_RETENTION_DAYS', '0')),
+            'DB_VACUUM_PAGES': int(os.getenv('DB_VACUUM_PAGES', '1000')),
+            
+            # 统计结果缓存时间（秒），有新日志写入时立即失效，0 表示不缓存
+            'STATS_CACHE_TTL': float(os.getenv('STATS_CACHE_TTL', '30')),
             
             # API 配置
             'API_BASE_URL': os.getenv('API_BASE_URL', 'http://117.72.56.34:5050'),
@@ -33,6 +53,16 @@ class Config:
             'VOICES_ENDPOINT': os.getenv('VOICES_ENDPOINT', '/voices'),
             'MODELS_ENDPOINT': os.getenv('MODELS_ENDPOINT', '/models'),
             
+            # /api/voices 浏览器缓存时间（秒），过期后用 ETag 重新验证
+            'VOICES_CACHE_MAX_AGE': int(os.getenv('VOICES_CACHE_MAX_AGE', '300')),
+            # 语音文件变化检查间隔（秒），变化时自动重新加载语音目录，0 表示不检查
+            'VOICES_RELOAD_INTERVAL': float(os.getenv('VOICES_RELOAD_INTERVAL', '10')),
+            # 默认文本语音预览的持久缓存目录与预生成的预览包（scripts/warm_previews.py），为空表示不使用
+            'PREVIEW_CACHE_DIR': os.getenv('PREVIEW_CACHE_DIR', 'data/previews'),
+            'PREVIEW_PACK_PATH': os.getenv('PREVIEW_PACK_PATH', 'data/previews.pack'),
+            # /api/preview/<voice>.mp3 浏览器缓存时间（秒）
+            'PREVIEW_CACHE_MAX_AGE': int(os.getenv('PREVIEW_CACHE_MAX_AGE', '86400')),
+            
             # 默认值配置
             'DEFAULT_API_KEY': os.getenv('DEFAULT_API_KEY', 'your_api_key_here'),
             'DEFAULT_MODEL': os.getenv('DEFAULT_MODEL', 'tts-1'),
@@ -44,6 +74,27 @@ class Config:
             # 日志配置
             'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO'),
             'LOG_FILE': os.getenv('LOG_FILE', 'tts_generation.log'),
+            'LOG_JSON': os.getenv('LOG_JSON', 'False').lower() == 'true',
+            'LOG_MAX_BYTES': int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            'LOG_BACKUP_COUNT': int(os.getenv('LOG_BACKUP_COUNT', '5')),
+            # 逐段日志采样：每个请求每类消息只输出前N条及之后每隔K条
+            'LOG_SAMPLE_FIRST': int(os.getenv('LOG_SAMPLE_FIRST', '3')),
+            'LOG_SAMPLE_EVERY': int(os.getenv('LOG_SAMPLE_EVERY', '100')),
+            
+            # 追踪配置（秒，超过阈值的请求会输出完整片段树，0表示关闭）
+            'SLOW_REQUEST_THRESHOLD': float(os.getenv('SLOW_REQUEST_THRESHOLD', '10')),
+            
+            # 管理员令牌（为空时禁用所有管理功能）
+            'ADMIN_TOKEN': os.getenv('ADMIN_TOKEN', ''),
+            
+            # 按需性能分析输出目录
+            'PROFILE_DIR': os.getenv('PROFILE_DIR', 'profiles'),
+            
+            # 常驻采样分析器配置
+            'SAMPLER_ENABLED': os.getenv('SAMPLER_ENABLED', 'True').lower() == 'true',
+            'SAMPLER_INTERVAL': float(os.getenv('SAMPLER_INTERVAL', '0.01')),
+            'SAMPLER_MAX_STACKS': int(os.getenv('SAMPLER_MAX_STACKS', '5000')),
+            'SAMPLER_MAX_OVERHEAD': float(os.getenv('SAMPLER_MAX_OVERHEAD', '0.01')),
             
             # 静态文件配置
             'STATIC_FOLDER': 'static',
@@ -3,5 +3,7 @@
 from .main_controller import main_bp
 from .api_controller import api_bp
 from .voice_controller import voice_bp
+from .metrics_controller import metrics_bp
+from .admin_controller import admin_bp
 
-__all__ = ['main_bp', 'api_bp', 'voice_bp']
+__all__ = ['main_bp', 'api_bp', 'voice_bp', 'metrics_bp', 'admin_bp']
@@ -0,0 +1,88 @@
+"""管理控制器"""
+
+from flask import Blueprint, request, jsonify, Response
+
+from ..utils.admin import admin_required
+from ..utils.sampler import get_sampler
+from ..utils.maintenance import get_maintenance_worker
+from ..utils.preview_cache import get_preview_cache
+from ..models.voice_catalog import get_voice_catalog, get_catalog_watcher, reload_voice_catalog
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route("/profile/flamegraph", methods=["GET"])
+@admin_required
+def flamegraph():
+    """导出采样分析器的折叠栈（flamegraph.pl / speedscope 格式）"""
+    sampler = get_sampler()
+    mode = request.args.get('mode', 'wall')
+    if mode not in ('wall', 'cpu'):
+        return jsonify({"error": "mode 必须是 wall 或 cpu"}), 400
+    
+    body = sampler.collapsed(mode)
+    if request.args.get('reset'):
+        sampler.reset()
+    
+    return Response(
+        body,
+        mimetype='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'inline; filename="voiceforge-{mode}.folded"'}
+    )
+
+
+@admin_bp.route("/profile/sampler", methods=["GET"])
+@admin_required
+def sampler_status():
+    """获取采样分析器状态"""
+    return jsonify({
+        "success": True,
+        "status": get_sampler().get_status()
+    })
+
+
+@admin_bp.route("/maintenance", methods=["GET", "POST"])
+@admin_required
+def maintenance():
+    """
+    获取数据库维护状态；POST 时立即触发一轮维护
+    
+    POST {"action": "enable_incremental_vacuum"} 为已有数据库启用增量回收
+    （执行一次完整的 VACUUM，期间阻塞写入，应在低峰期执行）
+    """
+    worker = get_maintenance_worker()
+    if worker is None:
+        return jsonify({"error": "数据库维护线程未启动"}), 503
+    
+    result = {"success": True}
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        if action == 'enable_incremental_vacuum':
+            try:
+                result["vacuum"] = worker.db_manager.enable_incremental_vacuum()
+            except Exception as e:
+                return jsonify({"error": f"启用增量回收失败: {e}"}), 500
+        elif action:
+            return jsonify({"error": f"未知操作: {action}"}), 400
+        worker.trigger()
+    
+    result["status"] = worker.get_status()
+    return jsonify(result)
+
+
+@admin_bp.route("/voices", methods=["GET", "POST"])
+@admin_required
+def voice_catalog():
+    """获取语音目录状态；POST 时立即重新加载语音文件（只作用于当前进程）"""
+    watcher = get_catalog_watcher()
+    if request.method == "POST":
+        result = reload_voice_catalog(force=True)
+        status_code = 200 if result['success'] else 500
+    else:
+        result = {"success": True, "catalog": get_voice_catalog().get_status()}
+        status_code = 200
+    
+    result["watcher"] = watcher.get_status() if watcher else None
+    result["previews"] = get_preview_cache().get_status()
+    return jsonify(result), status_code
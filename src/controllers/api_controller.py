@@ -2,17 +2,28 @@
 
 import io
 import json
-from flask import Blueprint, request, jsonify, current_app, Response, send_file
+import hashlib
+import math
+import uuid
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, current_app, Response, send_file, g
 
 from ..services.tts_service import TTSService
 from ..services.voice_service import VoiceService
 from ..services.file_service import FileService
-from ..services.history_service import HistoryService
+from ..services.history_service import HistoryService, EXPORT_FORMATS
 from ..models.tts_request import TTSRequest
-from ..utils.helpers import generate_filename
+from ..utils.helpers import generate_filename, parse_time_param
+from ..utils.tracing import finish_trace, new_request_id, normalize_request_id
+from ..utils.log_writer import get_log_writer
+from ..utils.database import days_ago_ms
+from ..config.constants import STREAMING_CONFIG
 
 api_bp = Blueprint('api', __name__)
 
+# 语音搜索查询文本的最大长度
+MAX_SEARCH_QUERY_LENGTH = 100
+
 
 def get_services():
     """获取服务实例"""
@@ -75,19 +86,50 @@ def get_models():
 
 @api_bp.route("/voices", methods=["GET"])
 def get_voices():
-    """获取语音列表"""
+    """获取语音列表（预计算并压缩的响应，支持 If-None-Match）"""
     try:
         _, voice_service, _, _ = get_services()
-        voices = voice_service.get_all_voices()
+        config = current_app.config.get('VOICEFORGE_CONFIG')
+        return voice_service.get_voices_response().to_response(request, config.get('VOICES_CACHE_MAX_AGE', 300))
+        
+    except Exception as e:
+        current_app.logger.error(f"获取语音列表失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/voices/search", methods=["GET"])
+def search_voices():
+    """
+    搜索语音
+    
+    查询参数：
+        q: 查询文本（最多100个字符），匹配名称、区域、语言名称、性别与地区，支持前缀和拼写容错
+        language: 区域（zh-CN）或语言（zh）过滤
+        gender: 性别过滤
+        limit: 最多返回的结果数，默认20，最大100
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if len(query) > MAX_SEARCH_QUERY_LENGTH:
+            return jsonify({"error": f"查询文本不能超过{MAX_SEARCH_QUERY_LENGTH}个字符"}), 400
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
         
+        _, voice_service, _, _ = get_services()
+        results = voice_service.search_voices(
+            query,
+            language=request.args.get('language') or None,
+            gender=request.args.get('gender') or None,
+            limit=limit
+        )
         return jsonify({
             "success": True,
-            "voices": {category: [voice.to_dict() for voice in voice_list] 
-                      for category, voice_list in voices.items()}
+            "query": query,
+            "count": len(results),
+            "voices": results
         })
         
     except Exception as e:
-        current_app.logger.error(f"获取语音列表失败: {str(e)}")
+        current_app.logger.error(f"搜索语音失败: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -116,6 +158,41 @@ def preview_voice():
         return jsonify({"error": str(e)}), 500
 
 
+@api_bp.route("/preview/<voice>.mp3", methods=["GET"])
+def preview_audio(voice):
+    """
+    默认预览文本的试听音频（二进制，带缓存头）
+    
+    已缓存的预览无需 API Key；未缓存时需要通过 Authorization: Bearer 请求头提供，
+    生成后写入持久缓存。API Key 不接受查询参数，避免出现在访问日志与浏览器历史中。
+    """
+    try:
+        api_key = ''
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            api_key = auth[len('Bearer '):].strip()
+        
+        _, voice_service, _, _ = get_services()
+        result = voice_service.get_preview_audio(voice, api_key)
+        if not result["success"]:
+            status = 404 if result["error"].startswith("未找到语音") else 400
+            return jsonify({"error": result["error"]}), status
+        
+        config = current_app.config.get('VOICEFORGE_CONFIG')
+        audio = result["audio"]
+        response = Response(audio, mimetype='audio/mpeg')
+        response.set_etag(hashlib.sha256(audio).hexdigest()[:32])
+        response.cache_control.public = True
+        response.cache_control.max_age = config.get('PREVIEW_CACHE_MAX_AGE', 86400)
+        response.headers['X-Preview-Cache'] = 'hit' if result["cached"] else 'miss'
+        # 处理 If-None-Match（304）与 Range 请求
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(audio))
+        
+    except Exception as e:
+        current_app.logger.error(f"获取语音预览失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @api_bp.route("/generate", methods=["POST"])
 def generate_speech():
     """生成语音API"""
@@ -131,7 +208,8 @@ def generate_speech():
             response_format=data.get('response_format', 'mp3'),
             speed=float(data.get('speed', 1.0)),
             api_key=data.get('api_key', ''),
-            stream_format=data.get('stream_format', '')
+            stream_format=data.get('stream_format', ''),
+            request_id=g.trace.request_id if g.get('trace') else ''
         )
         
         tts_service, _, _, _ = get_services()
@@ -170,21 +248,45 @@ def generate_normal_speech_response(tts_service: TTSService, tts_request: TTSReq
 
 def generate_streaming_speech_response(tts_service: TTSService, tts_request: TTSRequest):
     """生成流式语音响应"""
+    from ..utils.queue_manager import get_queue_manager
+    
+    # 在提交前估计排队与完成时间，通过响应头告知客户端
+    # （请求ID由服务端生成，不会与其他请求重复）
+    job_id = tts_request.request_id or uuid.uuid4().hex[:12]
+    segments = math.ceil(tts_request.text_length / STREAMING_CONFIG['MAX_SEGMENT_LENGTH']) or 1
+    estimate = get_queue_manager().estimate_submission(tts_request.text_length, tts_request.voice, segments)
+    predicted_completion = datetime.fromtimestamp(estimate['predicted_completion'], tz=timezone.utc)
+    
+    # 流式响应的追踪在数据全部发送后才结束
+    trace = g.get('trace')
+    g.trace_deferred = True
+    config = current_app.config.get('VOICEFORGE_CONFIG')
+    slow_threshold = config.get('SLOW_REQUEST_THRESHOLD') if config else None
+    logger = current_app.logger
+    
     def generate():
         try:
-            for chunk in tts_service.generate_streaming_speech(tts_request):
+            for chunk in tts_service.generate_streaming_speech(tts_request, job_id=job_id):
                 yield chunk
         except Exception as e:
-            current_app.logger.error(f"流式生成失败: {str(e)}")
+            logger.error(f"流式生成失败: {str(e)}")
             # 在流式响应中，我们无法返回JSON错误，只能记录日志
     
-    return Response(
+    response = Response(
         generate(),
         mimetype=f'audio/{tts_request.response_format}',
         headers={
-            'Content-Disposition': f'attachment; filename="{generate_filename("speech", tts_request.response_format)}"'
+            'Content-Disposition': f'attachment; filename="{generate_filename("speech", tts_request.response_format)}"',
+            'X-Queue-Job-Id': job_id,
+            'X-Queue-Size': str(estimate['queue_size']),
+            'X-Queue-Wait-Estimate': f"{estimate['wait_seconds']:.2f}",
+            'X-Service-Time-Estimate': f"{estimate['service_seconds']:.2f}",
+            'X-Estimated-Completion': predicted_completion.isoformat(timespec='seconds')
         }
     )
+    # 响应关闭时结束追踪：包括数据发送完毕、客户端断开以及响应体从未被读取的情况
+    response.call_on_close(lambda: finish_trace(trace, slow_threshold))
+    return response
 
 
 @api_bp.route("/fetch_url", methods=["POST"])
@@ -215,10 +317,21 @@ def queue_status():
         queue_manager = get_queue_manager()
         status = queue_manager.get_status()
         
-        return jsonify({
+        result = {
             "success": True,
             "status": status
-        })
+        }
+        
+        # 查询单个作业的预计完成时间
+        job_id = request.args.get('job_id')
+        if job_id:
+            result["job"] = queue_manager.get_job_eta(job_id)
+        
+        writer = get_log_writer()
+        if writer is not None:
+            result["log_writer"] = writer.get_status()
+        
+        return jsonify(result)
         
     except Exception as e:
         current_app.logger.error(f"获取队列状态失败: {str(e)}")
@@ -227,7 +340,7 @@ def queue_status():
 
 @api_bp.route("/log_generation", methods=["POST"])
 def log_generation():
-    """记录生成日志"""
+    """记录生成日志（交给后台线程批量写入，返回请求ID而不是数据库行ID）"""
     try:
         data = request.get_json() if request.is_json else request.form.to_dict()
         
@@ -235,7 +348,12 @@ def log_generation():
         if not db_manager:
             return jsonify({"error": "数据库管理器未配置"}), 500
         
-        log_id = db_manager.log_generation(
+        if data.get('request_id'):
+            request_id = normalize_request_id(data.get('request_id'))
+        else:
+            request_id = g.trace.request_id if g.get('trace') else new_request_id()
+        
+        fields = dict(
             text_length=int(data.get('text_length', 0)),
             voice=data.get('voice', ''),
             format=data.get('format', ''),
@@ -246,12 +364,26 @@ def log_generation():
             status=data.get('status', 'success'),
             error_message=data.get('error_message'),
             ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
+            user_agent=request.headers.get('User-Agent'),
+            request_id=request_id
         )
         
+        writer = get_log_writer()
+        if writer is not None and writer.running:
+            if not writer.log_generation(**fields):
+                return jsonify({"error": "日志队列已满，请稍后重试", "request_id": request_id}), 503
+            return jsonify({
+                "success": True,
+                "request_id": request_id,
+                "queued": True
+            }), 202
+        
+        log_id = db_manager.log_generation(**fields)
         return jsonify({
             "success": True,
-            "log_id": log_id
+            "request_id": request_id,
+            "log_id": log_id,
+            "queued": False
         })
         
     except Exception as e:
@@ -261,47 +393,195 @@ def log_generation():
 
 @api_bp.route("/stats", methods=["GET"])
 def get_stats():
-    """获取统计数据"""
+    """
+    获取统计数据
+    
+    结果在服务端缓存，响应带 ETag；客户端携带 If-None-Match 轮询时，
+    数据未变化则返回 304。
+    """
     try:
+        # recent 控制附带的最近记录条数，0 表示不附带
+        recent_limit = max(0, min(request.args.get('recent', 50, type=int), 200))
+        
         _, _, _, history_service = get_services()
-        stats = history_service.get_generation_stats()
+        stats = history_service.get_generation_stats(recent_limit=recent_limit)
         
-        return jsonify(stats)
+        response = jsonify(stats)
+        if stats.get('success'):
+            response.add_etag()
+            # 允许浏览器保存但每次都需要重新验证
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+        return response
         
     except Exception as e:
         current_app.logger.error(f"获取统计数据失败: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
-@api_bp.route("/stats/export", methods=["GET"])
-def export_stats():
-    """导出统计数据"""
+@api_bp.route("/stats/performance", methods=["GET"])
+def get_performance_stats():
+    """
+    性能分析：按语音/格式/模式的延迟分位数、每秒字符数、耗时对文本长度的回归、错误率时间序列
+    
+    查询参数：
+        start / end: 时间范围，格式同 /history；默认最近7天
+        bucket: 错误率时间序列粒度 minute / hour / day，默认 hour
+    """
     try:
+        try:
+            start_ms = parse_time_param(request.args.get('start'))
+            end_ms = parse_time_param(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({"error": "时间参数格式错误"}), 400
+        if start_ms is None and end_ms is None:
+            # 对齐到分钟，使轮询请求能命中统计缓存
+            start_ms = days_ago_ms(7) // 60000 * 60000
+        
         _, _, _, history_service = get_services()
-        result = history_service.export_logs_csv()
-        
-        if result["success"]:
-            # 创建CSV内容
-            import csv
-            import io
-            
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=result["data"]["columns"])
-            writer.writeheader()
-            writer.writerows(result["data"]["rows"])
-            
-            # 转换为字节流
-            csv_data = output.getvalue().encode('utf-8-sig')  # 使用BOM以支持Excel
-            csv_io = io.BytesIO(csv_data)
-            
-            return send_file(
-                csv_io,
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name='tts_generation_logs.csv'
+        try:
+            result = history_service.get_performance_stats(
+                start_ms=start_ms, end_ms=end_ms, bucket=request.args.get('bucket', 'hour')
             )
-        else:
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify(result), 200 if result.get('success') else 503
+        
+    except Exception as e:
+        current_app.logger.error(f"获取性能统计失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/stats/segments", methods=["GET"])
+def get_segment_stats():
+    """
+    分段上游调用统计，用于调整分段长度与并发
+    
+    查询参数：
+        group_by: voice / length（按50字符分桶）/ hour（本地时间），默认 voice
+        start / end: 时间范围，格式同 /history
+        slow: 慢调用阈值（秒），默认5
+    """
+    try:
+        try:
+            start_ms = parse_time_param(request.args.get('start'))
+            end_ms = parse_time_param(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({"error": "时间参数格式错误"}), 400
+        
+        _, _, _, history_service = get_services()
+        try:
+            result = history_service.get_segment_stats(
+                group_by=request.args.get('group_by', 'voice'),
+                start_ms=start_ms,
+                end_ms=end_ms,
+                slow_seconds=request.args.get('slow', 5.0, type=float)
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        current_app.logger.error(f"获取分段统计失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/history/<request_id>/segments", methods=["GET"])
+def get_request_segments(request_id):
+    """获取一次请求的分段明细"""
+    try:
+        _, _, _, history_service = get_services()
+        return jsonify(history_service.get_request_segments(request_id))
+        
+    except Exception as e:
+        current_app.logger.error(f"获取分段明细失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/history", methods=["GET"])
+def get_history():
+    """
+    分页查询生成历史
+    
+    查询参数：
+        limit: 每页行数，默认50
+        cursor: 上一页返回的 next_cursor
+        voice / status / mode: 精确过滤
+        start / end: 时间范围，支持 YYYY-MM-DD、ISO时间或毫秒时间戳；纯日期的 end 包含当天
+    """
+    try:
+        try:
+            start_ms = parse_time_param(request.args.get('start'))
+            end_ms = parse_time_param(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({"error": "时间参数格式错误"}), 400
+        
+        _, _, _, history_service = get_services()
+        try:
+            result = history_service.get_history(
+                limit=request.args.get('limit', 50, type=int),
+                cursor=request.args.get('cursor'),
+                voice=request.args.get('voice') or None,
+                status=request.args.get('status') or None,
+                mode=request.args.get('mode') or None,
+                start_ms=start_ms,
+                end_ms=end_ms
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not result["success"]:
             return jsonify(result), 500
+        return jsonify(result)
+        
+    except Exception as e:
+        current_app.logger.error(f"获取生成历史失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/stats/export", methods=["GET"])
+def export_stats():
+    """
+    流式导出生成日志
+    
+    查询参数：
+        format: csv（默认）或 ndjson
+        start / end: 时间范围，支持 YYYY-MM-DD、ISO时间或毫秒时间戳；纯日期的 end 包含当天
+        gzip: 为1时输出gzip压缩文件
+    """
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"不支持的导出格式: {export_format}"}), 400
+        
+        try:
+            start_ms = parse_time_param(request.args.get('start'))
+            end_ms = parse_time_param(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({"error": "时间参数格式错误"}), 400
+        
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        _, _, _, history_service = get_services()
+        chunks = history_service.stream_logs(export_format, start_ms, end_ms, compress)
+        
+        filename = f"tts_generation_logs.{export_format}"
+        mimetype = EXPORT_FORMATS[export_format]
+        if compress:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
         
     except Exception as e:
         current_app.logger.error(f"导出统计数据失败: {str(e)}")
@@ -0,0 +1,16 @@
+"""指标控制器"""
+
+from flask import Blueprint, Response
+
+from ..utils.metrics import REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus文本格式指标"""
+    return Response(
+        REGISTRY.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -3,6 +3,7 @@
 from .base import BaseModel
 from .tts_request import TTSRequest, TTSResponse
 from .voice import Voice
+from .voice_catalog import VoiceCatalog
 from .history import GenerationLog
 
-__all__ = ['BaseModel', 'TTSRequest', 'TTSResponse', 'Voice', 'GenerationLog']
+__all__ = ['BaseModel', 'TTSRequest', 'TTSResponse', 'Voice', 'VoiceCatalog', 'GenerationLog']
@@ -0,0 +1,124 @@
+"""
+预编译语音目录格式
+
+语音JSON仍是唯一的数据源，构建时（scripts/build_voice_catalog.py、更新语音脚本、Docker构建）
+额外生成同名的 .bin 文件，运行时用 mmap 映射后按偏移读取，不再解析JSON：
+
+    文件头    magic(8) 版本(u32) 字符串数(u32) 分类数(u32) 语音数(u32) 源JSON的SHA-256(32)
+    分类表    每个分类 (名称, 首个语音序号, 语音数)，均为 u32
+    语音表    每个语音 (名称, 区域, 性别, 地区, 描述) 的字符串编号，均为 u32
+    字符串区  去重后的字符串以 \0 连接的 UTF-8，一次解码、一次切分得到全部字符串
+
+文件头记录了源JSON的摘要，JSON更新而 .bin 未重新生成时视为过期，回退到解析JSON。
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+from typing import Dict, List, Optional
+
+from .voice import Voice
+
+
+MAGIC = b'VFCATLG\x00'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sIIII32s')
+_CATEGORY = struct.Struct('<III')
+_VOICE = struct.Struct('<IIIII')
+
+# 与 Voice.__init__ 的位置参数顺序一致
+VOICE_FIELDS = ('name', 'language', 'gender', 'region', 'description')
+_SEPARATOR = '\x00'
+
+
+def compiled_path(json_path: str) -> str:
+    """语音JSON对应的预编译文件路径"""
+    return os.path.splitext(json_path)[0] + '.bin'
+
+
+def source_digest(raw: bytes) -> bytes:
+    """源JSON内容的摘要"""
+    return hashlib.sha256(raw).digest()
+
+
+def write_compiled_catalog(categories: Dict[str, List[Voice]], digest: bytes, path: str) -> int:
+    """
+    把分类后的语音写成预编译文件（先写临时文件再原子替换）
+
+    Returns:
+        文件大小（字节）
+    """
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value) -> int:
+        value = (value or '').replace(_SEPARATOR, '')
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    category_rows = []
+    voice_rows = []
+    for category, voices in categories.items():
+        category_rows.append((intern(category), len(voice_rows), len(voices)))
+        for voice in voices:
+            voice_rows.append(tuple(intern(getattr(voice, field)) for field in VOICE_FIELDS))
+
+    parts = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, len(strings), len(category_rows), len(voice_rows), digest),
+        b''.join(_CATEGORY.pack(*row) for row in category_rows),
+        b''.join(_VOICE.pack(*row) for row in voice_rows),
+        _SEPARATOR.join(strings).encode('utf-8'),
+    ]
+    data = b''.join(parts)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_compiled_catalog(path: str, digest: bytes) -> Optional[Dict[str, List[Voice]]]:
+    """
+    读取预编译文件
+
+    Returns:
+        分类 -> 语音列表；文件不存在、格式不符或与源JSON不一致时返回None
+    """
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return _decode(buffer, digest)
+    except (OSError, ValueError, struct.error, UnicodeDecodeError):
+        return None
+
+
+def _decode(buffer, digest: bytes) -> Optional[Dict[str, List[Voice]]]:
+    magic, version, string_count, category_count, voice_count, source = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or source != digest:
+        return None
+
+    position = _HEADER.size
+    category_rows = _CATEGORY.iter_unpack(buffer[position:position + _CATEGORY.size * category_count])
+    position += _CATEGORY.size * category_count
+    # 语音表整体解包成一个扁平元组，每 5 个为一个语音
+    width = len(VOICE_FIELDS)
+    voice_ids = struct.unpack_from(f'<{width * voice_count}I', buffer, position)
+    position += _VOICE.size * voice_count
+
+    strings = buffer[position:].decode('utf-8').split(_SEPARATOR)
+    if len(strings) != string_count:
+        return None
+
+    categories: Dict[str, List[Voice]] = {}
+    for name_id, first, count in category_rows:
+        categories[strings[name_id]] = [
+            Voice(*[strings[sid] for sid in voice_ids[i:i + width]])
+            for i in range(first * width, (first + count) * width, width)
+        ]
+    return categories
@@ -5,7 +5,8 @@ from dataclasses import dataclass
 import io
 
 from .base import BaseModel, ValidationMixin
-from ..config.constants import SUPPORTED_FORMATS, SUPPORTED_MODELS, VOICES
+from ..config.constants import SUPPORTED_FORMATS, SUPPORTED_MODELS
+from .voice_catalog import get_voice_catalog
 
 
 class TTSRequest(BaseModel, ValidationMixin):
@@ -19,6 +20,7 @@ class TTSRequest(BaseModel, ValidationMixin):
                  speed: float = 1.0,
                  api_key: str = "",
                  stream_format: str = "",
+                 request_id: str = "",
                  **kwargs):
         super().__init__(**kwargs)
         
@@ -29,6 +31,7 @@ class TTSRequest(BaseModel, ValidationMixin):
         self.speed = speed
         self.api_key = api_key
         self.stream_format = stream_format
+        self.request_id = request_id
     
     @property
     def text_length(self) -> int:
@@ -59,7 +62,7 @@ class TTSRequest(BaseModel, ValidationMixin):
             errors.append("文本长度不能超过100000字符（10万字）")
         
         # 验证语音
-        if self.voice and self.voice not in VOICES:
+        if self.voice and self.voice not in get_voice_catalog().valid_names:
             errors.append(f"不支持的语音: {self.voice}")
         
         # 验证模型
@@ -115,6 +118,9 @@ class TTSResponse:
     duration: Optional[float] = None
     error_message: Optional[str] = None
     status_code: Optional[int] = None
+    upstream_status: Optional[str] = None  # 上游HTTP状态码，或 timeout / error
+    upstream_seconds: Optional[float] = None  # 上游请求耗时
+    audio_duration: Optional[float] = None  # 音频时长（秒），无法解析时为None
     
     @property
     def has_audio(self) -> bool:
@@ -0,0 +1,527 @@
+"""
+语音目录模块
+
+进程内只加载一次语音JSON，构建不可变的语音目录，
+并按简短名称、区域（locale）、语言和性别建立索引，查找均为 O(1)。
+
+语音文件更新后由监视线程（按修改时间）或管理接口重新加载：
+新目录在后台解析、校验并预先生成搜索索引等派生数据，再整体替换全局引用，
+请求看到的要么是旧目录，要么是完整的新目录。
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .voice import Voice
+from .voice_search import VoiceSearchIndex
+from .catalog_format import compiled_path, source_digest, read_compiled_catalog, write_compiled_catalog
+from ..config.constants import OPENAI_VOICE_MAPPING, VOICES_BY_LANGUAGE
+
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config")
+
+# 依次尝试的语音列表文件：完整列表、基础列表
+VOICE_FILES = (
+    os.path.join(CONFIG_DIR, "complete_edge_voices.json"),
+    os.path.join(CONFIG_DIR, "edge_tts_voices.json"),
+)
+
+# OpenAI语音性别
+OPENAI_GENDERS = {
+    "alloy": "Neutral",
+    "echo": "Male",
+    "fable": "Female",
+    "onyx": "Male",
+    "nova": "Female",
+    "shimmer": "Female",
+}
+
+_FEMALE_PATTERNS = (
+    'xiaoxiao', 'xiaohan', 'xiaomo', 'xiaorui', 'xiaoyi', 'xiaomeng',
+    'xiaoshuang', 'xiaoxuan', 'xiaoyan', 'xiaoyou', 'xiaozhen', 'xiaochen',
+    'hsiaoche', 'hsiaoy', 'hiugaai', 'hiumaan', 'ava', 'emma', 'jenny',
+    'aria', 'jane', 'sara', 'nancy', 'amber', 'ana', 'ashley', 'cora',
+    'elizabeth', 'michelle', 'monica', 'sonia', 'libby', 'abbi', 'bella',
+    'hollie', 'maisie', 'olivia', 'nanami', 'aoi', 'mayu', 'shiori',
+    'sunhi', 'seohy', 'yujin', 'katja', 'amala', 'elke', 'gisela',
+    'klarissa', 'louisa', 'maja', 'tanja', 'denise', 'brigitte',
+    'celeste', 'coralie', 'eloise', 'jacqueline', 'josephine', 'yvette'
+)
+
+_MALE_PATTERNS = (
+    'yunxi', 'yunfeng', 'yunhao', 'yunjian', 'yunxia', 'yunyang',
+    'yunye', 'yunze', 'yunjhe', 'wanlung', 'andrew', 'brian', 'guy',
+    'davis', 'jason', 'tony', 'eric', 'jacob', 'roger', 'steffan',
+    'ryan', 'alfie', 'elliot', 'ethan', 'noah', 'oliver', 'thomas',
+    'keita', 'daichi', 'naoki', 'injoon', 'bongjin', 'gookmin',
+    'jimin', 'conrad', 'bernd', 'christoph', 'kasper', 'kilian',
+    'klaus', 'ralf', 'henri', 'alain', 'claude', 'jerome', 'maurice',
+    'yves', 'alvaro', 'arnau', 'dario', 'elias', 'nil', 'saul', 'teo'
+)
+
+
+def infer_gender(voice_name: str) -> str:
+    """根据语音名称推断性别（JSON中没有性别信息时使用）"""
+    if voice_name in OPENAI_GENDERS:
+        return OPENAI_GENDERS[voice_name]
+
+    voice_lower = voice_name.lower()
+    for pattern in _FEMALE_PATTERNS:
+        if pattern in voice_lower:
+            return "Female"
+    for pattern in _MALE_PATTERNS:
+        if pattern in voice_lower:
+            return "Male"
+    return "Neutral"
+
+
+def _short_name(voice_info: Dict) -> str:
+    """提取简短的语音名称（用于实际TTS调用）"""
+    short_name = voice_info.get("short_name", voice_info["name"])
+    if short_name and short_name != voice_info["name"]:
+        return short_name
+
+    # 格式: "Microsoft Server Speech Text to Speech Voice (zh-CN, XiaoxiaoNeural) (Female)"
+    full_name = voice_info["name"]
+    if "(" in full_name and ")" in full_name:
+        locale_voice = full_name.split("(")[1].split(")")[0]
+        if "," in locale_voice:
+            locale, voice_name = locale_voice.split(", ", 1)
+            return f"{locale.strip()}-{voice_name.strip()}"
+        return locale_voice.strip()
+    return full_name
+
+
+def _voice_from_entry(voice_info) -> Voice:
+    if isinstance(voice_info, dict):
+        # 新格式：包含详细信息的字典
+        locale = voice_info.get("locale", "")
+        return Voice(
+            name=_short_name(voice_info),
+            language=locale,
+            gender=voice_info.get("gender", "Unknown"),
+            region=locale.split("-")[-1] if locale else "",
+            description=f"{voice_info.get('gender', 'Unknown')} voice"
+        )
+    # 旧格式：只有语音名称的字符串
+    return Voice.from_edge_tts_format(voice_info, infer_gender(voice_info))
+
+
+def _categories_from_dict(data: Dict) -> Dict[str, List[Voice]]:
+    """语音JSON内容 -> 分类 -> 语音列表"""
+    if not isinstance(data, dict) or not isinstance(data.get("voices"), dict):
+        raise ValueError("缺少 voices 字段")
+    return {
+        category: [_voice_from_entry(voice_info) for voice_info in voice_list]
+        for category, voice_list in data["voices"].items()
+    }
+
+
+def default_voices() -> Dict[str, List[Voice]]:
+    """默认语音列表（语音文件不可用时的回退方案）"""
+    return {
+        "OpenAI Voices": [
+            Voice(name="alloy", gender="Neutral", language="en-US"),
+            Voice(name="echo", gender="Male", language="en-US"),
+            Voice(name="fable", gender="Female", language="en-US"),
+            Voice(name="onyx", gender="Male", language="en-US"),
+            Voice(name="nova", gender="Female", language="en-US"),
+            Voice(name="shimmer", gender="Female", language="en-US"),
+        ],
+        "中文(简体)": [
+            Voice.from_edge_tts_format("zh-CN-XiaoxiaoNeural", "Female"),
+            Voice.from_edge_tts_format("zh-CN-YunxiNeural", "Male"),
+            Voice.from_edge_tts_format("zh-CN-XiaohanNeural", "Female"),
+            Voice.from_edge_tts_format("zh-CN-XiaomoNeural", "Female"),
+        ],
+        "English (US)": [
+            Voice.from_edge_tts_format("en-US-AriaNeural", "Female"),
+            Voice.from_edge_tts_format("en-US-DavisNeural", "Male"),
+            Voice.from_edge_tts_format("en-US-JennyNeural", "Female"),
+            Voice.from_edge_tts_format("en-US-GuyNeural", "Male"),
+        ]
+    }
+
+
+class VoiceCatalog:
+    """
+    不可变的语音目录
+
+    categories 保持语音文件中的分类与顺序（/api/voices 的输出）；
+    另外按名称、区域、语言、性别建立索引。OpenAI 语音名作为别名解析到对应的 Edge 语音，
+    constants 中内置但语音文件里没有的语音只进入名称索引，不出现在分类列表中。
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[Voice]], source: Optional[str] = None,
+                 aliases: Optional[Dict[str, str]] = None,
+                 builtin: Optional[Dict[str, Iterable[str]]] = None):
+        self.source = source
+        self.categories = MappingProxyType({category: tuple(voices) for category, voices in categories.items()})
+        self.aliases = MappingProxyType(dict(OPENAI_VOICE_MAPPING if aliases is None else aliases))
+
+        by_name: Dict[str, Voice] = {}
+        category_of: Dict[str, str] = {}
+        by_locale: Dict[str, list] = {}
+        by_language: Dict[str, list] = {}
+        by_gender: Dict[str, list] = {}
+        for category, voices in self.categories.items():
+            for voice in voices:
+                if voice.name in by_name:
+                    continue
+                by_name[voice.name] = voice
+                category_of[voice.name] = category
+                locale = (voice.language or '').lower()
+                by_locale.setdefault(locale, []).append(voice)
+                by_language.setdefault(locale.split('-')[0], []).append(voice)
+                by_gender.setdefault((voice.gender or '').lower(), []).append(voice)
+
+        self.voices: Tuple[Voice, ...] = tuple(by_name.values())
+
+        for category, names in (VOICES_BY_LANGUAGE if builtin is None else builtin).items():
+            for name in names:
+                if name not in by_name and name not in self.aliases:
+                    by_name[name] = Voice.from_edge_tts_format(name, infer_gender(name))
+                    category_of[name] = category
+
+        self._by_name = MappingProxyType(by_name)
+        self._category_of = MappingProxyType(category_of)
+        self._by_locale = MappingProxyType({key: tuple(value) for key, value in by_locale.items()})
+        self._by_language = MappingProxyType({key: tuple(value) for key, value in by_language.items()})
+        self._by_gender = MappingProxyType({key: tuple(value) for key, value in by_gender.items()})
+        self.loaded_at = time.time()
+        # 是否从预编译文件加载
+        self.compiled = False
+        # 文件签名 (路径, 修改时间, 大小)，用于判断语音文件是否变化
+        self.signature: Optional[tuple] = None
+
+        # 派生数据（搜索索引、预计算响应等），每个目录实例各自缓存
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.Lock()
+
+        # 请求校验用的合法语音名（含 OpenAI 别名），随目录一起整体替换
+        self.valid_names = frozenset(by_name) | frozenset(self.aliases)
+
+    @classmethod
+    def load(cls, paths: Optional[Iterable[str]] = None, strict: bool = False) -> 'VoiceCatalog':
+        """
+        从第一个可读的语音文件加载，都不可用时使用默认语音列表
+
+        Args:
+            strict: 为True时文件存在但无效会抛出 ValueError，而不是回退到下一个文件
+                    （重新加载时使用，避免用回退列表替换掉正常的目录）
+        """
+        logger = logging.getLogger(__name__)
+        for path in paths or VOICE_FILES:
+            signature = _file_signature(path)
+            if signature is None:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                # 预编译文件与JSON一致时直接读取，否则解析JSON
+                categories = read_compiled_catalog(compiled_path(path), source_digest(raw))
+                compiled = categories is not None
+                if not compiled:
+                    categories = _categories_from_dict(json.loads(raw.decode('utf-8')))
+                catalog = cls(categories, source=path)
+                catalog.compiled = compiled
+                if not catalog.voices:
+                    raise ValueError("语音列表为空")
+                if any(not voice.name for voice in catalog.voices):
+                    raise ValueError("存在没有名称的语音")
+                catalog.signature = signature
+                return catalog
+            except Exception as e:
+                if strict:
+                    raise ValueError(f"语音文件无效: {path} | {e}") from e
+                logger.warning(f"加载语音JSON文件失败: {path} | {e}")
+        return cls(default_voices())
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: Optional[str] = None) -> 'VoiceCatalog':
+        """从语音JSON的内容构建目录"""
+        return cls(_categories_from_dict(data), source=source)
+
+    @classmethod
+    def compile(cls, json_path: str) -> Dict[str, Any]:
+        """
+        为语音JSON生成预编译文件（构建时调用）
+
+        Returns:
+            {"path": 预编译文件路径, "voices": 语音数, "size": 文件大小}
+        """
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        categories = _categories_from_dict(json.loads(raw.decode('utf-8')))
+        path = compiled_path(json_path)
+        size = write_compiled_catalog(categories, source_digest(raw), path)
+        return {"path": path, "voices": sum(len(voices) for voices in categories.values()), "size": size}
+
+    def __len__(self) -> int:
+        return len(self.voices)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.valid_names
+
+    def get(self, name: str) -> Optional[Voice]:
+        """按名称查找语音，OpenAI 语音名返回映射到的 Edge 语音"""
+        voice = self._by_name.get(name)
+        if voice is None and name in self.aliases:
+            actual = self.aliases[name]
+            voice = self._by_name.get(actual) or Voice.from_edge_tts_format(actual, infer_gender(actual))
+        return voice
+
+    def category_of(self, name: str) -> Optional[str]:
+        """语音所在的分类"""
+        return self._category_of.get(name)
+
+    def by_locale(self, locale: str) -> Tuple[Voice, ...]:
+        """按区域查找，如 zh-CN（不区分大小写）"""
+        return self._by_locale.get((locale or '').lower(), ())
+
+    def by_language(self, language: str) -> Tuple[Voice, ...]:
+        """按语言查找，如 zh（不区分大小写）"""
+        return self._by_language.get((language or '').lower(), ())
+
+    def by_gender(self, gender: str) -> Tuple[Voice, ...]:
+        """按性别查找：Male / Female / Neutral（不区分大小写）"""
+        return self._by_gender.get((gender or '').lower(), ())
+
+    def derived(self, key: str, factory: Callable[['VoiceCatalog'], Any]) -> Any:
+        """获取由目录派生的数据，首次访问时调用 factory(目录) 生成并缓存"""
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = factory(self)
+        return value
+
+    def warm_up(self) -> None:
+        """预先生成全部已注册的派生数据"""
+        for key, factory in list(_warmers.items()):
+            self.derived(key, factory)
+
+    @property
+    def search_index(self) -> VoiceSearchIndex:
+        """搜索索引（首次搜索或预热时构建）"""
+        return self.derived('search_index', _build_search_index)
+
+    def search(self, query: str, language: Optional[str] = None, gender: Optional[str] = None,
+               limit: int = 20) -> List[Tuple[Voice, str, int]]:
+        """
+        按名称、区域、语言、性别、地区搜索语音（前缀、子串与拼写容错匹配）
+
+        Args:
+            language: 区域（zh-CN）或语言（zh）过滤
+            gender: 性别过滤
+
+        Returns:
+            [(语音, 所属分类, 得分)]
+        """
+        allowed = None
+        if language:
+            voices = self.by_locale(language) or self.by_language(language)
+            allowed = {voice.name for voice in voices}
+        if gender:
+            names = {voice.name for voice in self.by_gender(gender)}
+            allowed = names if allowed is None else allowed & names
+        return self.search_index.search(query, limit, allowed)
+
+    @property
+    def locales(self) -> List[str]:
+        return list(self._by_locale)
+
+    def get_status(self) -> Dict:
+        """获取目录状态"""
+        return {
+            "source": self.source,
+            "compiled": self.compiled,
+            "voices": len(self.voices),
+            "categories": len(self.categories),
+            "locales": len(self._by_locale),
+            "aliases": len(self.aliases),
+            "loaded_at": self.loaded_at,
+            "derived": sorted(self._derived),
+        }
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def current_signature(paths: Optional[Iterable[str]] = None) -> Optional[tuple]:
+    """第一个存在的语音文件的签名"""
+    for path in paths or VOICE_FILES:
+        signature = _file_signature(path)
+        if signature is not None:
+            return signature
+    return None
+
+
+def _build_search_index(catalog: VoiceCatalog) -> VoiceSearchIndex:
+    return VoiceSearchIndex((voice, catalog.category_of(voice.name)) for voice in catalog.voices)
+
+
+# 重新加载时在替换前预先生成的派生数据：键 -> 生成函数
+_warmers: Dict[str, Callable[[VoiceCatalog], Any]] = {'search_index': _build_search_index}
+
+
+def add_catalog_warmer(key: str, factory: Callable[[VoiceCatalog], Any]) -> None:
+    """注册派生数据，新目录替换前会先调用 factory 生成"""
+    _warmers[key] = factory
+
+
+# 全局语音目录
+_catalog: Optional[VoiceCatalog] = None
+_catalog_lock = threading.Lock()
+_reload_lock = threading.Lock()
+
+
+def get_voice_catalog() -> VoiceCatalog:
+    """获取全局语音目录（首次调用时加载）"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = VoiceCatalog.load()
+                logging.getLogger(__name__).info(
+                    f"语音目录已加载 | 语音数: {len(_catalog)} | 来源: {_catalog.source or '默认列表'}")
+    return _catalog
+
+
+def reload_voice_catalog(force: bool = False) -> Dict[str, Any]:
+    """
+    语音文件变化（或 force）时重新加载全局目录
+
+    新目录解析、校验并预热派生数据后才替换全局引用；加载失败时保留当前目录。
+    """
+    global _catalog
+    logger = logging.getLogger(__name__)
+    with _reload_lock:
+        current = get_voice_catalog()
+        signature = current_signature()
+        if not force and signature == current.signature:
+            return {"success": True, "reloaded": False, "catalog": current.get_status()}
+
+        start_time = time.time()
+        try:
+            catalog = VoiceCatalog.load(strict=True)
+            catalog.warm_up()
+        except Exception as e:
+            logger.error(f"重新加载语音目录失败，继续使用当前目录: {e}")
+            return {"success": False, "reloaded": False, "error": str(e), "catalog": current.get_status()}
+
+        _catalog = catalog
+        logger.info(f"语音目录已重新加载 | 语音数: {len(current)} -> {len(catalog)} | "
+                    f"耗时: {time.time() - start_time:.2f}s")
+        return {"success": True, "reloaded": True, "catalog": catalog.get_status()}
+
+
+class VoiceCatalogWatcher:
+    """
+    语音文件监视线程
+
+    按间隔检查语音文件的修改时间和大小，变化时重新加载目录。
+    每个工作进程各自运行一个监视线程，管理接口触发的重新加载只作用于处理该请求的进程。
+    """
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.checks = 0
+        self.reloads = 0
+        self.last_check = None
+        self.last_reload = None
+        self.last_error = None
+
+        self.running = False
+        self._thread = None
+        self._stop = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> None:
+        """启动监视线程"""
+        if self.running:
+            return
+        self.running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="VoiceCatalogWatcher", daemon=True)
+        self._thread.start()
+        self.logger.info(f"语音目录监视线程已启动 | 间隔: {self.interval}s")
+
+    def stop(self) -> None:
+        """停止监视线程"""
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        # 启动时在后台预热当前目录，首个请求不必等待索引构建
+        try:
+            get_voice_catalog().warm_up()
+        except Exception as e:
+            self.logger.error(f"语音目录预热失败: {e}")
+
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> Dict[str, Any]:
+        """检查一次语音文件"""
+        result = reload_voice_catalog()
+        self.checks += 1
+        self.last_check = time.time()
+        if result.get('reloaded'):
+            self.reloads += 1
+            self.last_reload = self.last_check
+        self.last_error = result.get('error')
+        return result
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取监视线程状态"""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "last_check": self.last_check,
+            "last_reload": self.last_reload,
+            "last_error": self.last_error,
+        }
+
+
+# 全局监视线程实例
+_watcher: Optional[VoiceCatalogWatcher] = None
+
+
+def get_catalog_watcher() -> Optional[VoiceCatalogWatcher]:
+    """获取全局语音目录监视线程（未启动时为None）"""
+    return _watcher
+
+
+def start_catalog_watcher(config=None) -> Optional[VoiceCatalogWatcher]:
+    """按配置创建并启动语音目录监视线程，间隔为0时不启动"""
+    global _watcher
+    interval = config.get('VOICES_RELOAD_INTERVAL', 10) if config is not None else 10
+    if interval <= 0:
+        return None
+    if _watcher is not None:
+        return _watcher
+
+    _watcher = VoiceCatalogWatcher(interval=interval)
+    _watcher.start()
+    atexit.register(_watcher.stop)
+    return _watcher
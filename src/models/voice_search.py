@@ -0,0 +1,199 @@
+"""
+语音搜索索引
+
+对语音目录中的简短名称、区域、语言名称、性别和地区建立倒排索引，支持：
+    - 前缀匹配：在有序词表上二分查找
+    - 子串匹配：扫描每个语音拼接好的搜索文本
+    - 拼写容错：预先生成每个词删除1~2个字符后的变体（SymSpell），
+      查询词的删除变体与之相交得到候选，再用编辑距离确认
+多个查询词之间为“且”关系，按各词得分之和排序。
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .voice import Voice
+
+
+# 各种匹配方式的得分
+SCORE_EXACT_NAME = 200
+SCORE_EXACT = 100
+SCORE_PREFIX = 60
+SCORE_SUBSTRING = 30
+SCORE_FUZZY = 20
+
+# 拼写容错的最大编辑距离：查询词长度 >= 键 时允许的距离
+FUZZY_DISTANCE = ((8, 2), (4, 1))
+MAX_FUZZY_DISTANCE = 2
+
+_SPLIT_PATTERN = re.compile(r'[^0-9a-z\u4e00-\u9fff]+')
+_CAMEL_PATTERN = re.compile(r'[A-Z][a-z0-9]*|[a-z0-9]+')
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """删除至多 distance 个字符得到的全部变体（包括原词）"""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """带相邻换位的编辑距离，超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _allowed_distance(term: str) -> int:
+    for length, distance in FUZZY_DISTANCE:
+        if len(term) >= length:
+            return distance
+    return 0
+
+
+def _token_distance(token: str) -> int:
+    """索引词需要预先删除的字符数：要覆盖长度相差不超过最大距离的查询词"""
+    if len(token) >= FUZZY_DISTANCE[0][0] - MAX_FUZZY_DISTANCE:
+        return MAX_FUZZY_DISTANCE
+    return 1 if len(token) >= FUZZY_DISTANCE[-1][0] - 1 else 0
+
+
+def voice_tokens(voice: Voice, category: str = '') -> Set[str]:
+    """语音的索引词：名称各部分、区域、分类（语言名称）中的单词、性别、地区"""
+    tokens = set(_SPLIT_PATTERN.split(f"{voice.name} {voice.language} {category} {voice.region}".lower()))
+    # XiaoxiaoMultilingualNeural -> xiaoxiao, multilingual, neural
+    tail = voice.name.rsplit('-', 1)[-1]
+    tokens.update(part.lower() for part in _CAMEL_PATTERN.findall(tail))
+    tokens.add(voice.name.lower())
+    if voice.gender:
+        tokens.add(voice.gender.lower())
+    tokens.discard('')
+    return tokens
+
+
+class VoiceSearchIndex:
+    """语音目录的搜索索引（构建后只读）"""
+
+    def __init__(self, entries: Iterable[Tuple[Voice, str]]):
+        """
+        Args:
+            entries: (语音, 所属分类) 序列
+        """
+        self.voices: List[Voice] = []
+        self.categories: List[str] = []
+        self._haystacks: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._name_ids: Dict[str, int] = {}
+
+        for voice, category in entries:
+            voice_id = len(self.voices)
+            self.voices.append(voice)
+            self.categories.append(category)
+            self._name_ids[voice.name.lower()] = voice_id
+            self._haystacks.append(f"{voice.name} {voice.language} {category} {voice.gender} {voice.region}".lower())
+            for token in voice_tokens(voice, category):
+                self._postings.setdefault(token, set()).add(voice_id)
+
+        self._tokens = sorted(self._postings)
+        # 比最长的索引词还长出最大编辑距离以上的查询词不可能拼写匹配，跳过删除变体的生成
+        longest = max((len(token) for token in self._tokens if token.isalnum()), default=0)
+        self._max_fuzzy_length = longest + MAX_FUZZY_DISTANCE
+        self._deletes: Dict[str, Set[str]] = {}
+        for token in self._tokens:
+            # 完整名称等带分隔符的长词不参与拼写容错，其各部分已单独索引
+            if not token.isalnum():
+                continue
+            for variant in _deletes(token, _token_distance(token)):
+                self._deletes.setdefault(variant, set()).add(token)
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        start = bisect_left(self._tokens, prefix)
+        end = bisect_left(self._tokens, prefix + '\uffff', start)
+        return self._tokens[start:end]
+
+    def _fuzzy_tokens(self, term: str) -> List[str]:
+        distance = _allowed_distance(term)
+        if not distance or len(term) > self._max_fuzzy_length:
+            return []
+        candidates = set()
+        for variant in _deletes(term, distance):
+            candidates |= self._deletes.get(variant, set())
+        return [token for token in candidates if edit_distance(term, token, distance) <= distance]
+
+    def _score_term(self, term: str) -> Dict[int, int]:
+        """单个查询词对各语音的得分（取该词最好的匹配方式）"""
+        scores: Dict[int, int] = {}
+
+        def add(voice_ids, score):
+            for voice_id in voice_ids:
+                if scores.get(voice_id, 0) < score:
+                    scores[voice_id] = score
+
+        if term in self._name_ids:
+            add((self._name_ids[term],), SCORE_EXACT_NAME)
+        add(self._postings.get(term, ()), SCORE_EXACT)
+        for token in self._prefix_tokens(term):
+            add(self._postings[token], SCORE_PREFIX)
+        if len(term) >= 2:
+            add((i for i, haystack in enumerate(self._haystacks) if term in haystack), SCORE_SUBSTRING)
+        if not scores:
+            # 只有没有其他匹配时才做拼写容错
+            for token in self._fuzzy_tokens(term):
+                add(self._postings[token], SCORE_FUZZY)
+        return scores
+
+    def search(self, query: str, limit: int = 20,
+               allowed: Optional[Set[str]] = None) -> List[Tuple[Voice, str, int]]:
+        """
+        搜索语音
+
+        Args:
+            query: 查询文本，按空白与标点拆成多个词
+            limit: 最多返回的结果数
+            allowed: 只在这些语音名称中搜索（用于语言、性别过滤）
+
+        Returns:
+            [(语音, 所属分类, 得分)]，按得分降序、名称长度升序排列
+        """
+        terms = [term for term in _SPLIT_PATTERN.split((query or '').lower()) if term]
+        # 完整名称（含连字符）整体也作为一个词
+        whole = (query or '').strip().lower()
+        if whole in self._name_ids and whole not in terms:
+            terms = [whole]
+
+        if terms:
+            total: Optional[Dict[int, int]] = None
+            for term in terms:
+                scores = self._score_term(term)
+                if total is None:
+                    total = scores
+                else:
+                    total = {voice_id: total[voice_id] + score for voice_id, score in scores.items() if voice_id in total}
+                if not total:
+                    return []
+        else:
+            total = {voice_id: 0 for voice_id in range(len(self.voices))}
+
+        ranked = sorted(
+            (voice_id for voice_id in total
+             if allowed is None or self.voices[voice_id].name in allowed),
+            key=lambda voice_id: (-total[voice_id], len(self.voices[voice_id].name), self.voices[voice_id].name)
+        )
+        return [(self.voices[voice_id], self.categories[voice_id], total[voice_id]) for voice_id in ranked[:limit]]
@@ -1,11 +1,47 @@
 """历史记录服务"""
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import io
+import csv
+import base64
+import json
+import zlib
+from typing import List, Dict, Any, Iterator, Optional
+from datetime import datetime, date, timedelta
 
 from ..utils.logger import LoggerMixin
 
 
+# 支持的导出格式及其MIME类型
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# /api/history 返回的列
+HISTORY_COLUMNS = (
+    'id', 'ts_ms', 'voice', 'mode', 'status', 'format', 'text_length',
+    'duration', 'audio_size', 'error_message', 'request_id'
+)
+
+# 每页最大行数
+HISTORY_MAX_LIMIT = 500
+
+
+def encode_history_cursor(ts_ms: int, row_id: int) -> str:
+    """把分页位置编码为不透明游标"""
+    return base64.urlsafe_b64encode(f"{ts_ms}:{row_id}".encode()).decode().rstrip('=')
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """解析游标，返回 (ts_ms, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts_ms, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+        return int(ts_ms), int(row_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
 class HistoryService(LoggerMixin):
     """历史记录服务类"""
     
@@ -13,28 +49,75 @@ class HistoryService(LoggerMixin):
         from flask import current_app
         self.db_manager = db_manager or current_app.config.get('DB_MANAGER')
     
-    def get_generation_stats(self) -> Dict[str, Any]:
+    def get_generation_stats(self, recent_limit: int = 50) -> Dict[str, Any]:
         """获取生成统计数据"""
         if not self.db_manager:
             return {"success": False, "error": "数据库管理器未配置"}
         
         try:
-            return self.db_manager.get_generation_stats()
+            return self.db_manager.get_generation_stats(recent_limit=recent_limit)
         except Exception as e:
             self.logger.error(f"获取统计数据失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def export_logs_csv(self) -> Dict[str, Any]:
-        """导出日志为CSV格式"""
+    def stream_logs(self,
+                    format: str = 'csv',
+                    start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None,
+                    compress: bool = False,
+                    batch_size: int = 1000) -> Iterator[bytes]:
+        """
+        流式导出生成日志
+        
+        按批读取游标并逐批编码输出，内存占用与表大小无关。
+        
+        Args:
+            format: csv 或 ndjson
+            start_ms: 起始时间（含）
+            end_ms: 结束时间（不含）
+            compress: 是否输出gzip
+            batch_size: 每批行数
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {format}")
         if not self.db_manager:
-            return {"success": False, "error": "数据库管理器未配置"}
+            raise RuntimeError("数据库管理器未配置")
         
-        try:
-            data = self.db_manager.export_logs_csv()
-            return {"success": True, "data": data}
-        except Exception as e:
-            self.logger.error(f"导出日志失败: {str(e)}")
-            return {"success": False, "error": str(e)}
+        columns = self.db_manager.get_log_columns()
+        chunks = self._encode_logs(format, columns, self.db_manager.iter_logs(start_ms, end_ms, batch_size))
+        return self._gzip(chunks) if compress else chunks
+    
+    def _gzip(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """流式gzip压缩"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip 格式
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    
+    def _encode_logs(self, format: str, columns: List[str], batches) -> Iterator[bytes]:
+        """把分批读取的行编码为CSV或NDJSON字节块"""
+        count = 0
+        if format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            # 使用BOM以支持Excel
+            yield buffer.getvalue().encode('utf-8-sig')
+            for rows in batches:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                count += len(rows)
+                yield buffer.getvalue().encode('utf-8')
+        else:
+            for rows in batches:
+                lines = [json.dumps(dict(zip(columns, row)), ensure_ascii=False) for row in rows]
+                count += len(rows)
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+        
+        self.logger.info(f"导出生成日志完成 | 格式: {format} | 行数: {count}")
     
     def cleanup_old_logs(self, days: int = 30) -> Dict[str, Any]:
         """清理旧日志"""
@@ -52,6 +135,120 @@ class HistoryService(LoggerMixin):
             self.logger.error(f"清理日志失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def get_history(self,
+                    limit: int = 50,
+                    cursor: Optional[str] = None,
+                    voice: Optional[str] = None,
+                    status: Optional[str] = None,
+                    mode: Optional[str] = None,
+                    start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        分页获取生成历史
+        
+        按 (ts_ms, id) 倒序做键集分页，翻页代价与页码无关。
+        返回紧凑格式：列名只出现一次，每行是值数组。
+        
+        Args:
+            limit: 每页行数（1-HISTORY_MAX_LIMIT）
+            cursor: 上一页返回的 next_cursor
+        
+        Raises:
+            ValueError: 游标无效时
+        """
+        if not self.db_manager:
+            return {"success": False, "error": "数据库管理器未配置"}
+        
+        limit = max(1, min(int(limit), HISTORY_MAX_LIMIT))
+        before = decode_history_cursor(cursor) if cursor else None
+        
+        try:
+            # 多取一行用于判断是否还有下一页
+            rows = self.db_manager.page_logs(
+                HISTORY_COLUMNS, limit + 1, before,
+                start_ms=start_ms, end_ms=end_ms, voice=voice, status=status, mode=mode
+            )
+        except Exception as e:
+            self.logger.error(f"获取生成历史失败: {str(e)}")
+            return {"success": False, "error": str(e)}
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_history_cursor(last['ts_ms'], last['id'])
+        
+        return {
+            "success": True,
+            "columns": list(HISTORY_COLUMNS),
+            "rows": [list(row) for row in rows],
+            "next_cursor": next_cursor
+        }
+    
+    def get_performance_stats(self,
+                              start_ms: Optional[int] = None,
+                              end_ms: Optional[int] = None,
+                              bucket: str = 'hour') -> Dict[str, Any]:
+        """
+        获取延迟分位数、吞吐、耗时回归与错误率时间序列
+        
+        Raises:
+            ValueError: 时间粒度无效时
+        """
+        from ..utils.analytics import analytics_available, get_performance_analytics, BUCKETS
+        
+        if not self.db_manager:
+            return {"success": False, "error": "数据库管理器未配置"}
+        if not analytics_available():
+            return {"success": False, "error": "性能分析需要安装 numpy"}
+        if bucket not in BUCKETS:
+            raise ValueError(f"不支持的时间粒度: {bucket}")
+        
+        try:
+            analytics = get_performance_analytics(self.db_manager)
+            return self.db_manager.stats_cache.get_or_compute(
+                ('performance', start_ms, end_ms, bucket),
+                lambda: analytics.analyze(start_ms, end_ms, bucket)
+            )
+        except Exception as e:
+            self.logger.error(f"获取性能统计失败: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def get_segment_stats(self,
+                          group_by: str = 'voice',
+                          start_ms: Optional[int] = None,
+                          end_ms: Optional[int] = None,
+                          slow_seconds: float = 5.0) -> Dict[str, Any]:
+        """
+        按语音、分段长度或小时统计上游调用的耗时、慢调用率、错误率与重试
+        
+        Raises:
+            ValueError: 分组方式无效时
+        """
+        if not self.db_manager:
+            return {"success": False, "error": "数据库管理器未配置"}
+        
+        groups = self.db_manager.get_segment_stats(group_by, start_ms, end_ms, slow_seconds)
+        return {
+            "success": True,
+            "group_by": group_by,
+            "slow_seconds": slow_seconds,
+            "groups": groups
+        }
+    
+    def get_request_segments(self, request_id: str) -> Dict[str, Any]:
+        """获取一次请求的分段明细"""
+        if not self.db_manager:
+            return {"success": False, "error": "数据库管理器未配置"}
+        
+        try:
+            segments = self.db_manager.get_request_segments(request_id)
+            return {"success": True, "request_id": request_id, "segments": segments}
+        except Exception as e:
+            self.logger.error(f"获取分段明细失败: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
     def get_recent_generations(self, limit: int = 50) -> List[Dict[str, Any]]:
         """获取最近的生成记录"""
         if not self.db_manager:
@@ -61,7 +258,7 @@ class HistoryService(LoggerMixin):
             with self.db_manager.get_connection() as conn:
                 cursor = conn.execute('''
                     SELECT * FROM generation_logs
-                    ORDER BY timestamp DESC
+                    ORDER BY ts_ms DESC
                     LIMIT ?
                 ''', (limit,))
                 
@@ -90,123 +287,132 @@ class HistoryService(LoggerMixin):
             return {}
         
         try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.execute('''
-                    SELECT 
-                        voice,
-                        COUNT(*) as usage_count,
-                        SUM(text_length) as total_chars,
-                        AVG(duration) as avg_duration,
-                        SUM(audio_size) as total_size
-                    FROM generation_logs
-                    WHERE status = 'success'
-                    GROUP BY voice
-                    ORDER BY usage_count DESC
-                ''')
-                
-                stats = {}
-                for row in cursor.fetchall():
-                    voice_data = dict(row)
-                    voice_data['avg_duration'] = round(voice_data['avg_duration'] or 0, 2)
-                    voice_data['total_size_mb'] = round((voice_data['total_size'] or 0) / 1024 / 1024, 2)
-                    stats[voice_data['voice']] = voice_data
-                
-                return stats
-                
+            return self.db_manager.stats_cache.get_or_compute('voice_usage', self._query_voice_usage_stats)
         except Exception as e:
             self.logger.error(f"获取语音统计失败: {str(e)}")
             return {}
     
+    def _query_voice_usage_stats(self) -> Dict[str, Any]:
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute('''
+                SELECT 
+                    voice,
+                    SUM(count) as usage_count,
+                    SUM(chars) as total_chars,
+                    SUM(duration_sum) / NULLIF(SUM(duration_count), 0) as avg_duration,
+                    SUM(audio_size_sum) as total_size,
+                    SUM(audio_duration_sum) as total_audio_duration,
+                    SUM(rtf_duration_sum) / NULLIF(SUM(audio_duration_sum), 0) as rtf
+                FROM stats_daily
+                WHERE status = 'success'
+                GROUP BY voice
+                ORDER BY usage_count DESC
+            ''')
+            
+            stats = {}
+            for row in cursor.fetchall():
+                voice_data = dict(row)
+                voice_data['avg_duration'] = round(voice_data['avg_duration'] or 0, 2)
+                voice_data['total_size_mb'] = round((voice_data['total_size'] or 0) / 1024 / 1024, 2)
+                voice_data['total_audio_duration'] = round(voice_data['total_audio_duration'] or 0, 2)
+                voice_data['rtf'] = round(voice_data['rtf'], 3) if voice_data['rtf'] is not None else None
+                stats[voice_data['voice']] = voice_data
+            
+            return stats
+    
     def get_daily_stats(self, days: int = 30) -> List[Dict[str, Any]]:
         """获取每日统计"""
         if not self.db_manager:
             return []
         
         try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.execute('''
-                    SELECT 
-                        DATE(timestamp) as date,
-                        COUNT(*) as total_count,
-                        SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success_count,
-                        SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count,
-                        SUM(text_length) as total_chars,
-                        AVG(duration) as avg_duration,
-                        SUM(audio_size) as total_size
-                    FROM generation_logs
-                    WHERE DATE(timestamp) >= DATE('now', '-{} days')
-                    GROUP BY DATE(timestamp)
-                    ORDER BY date DESC
-                '''.format(days))
-                
-                stats = []
-                for row in cursor.fetchall():
-                    day_data = dict(row)
-                    day_data['success_rate'] = round(
-                        (day_data['success_count'] / day_data['total_count'] * 100) if day_data['total_count'] > 0 else 0, 
-                        1
-                    )
-                    day_data['avg_duration'] = round(day_data['avg_duration'] or 0, 2)
-                    day_data['total_size_mb'] = round((day_data['total_size'] or 0) / 1024 / 1024, 2)
-                    stats.append(day_data)
-                
-                return stats
-                
+            return self.db_manager.stats_cache.get_or_compute(('daily_stats', days), lambda: self._query_daily_stats(days))
         except Exception as e:
             self.logger.error(f"获取每日统计失败: {str(e)}")
             return []
     
+    def _query_daily_stats(self, days: int) -> List[Dict[str, Any]]:
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute('''
+                SELECT 
+                    date,
+                    SUM(count) as total_count,
+                    SUM(CASE WHEN status = 'success' THEN count ELSE 0 END) as success_count,
+                    SUM(CASE WHEN status = 'error' THEN count ELSE 0 END) as error_count,
+                    SUM(chars) as total_chars,
+                    SUM(duration_sum) / NULLIF(SUM(duration_count), 0) as avg_duration,
+                    SUM(audio_size_sum) as total_size
+                FROM stats_daily
+                WHERE date >= ?
+                GROUP BY date
+                ORDER BY date DESC
+            ''', ((date.today() - timedelta(days=days)).isoformat(),))
+            
+            stats = []
+            for row in cursor.fetchall():
+                day_data = dict(row)
+                day_data['success_rate'] = round(
+                    (day_data['success_count'] / day_data['total_count'] * 100) if day_data['total_count'] > 0 else 0, 
+                    1
+                )
+                day_data['avg_duration'] = round(day_data['avg_duration'] or 0, 2)
+                day_data['total_size_mb'] = round((day_data['total_size'] or 0) / 1024 / 1024, 2)
+                stats.append(day_data)
+            
+            return stats
+    
     def get_error_analysis(self) -> Dict[str, Any]:
         """获取错误分析"""
         if not self.db_manager:
             return {}
         
         try:
-            with self.db_manager.get_connection() as conn:
-                # 错误类型统计
-                cursor = conn.execute('''
-                    SELECT 
-                        error_message,
-                        COUNT(*) as count,
-                        MAX(timestamp) as last_occurrence
-                    FROM generation_logs
-                    WHERE status = 'error' AND error_message IS NOT NULL
-                    GROUP BY error_message
-                    ORDER BY count DESC
-                    LIMIT 20
-                ''')
-                
-                error_types = []
-                for row in cursor.fetchall():
-                    error_data = dict(row)
-                    try:
-                        dt = datetime.fromisoformat(error_data['last_occurrence'])
-                        error_data['last_occurrence_formatted'] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    except:
-                        error_data['last_occurrence_formatted'] = error_data['last_occurrence']
-                    error_types.append(error_data)
-                
-                # 总体错误率
-                cursor = conn.execute('''
-                    SELECT 
-                        COUNT(*) as total_requests,
-                        SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count
-                    FROM generation_logs
-                ''')
-                
-                totals = cursor.fetchone()
-                error_rate = round(
-                    (totals['error_count'] / totals['total_requests'] * 100) if totals['total_requests'] > 0 else 0,
-                    2
-                )
-                
-                return {
-                    "error_types": error_types,
-                    "total_requests": totals['total_requests'],
-                    "error_count": totals['error_count'],
-                    "error_rate": error_rate
-                }
-                
+            return self.db_manager.stats_cache.get_or_compute('error_analysis', self._query_error_analysis)
         except Exception as e:
             self.logger.error(f"获取错误分析失败: {str(e)}")
             return {}
+    
+    def _query_error_analysis(self) -> Dict[str, Any]:
+        with self.db_manager.get_connection() as conn:
+            # 错误类型统计（按错误指纹归类）
+            cursor = conn.execute('''
+                SELECT 
+                    fingerprint,
+                    pattern,
+                    sample_message as error_message,
+                    count,
+                    last_seen_ms as last_occurrence_ms
+                FROM error_fingerprints
+                ORDER BY count DESC
+                LIMIT 20
+            ''')
+            
+            error_types = []
+            for row in cursor.fetchall():
+                error_data = dict(row)
+                last_ms = error_data.pop('last_occurrence_ms')
+                dt = datetime.fromtimestamp(last_ms / 1000) if last_ms else None
+                error_data['last_occurrence'] = dt.isoformat() if dt else None
+                error_data['last_occurrence_formatted'] = dt.strftime('%Y-%m-%d %H:%M:%S') if dt else None
+                error_types.append(error_data)
+            
+            # 总体错误率
+            cursor = conn.execute('''
+                SELECT 
+                    COALESCE(SUM(count), 0) as total_requests,
+                    COALESCE(SUM(CASE WHEN status = 'error' THEN count ELSE 0 END), 0) as error_count
+                FROM stats_daily
+            ''')
+            
+            totals = cursor.fetchone()
+            error_rate = round(
+                (totals['error_count'] / totals['total_requests'] * 100) if totals['total_requests'] > 0 else 0,
+                2
+            )
+            
+            return {
+                "error_types": error_types,
+                "total_requests": totals['total_requests'],
+                "error_count": totals['error_count'],
+                "error_rate": error_rate
+            }
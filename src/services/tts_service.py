@@ -3,13 +3,18 @@
 import requests
 import time
 import io
-from typing import Iterator, Optional, Dict, Any
+import uuid
+from typing import Iterator, Optional, Dict, Any, Tuple
 from flask import current_app
 
 from ..models.tts_request import TTSRequest, TTSResponse, StreamingTTSResponse
-from ..utils.logger import LoggerMixin
+from ..utils.logger import LoggerMixin, LOG_SAMPLER
 from ..utils.helpers import split_text_for_streaming, calculate_timeout, Timer
 from ..utils.validators import RequestValidator
+from ..utils.tracing import trace_span
+from ..utils.log_writer import get_log_writer
+from ..utils.audio_info import audio_duration
+from ..utils.metrics import UPSTREAM_REQUESTS, UPSTREAM_REQUEST_SECONDS, STREAM_TTFB_SECONDS, STREAM_SEGMENTS
 
 
 class TTSService(LoggerMixin):
@@ -27,6 +32,8 @@ class TTSService(LoggerMixin):
         
     def generate_speech(self, request: TTSRequest) -> TTSResponse:
         """生成语音"""
+        # 上游调用结果，附在响应中供分段明细使用
+        upstream: Dict[str, Any] = {}
         try:
             # 验证请求
             validation_result = self.validator.validate_tts_request(request.to_dict())
@@ -47,7 +54,8 @@ class TTSService(LoggerMixin):
             # 计算超时时间
             timeout = calculate_timeout(request.text_length)
             
-            self.logger.info(f"TTS生成开始 | 字符数: {request.text_length} | 语音: {request.voice} | 格式: {request.response_format}")
+            self.logger.info(f"TTS生成开始 | 字符数: {request.text_length} | 语音: {request.voice} | 格式: {request.response_format}",
+                             extra={'sample_key': 'tts.start', 'job_id': request.request_id})
             
             # 发送请求，优化连接设置
             session = requests.Session()
@@ -73,55 +81,89 @@ class TTSService(LoggerMixin):
             session.mount("http://", adapter)
             session.mount("https://", adapter)
             
-            response = session.post(url, json=data, timeout=(30, timeout), stream=False)
+            upstream_start = time.time()
+            with trace_span(request.request_id, 'upstream.call', chars=request.text_length) as span:
+                try:
+                    response = session.post(url, json=data, timeout=(30, timeout), stream=False)
+                    upstream_status = str(response.status_code)
+                except requests.exceptions.Timeout:
+                    upstream_status = 'timeout'
+                    raise
+                except requests.exceptions.RequestException:
+                    upstream_status = 'error'
+                    raise
+                finally:
+                    upstream['status'] = upstream_status
+                    upstream['seconds'] = time.time() - upstream_start
+                    UPSTREAM_REQUESTS.labels(upstream_status).inc()
+                    UPSTREAM_REQUEST_SECONDS.labels(upstream_status).observe(upstream['seconds'])
+                    if span is not None:
+                        span.attributes['status'] = upstream_status
             response.raise_for_status()
             
             # 处理响应
             audio_data = response.content
             timer.stop()
+            audio_seconds = audio_duration(audio_data, request.response_format)
             
-            self.logger.info(f"TTS生成完成 | 耗时: {timer.elapsed:.2f}s | 音频大小: {len(audio_data)/1024:.1f}KB")
+            self.logger.info(f"TTS生成完成 | 耗时: {timer.elapsed:.2f}s | 音频大小: {len(audio_data)/1024:.1f}KB"
+                             f" | 音频时长: {f'{audio_seconds:.2f}s' if audio_seconds is not None else '未知'}",
+                             extra={'sample_key': 'tts.done', 'job_id': request.request_id})
             
             # 记录到数据库
-            if self.db_manager:
-                self.db_manager.log_generation(
-                    text_length=request.text_length,
-                    voice=request.voice,
-                    format=request.response_format,
-                    speed=request.speed,
-                    mode=request.mode,
-                    duration=timer.elapsed,
-                    audio_size=len(audio_data),
-                    status='success'
-                )
+            self._log_generation(
+                text_length=request.text_length,
+                voice=request.voice,
+                format=request.response_format,
+                speed=request.speed,
+                mode=request.mode,
+                duration=timer.elapsed,
+                audio_size=len(audio_data),
+                status='success',
+                request_id=request.request_id,
+                audio_duration=audio_seconds
+            )
             
             return TTSResponse(
                 success=True,
                 audio_data=audio_data,
                 audio_size=len(audio_data),
-                duration=timer.elapsed
+                duration=timer.elapsed,
+                audio_duration=audio_seconds,
+                upstream_status=upstream.get('status'),
+                upstream_seconds=upstream.get('seconds')
             )
             
         except requests.exceptions.Timeout:
             error_msg = "请求超时"
             self.logger.error(f"TTS生成超时: {error_msg}")
             self._log_error(request, error_msg)
-            return TTSResponse(success=False, error_message=error_msg, status_code=504)
+            return TTSResponse(success=False, error_message=error_msg, status_code=504,
+                               upstream_status=upstream.get('status'), upstream_seconds=upstream.get('seconds'))
             
         except requests.exceptions.RequestException as e:
             error_msg = self._parse_request_error(e)
             self.logger.error(f"TTS生成失败: {error_msg}")
             self._log_error(request, error_msg)
-            return TTSResponse(success=False, error_message=error_msg, status_code=getattr(e.response, 'status_code', 500))
+            return TTSResponse(success=False, error_message=error_msg, status_code=getattr(e.response, 'status_code', 500),
+                               upstream_status=upstream.get('status'), upstream_seconds=upstream.get('seconds'))
             
         except Exception as e:
             error_msg = f"未知错误: {str(e)}"
             self.logger.error(f"TTS生成异常: {error_msg}")
             self._log_error(request, error_msg)
-            return TTSResponse(success=False, error_message=error_msg, status_code=500)
+            return TTSResponse(success=False, error_message=error_msg, status_code=500,
+                               upstream_status=upstream.get('status'), upstream_seconds=upstream.get('seconds'))
     
-    def generate_streaming_speech(self, request: TTSRequest) -> Iterator[bytes]:
-        """生成流式语音"""
+    def generate_streaming_speech(self, request: TTSRequest, job_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        生成流式语音
+        
+        Args:
+            request: TTS请求
+            job_id: 队列作业ID，用于查询该请求的预计完成时间
+        """
+        job_id = job_id or uuid.uuid4().hex[:12]
         try:
             # 验证请求
             validation_result = self.validator.validate_tts_request(request.to_dict())
@@ -129,8 +171,12 @@ class TTSService(LoggerMixin):
                 raise ValueError('; '.join(validation_result['errors']))
             
             # 分割文本，限制为300字符以符合语音服务器要求
-            text_segments = split_text_for_streaming(request.input, max_length=300)
-            total_segments = len(text_segments)
+            with trace_span(request.request_id, 'text.split', chars=request.text_length) as span:
+                text_segments = split_text_for_streaming(request.input, max_length=300)
+                total_segments = len(text_segments)
+                if span is not None:
+                    span.attributes['segments'] = total_segments
+            STREAM_SEGMENTS.observe(total_segments)
             
             # 对于超长文本，记录详细信息
             if request.text_length > 50000:
@@ -167,9 +213,11 @@ class TTSService(LoggerMixin):
                 progress = (i + 1) / total_segments * 100
                 
                 if request.text_length > 10000:  # 长文本显示详细进度
-                    self.logger.info(f"提交段落 {i+1}/{total_segments} ({progress:.1f}%): {segment[:30]}...")
+                    self.logger.info(f"提交段落 {i+1}/{total_segments} ({progress:.1f}%): {segment[:30]}...",
+                                     extra={'sample_key': 'segment.submit', 'job_id': job_id})
                 else:
-                    self.logger.debug(f"提交段落 {i+1}/{total_segments}: {segment[:50]}...")
+                    self.logger.debug(f"提交段落 {i+1}/{total_segments}: {segment[:50]}...",
+                                      extra={'sample_key': 'segment.submit', 'job_id': job_id})
                 
                 # 创建段落请求
                 segment_request = TTSRequest(
@@ -178,7 +226,8 @@ class TTSService(LoggerMixin):
                     model=request.model,
                     response_format=request.response_format,
                     speed=request.speed,
-                    api_key=request.api_key
+                    api_key=request.api_key,
+                    request_id=request.request_id
                 )
                 
                 # 提交到队列，使用优先级确保顺序
@@ -188,11 +237,17 @@ class TTSService(LoggerMixin):
                     func=self._generate_segment_sync,
                     args=(segment_request, i+1, total_segments),
                     callback=segment_callback,
-                    priority=i  # 使用索引作为优先级确保顺序
+                    priority=i,  # 使用索引作为优先级确保顺序
+                    job_id=job_id,
+                    text_length=segment_request.text_length,
+                    voice=request.voice,
+                    request_id=request.request_id
                 )
             
             # 等待所有段落完成并按顺序yield结果
             yielded_segments = set()
+            # 各段音频时长之和，任意一段无法解析时不记录
+            audio_seconds = 0.0
             
             while completed_segments < total_segments:
                 time.sleep(0.1)  # 短暂等待
@@ -204,41 +259,62 @@ class TTSService(LoggerMixin):
                         segment_results[i] is not None and 
                         segment_results[i] != "processed"):
                         
-                        chunk_data = segment_results[i]
+                        # 段落的音频时长已在生成时解析，这里直接累加
+                        chunk_data, segment_seconds = segment_results[i]
+                        if not streaming_response.chunks:
+                            STREAM_TTFB_SECONDS.observe(time.time() - streaming_response.start_time)
                         streaming_response.add_chunk(chunk_data)
+                        if audio_seconds is not None:
+                            audio_seconds = audio_seconds + segment_seconds if segment_seconds is not None else None
                         yield chunk_data
                         
                         # 标记为已处理
                         segment_results[i] = "processed"
                         yielded_segments.add(i)
                         
-                        self.logger.debug(f"已输出段落 {i+1}/{total_segments}")
+                        self.logger.debug(f"已输出段落 {i+1}/{total_segments}",
+                                          extra={'sample_key': 'segment.yield', 'job_id': job_id})
             
             # 完成流式响应
             streaming_response.finalize(success=True)
             
             # 记录到数据库
-            if self.db_manager:
-                self.db_manager.log_generation(
-                    text_length=request.text_length,
-                    voice=request.voice,
-                    format=request.response_format,
-                    speed=request.speed,
-                    mode='流式',
-                    duration=streaming_response.duration,
-                    audio_size=streaming_response.total_size,
-                    status='success'
-                )
+            self._log_generation(
+                text_length=request.text_length,
+                voice=request.voice,
+                format=request.response_format,
+                speed=request.speed,
+                mode='流式',
+                duration=streaming_response.duration,
+                audio_size=streaming_response.total_size,
+                status='success',
+                request_id=request.request_id,
+                audio_duration=round(audio_seconds, 3) if audio_seconds is not None else None
+            )
             
-            self.logger.info(f"流式TTS完成 | 耗时: {streaming_response.duration:.2f}s | 总大小: {streaming_response.total_size/1024:.1f}KB")
+            # 汇总本次请求被采样省略的逐段日志
+            suppressed = LOG_SAMPLER.pop_summary(job_id)
+            if request.request_id != job_id:
+                suppressed.update(LOG_SAMPLER.pop_summary(request.request_id))
+            suppressed_total = sum(item['suppressed'] for item in suppressed.values())
+            segment_summary = ', '.join(f"{key}={item['total']}" for key, item in suppressed.items())
+            self.logger.info(
+                f"流式TTS完成 | 耗时: {streaming_response.duration:.2f}s | 总大小: {streaming_response.total_size/1024:.1f}KB"
+                f" | 分段数: {total_segments} | 省略逐段日志: {suppressed_total}"
+                f"{f' ({segment_summary})' if suppressed_total else ''}",
+                extra={'job_id': job_id}
+            )
             
         except Exception as e:
+            LOG_SAMPLER.pop_summary(job_id)
+            LOG_SAMPLER.pop_summary(request.request_id)
             error_msg = f"流式生成失败: {str(e)}"
             self.logger.error(error_msg)
             self._log_error(request, error_msg)
             raise
     
-    def _generate_segment_sync(self, segment_request: TTSRequest, segment_num: int, total_segments: int) -> bytes:
+    def _generate_segment_sync(self, segment_request: TTSRequest, segment_num: int,
+                               total_segments: int) -> Tuple[bytes, Optional[float]]:
         """
         同步生成单个段落的音频
         
@@ -248,14 +324,20 @@ class TTSService(LoggerMixin):
             total_segments: 总段落数
             
         Returns:
-            bytes: 音频数据
+            (音频数据, 音频时长)：时长无法解析时为None
         """
         max_retries = 3
         retry_count = 0
         
+        from ..utils.queue_manager import get_queue_manager
+        task = get_queue_manager().current_worker_task()
+        queue_wait = task.start_time - task.submit_time if task is not None else None
+        
         while retry_count < max_retries:
+            segment_response = None
             try:
-                self.logger.info(f"处理段落 {segment_num}/{total_segments} (队列同步处理)")
+                self.logger.info(f"处理段落 {segment_num}/{total_segments} (队列同步处理)",
+                                 extra={'sample_key': 'segment.process', 'job_id': segment_request.request_id})
                 
                 segment_response = self.generate_speech(segment_request)
                 
@@ -263,7 +345,9 @@ class TTSService(LoggerMixin):
                     if retry_count > 0:
                         self.logger.info(f"段落 {segment_num} 重试成功 (第{retry_count+1}次尝试)")
                     
-                    return segment_response.audio_data
+                    self._log_segment(segment_request, segment_num, total_segments, segment_response,
+                                      retry_count, queue_wait)
+                    return segment_response.audio_data, segment_response.audio_duration
                 else:
                     raise Exception(segment_response.error_message or "段落生成失败")
                     
@@ -272,11 +356,17 @@ class TTSService(LoggerMixin):
                 error_msg = str(e)
                 
                 if retry_count < max_retries:
+                    get_queue_manager().note_retry()
+                    
                     wait_time = retry_count * 2  # 递增等待时间：2s, 4s, 6s
                     self.logger.warning(f"段落 {segment_num} 生成失败 (第{retry_count}次): {error_msg}，{wait_time}秒后重试...")
-                    time.sleep(wait_time)
+                    with trace_span(segment_request.request_id, 'segment.retry_wait',
+                                    segment=segment_num, attempt=retry_count):
+                        time.sleep(wait_time)
                 else:
                     self.logger.error(f"段落 {segment_num} 生成失败，已达最大重试次数: {error_msg}")
+                    self._log_segment(segment_request, segment_num, total_segments, segment_response,
+                                      retry_count - 1, queue_wait, error_message=error_msg)
                     raise Exception(f"段落 {segment_num} 生成失败: {error_msg}")
     
     def test_connection(self, api_key: str) -> Dict[str, Any]:
@@ -343,15 +433,56 @@ class TTSService(LoggerMixin):
         
         return str(error)
     
+    def _log_generation(self, **fields) -> None:
+        """记录生成日志：优先交给后台写入线程批量写入，未启动时同步写入"""
+        writer = get_log_writer()
+        if writer is not None and writer.running:
+            writer.log_generation(**fields)
+        elif self.db_manager:
+            self.db_manager.log_generation(**fields)
+    
+    def _log_segment(self,
+                     segment_request: TTSRequest,
+                     segment_num: int,
+                     total_segments: int,
+                     response: Optional[TTSResponse],
+                     retries: int,
+                     queue_wait: Optional[float],
+                     error_message: Optional[str] = None) -> None:
+        """记录分段的上游调用明细（最后一次尝试的结果）"""
+        fields = dict(
+            segment_index=segment_num - 1,
+            segment_count=total_segments,
+            voice=segment_request.voice,
+            chars=segment_request.text_length,
+            upstream_seconds=response.upstream_seconds if response else None,
+            retries=retries,
+            bytes=response.audio_size if response else None,
+            http_status=response.upstream_status if response else None,
+            queue_wait=queue_wait,
+            status='error' if error_message else 'success',
+            error_message=error_message,
+            request_id=segment_request.request_id,
+            audio_duration=response.audio_duration if response else None
+        )
+        try:
+            writer = get_log_writer()
+            if writer is not None and writer.running:
+                writer.log_segment(**fields)
+            elif self.db_manager:
+                self.db_manager.insert_segment_metrics([self.db_manager.make_segment_record(**fields)])
+        except Exception as e:
+            self.logger.error(f"记录分段明细失败: {e}")
+    
     def _log_error(self, request: TTSRequest, error_message: str):
         """记录错误到数据库"""
-        if self.db_manager:
-            self.db_manager.log_generation(
-                text_length=request.text_length,
-                voice=request.voice,
-                format=request.response_format,
-                speed=request.speed,
-                mode=request.mode,
-                status='error',
-                error_message=error_message
-            )
+        self._log_generation(
+            text_length=request.text_length,
+            voice=request.voice,
+            format=request.response_format,
+            speed=request.speed,
+            mode=request.mode,
+            status='error',
+            error_message=error_message,
+            request_id=request.request_id
+        )
@@ -5,11 +5,32 @@ import base64
 from typing import List, Dict, Any, Optional
 
 from ..models.voice import Voice
+from ..models.voice_catalog import VoiceCatalog, get_voice_catalog, add_catalog_warmer, infer_gender
 from ..utils.logger import LoggerMixin
 from ..utils.helpers import get_language_from_voice, get_preview_text
-from ..config.constants import OPENAI_VOICE_MAPPING
-import json
-import os
+from ..utils.precomputed import PrecomputedResponse
+from ..utils.preview_cache import get_preview_cache
+
+
+def _voice_dict(voice: Voice) -> Dict[str, Any]:
+    """语音的输出字段（去掉对象创建时间，保证各进程生成的内容一致）"""
+    data = voice.to_dict()
+    data.pop('created_at', None)
+    data.pop('updated_at', None)
+    return data
+
+
+def _build_voices_response(catalog: VoiceCatalog) -> PrecomputedResponse:
+    """/api/voices 的预计算响应，每个目录只生成一次"""
+    return PrecomputedResponse({
+        "success": True,
+        "voices": {category: [_voice_dict(voice) for voice in voices]
+                   for category, voices in catalog.categories.items()}
+    })
+
+
+# 目录重新加载时与搜索索引一起预先生成
+add_catalog_warmer('voices_response', _build_voices_response)
 
 
 class VoiceService(LoggerMixin):
@@ -26,119 +47,16 @@ class VoiceService(LoggerMixin):
         self.api_endpoint = self.config.get('API_ENDPOINT')
     
     def get_all_voices(self) -> Dict[str, List[Voice]]:
-        """获取所有语音列表"""
-        voices_by_category = {}
-        
-        # 尝试从JSON文件加载语音列表
-        voices_data = self._load_voices_from_json()
-        
-        if voices_data and "voices" in voices_data:
-            # 使用JSON文件中的语音列表
-            for category, voice_list in voices_data["voices"].items():
-                voices = []
-                for voice_info in voice_list:
-                    if isinstance(voice_info, dict):
-                        # 新格式：包含详细信息的字典
-                        # 提取简短的语音名称（用于实际TTS调用）
-                        short_name = voice_info.get("short_name", voice_info["name"])
-                        if not short_name or short_name == voice_info["name"]:
-                            # 从完整名称中提取简短名称
-                            full_name = voice_info["name"]
-                            if "(" in full_name and ")" in full_name:
-                                # 格式: "Microsoft Server Speech Text to Speech Voice (zh-CN, XiaoxiaoNeural) (Female)"
-                                parts = full_name.split("(")
-                                if len(parts) >= 2:
-                                    locale_voice = parts[1].split(")")[0]  # "zh-CN, XiaoxiaoNeural"
-                                    if "," in locale_voice:
-                                        locale, voice_name = locale_voice.split(", ", 1)
-                                        short_name = f"{locale.strip()}-{voice_name.strip()}"
-                                    else:
-                                        short_name = locale_voice.strip()
-                        
-                        voice = Voice(
-                            name=short_name,  # 使用简短名称
-                            language=voice_info.get("locale", ""),
-                            gender=voice_info.get("gender", "Unknown"),
-                            region=voice_info.get("locale", "").split("-")[-1] if voice_info.get("locale") else "",
-                            description=f"{voice_info.get('gender', 'Unknown')} voice"
-                        )
-                    else:
-                        # 旧格式：只有语音名称的字符串
-                        gender = self._infer_gender(voice_info)
-                        voice = Voice.from_edge_tts_format(voice_info, gender)
-                    voices.append(voice)
-                
-                voices_by_category[category] = voices
-        else:
-            # 回退到默认语音列表
-            voices_by_category = self._get_default_voices()
-        
-        return voices_by_category
+        """获取所有语音列表（按分类）"""
+        return dict(get_voice_catalog().categories)
     
-    def _load_voices_from_json(self) -> Optional[Dict[str, Any]]:
-        """从JSON文件加载语音列表"""
-        try:
-            # 尝试加载完整的语音列表
-            config_dir = os.path.dirname(os.path.dirname(__file__))  # src目录
-            json_path = os.path.join(config_dir, "config", "complete_edge_voices.json")
-            
-            if os.path.exists(json_path):
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            
-            # 回退到基础语音列表
-            json_path = os.path.join(config_dir, "config", "edge_tts_voices.json")
-            if os.path.exists(json_path):
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            
-        except Exception as e:
-            self.logger.warning(f"加载语音JSON文件失败: {e}")
-        
-        return None
-    
-    def _get_default_voices(self) -> Dict[str, List[Voice]]:
-        """获取默认语音列表（回退方案）"""
-        default_voices = {
-            "OpenAI Voices": [
-                Voice(name="alloy", gender="Neutral", language="en-US"),
-                Voice(name="echo", gender="Male", language="en-US"),
-                Voice(name="fable", gender="Female", language="en-US"),
-                Voice(name="onyx", gender="Male", language="en-US"),
-                Voice(name="nova", gender="Female", language="en-US"),
-                Voice(name="shimmer", gender="Female", language="en-US"),
-            ],
-            "中文(简体)": [
-                Voice.from_edge_tts_format("zh-CN-XiaoxiaoNeural", "Female"),
-                Voice.from_edge_tts_format("zh-CN-YunxiNeural", "Male"),
-                Voice.from_edge_tts_format("zh-CN-XiaohanNeural", "Female"),
-                Voice.from_edge_tts_format("zh-CN-XiaomoNeural", "Female"),
-            ],
-            "English (US)": [
-                Voice.from_edge_tts_format("en-US-AriaNeural", "Female"),
-                Voice.from_edge_tts_format("en-US-DavisNeural", "Male"),
-                Voice.from_edge_tts_format("en-US-JennyNeural", "Female"),
-                Voice.from_edge_tts_format("en-US-GuyNeural", "Male"),
-            ]
-        }
-        return default_voices
+    def get_voices_response(self) -> PrecomputedResponse:
+        """获取语音列表的预计算响应（每个目录版本只序列化和压缩一次）"""
+        return get_voice_catalog().derived('voices_response', _build_voices_response)
     
     def get_voice_by_name(self, voice_name: str) -> Optional[Voice]:
-        """根据名称获取语音"""
-        # 检查是否是OpenAI语音
-        if voice_name in OPENAI_VOICE_MAPPING:
-            actual_voice = OPENAI_VOICE_MAPPING[voice_name]
-            gender = self._infer_gender(actual_voice)
-            return Voice.from_edge_tts_format(actual_voice, gender)
-        
-        # 检查是否在语音列表中
-        all_voices = self.get_all_voices()
-        for voice_list in all_voices.values():
-            for voice in voice_list:
-                if voice.name == voice_name:
-                    return voice
-        
-        return None
+        """根据名称获取语音（OpenAI语音返回映射到的语音）"""
+        return get_voice_catalog().get(voice_name)
     
     def get_voices_from_api(self, api_key: str) -> Dict[str, Any]:
         """从API获取语音列表"""
@@ -155,6 +73,54 @@ class VoiceService(LoggerMixin):
             self.logger.error(f"从API获取语音失败: {str(e)}")
             raise
     
+    def _render_preview(self, voice_name: str, text: str, api_key: str) -> Dict[str, Any]:
+        """调用TTS服务生成预览音频"""
+        from ..models.tts_request import TTSRequest
+        
+        request = TTSRequest(
+            input=text,
+            voice=voice_name,
+            model="tts-1",
+            response_format="mp3",
+            speed=1.0,
+            api_key=api_key
+        )
+        response = self.tts_service.generate_speech(request)
+        if response.success:
+            return {"success": True, "audio": response.audio_data}
+        return {"success": False, "error": response.error_message}
+    
+    def get_preview_audio(self, voice_name: str, api_key: str = '') -> Dict[str, Any]:
+        """
+        获取默认预览文本的音频（优先读取持久缓存，未缓存时生成并写入缓存）
+        
+        Returns:
+            {"success": True, "audio": 音频数据, "text": 预览文本, "cached": 是否命中缓存}
+        """
+        if not self.get_voice_by_name(voice_name):
+            return {"success": False, "error": f"未找到语音: {voice_name}"}
+        
+        preview_text = get_preview_text(get_language_from_voice(voice_name))
+        errors = []
+        
+        def render():
+            if not api_key:
+                errors.append("预览尚未缓存，需要提供API Key")
+                return None
+            if not self.tts_service:
+                errors.append("TTS服务未配置，无法生成音频预览")
+                return None
+            result = self._render_preview(voice_name, preview_text, api_key)
+            if not result["success"]:
+                errors.append(result["error"])
+                return None
+            return result["audio"]
+        
+        audio, cached = get_preview_cache().get_or_render(voice_name, preview_text, render)
+        if audio is None:
+            return {"success": False, "error": errors[0] if errors else "预览生成失败"}
+        return {"success": True, "audio": audio, "text": preview_text, "cached": cached}
+    
     def preview_voice(self, voice_name: str, api_key: str, custom_text: str = None) -> Dict[str, Any]:
         """预览语音"""
         try:
@@ -172,22 +138,15 @@ class VoiceService(LoggerMixin):
             
             # 如果有TTS服务，生成预览音频
             if self.tts_service:
-                from ..models.tts_request import TTSRequest
-                
-                request = TTSRequest(
-                    input=preview_text,
-                    voice=voice_name,
-                    model="tts-1",
-                    response_format="mp3",
-                    speed=1.0,
-                    api_key=api_key
-                )
-                
-                response = self.tts_service.generate_speech(request)
+                if custom_text:
+                    # 自定义文本不缓存
+                    result = self._render_preview(voice_name, preview_text, api_key)
+                else:
+                    result = self.get_preview_audio(voice_name, api_key)
                 
-                if response.success:
+                if result["success"]:
                     # 转换为base64
-                    audio_base64 = base64.b64encode(response.audio_data).decode('utf-8')
+                    audio_base64 = base64.b64encode(result["audio"]).decode('utf-8')
                     return {
                         "success": True,
                         "audio": audio_base64,
@@ -198,7 +157,7 @@ class VoiceService(LoggerMixin):
                 else:
                     return {
                         "success": False,
-                        "error": response.error_message
+                        "error": result["error"]
                     }
             else:
                 # 没有TTS服务时返回文本信息
@@ -216,65 +175,47 @@ class VoiceService(LoggerMixin):
                 "error": f"预览失败: {str(e)}"
             }
     
-    def search_voices(self, query: str, language: str = None, gender: str = None) -> List[Voice]:
-        """搜索语音"""
-        results = []
-        
-        for voices in VOICES_BY_LANGUAGE.values():
-            for voice_name in voices:
-                voice_gender = self._infer_gender(voice_name)
-                voice = Voice.from_edge_tts_format(voice_name, voice_gender)
-                
-                # 检查查询条件
-                match_query = not query or query.lower() in voice_name.lower()
-                match_language = not language or voice.matches_language(language)
-                match_gender = not gender or voice.matches_gender(gender)
-                
-                if match_query and match_language and match_gender:
-                    results.append(voice)
-        
-        return results
+    def search_voices(self, query: str, language: str = None, gender: str = None,
+                      limit: int = 20) -> List[Dict[str, Any]]:
+        """搜索语音（结果按匹配程度排序）"""
+        return [
+            dict(_voice_dict(voice), category=category, score=score)
+            for voice, category, score in get_voice_catalog().search(query, language, gender, limit)
+        ]
     
     def get_voice_statistics(self) -> Dict[str, Any]:
         """获取语音统计信息"""
+        catalog = get_voice_catalog()
         stats = {
-            "total_voices": 0,
-            "by_language": {},
-            "by_gender": {"Male": 0, "Female": 0, "Neutral": 0}
+            "total_voices": len(catalog),
+            "by_language": {category: len(voices) for category, voices in catalog.categories.items()},
+            "by_gender": {gender: len(catalog.by_gender(gender)) for gender in ("Male", "Female", "Neutral")}
         }
-        
-        for category, voices in VOICES_BY_LANGUAGE.items():
-            stats["by_language"][category] = len(voices)
-            stats["total_voices"] += len(voices)
-            
-            # 统计性别分布
-            for voice_name in voices:
-                gender = self._infer_gender(voice_name)
-                if gender in stats["by_gender"]:
-                    stats["by_gender"][gender] += 1
-        
         return stats
     
     def validate_voice(self, voice_name: str) -> Dict[str, Any]:
         """验证语音是否有效"""
+        catalog = get_voice_catalog()
+        
         # 检查OpenAI语音
-        if voice_name in OPENAI_VOICE_MAPPING:
+        if voice_name in catalog.aliases:
+            actual_voice = catalog.aliases[voice_name]
             return {
                 "valid": True,
                 "type": "openai",
-                "actual_voice": OPENAI_VOICE_MAPPING[voice_name],
-                "message": f"OpenAI语音 '{voice_name}' 映射到 '{OPENAI_VOICE_MAPPING[voice_name]}'"
+                "actual_voice": actual_voice,
+                "message": f"OpenAI语音 '{voice_name}' 映射到 '{actual_voice}'"
             }
         
         # 检查Edge-TTS语音
-        for category, voices in VOICES_BY_LANGUAGE.items():
-            if voice_name in voices:
-                return {
-                    "valid": True,
-                    "type": "edge-tts",
-                    "category": category,
-                    "message": f"Edge-TTS语音 '{voice_name}' 来自 '{category}'"
-                }
+        category = catalog.category_of(voice_name)
+        if category is not None:
+            return {
+                "valid": True,
+                "type": "edge-tts",
+                "category": category,
+                "message": f"Edge-TTS语音 '{voice_name}' 来自 '{category}'"
+            }
         
         return {
             "valid": False,
@@ -283,52 +224,4 @@ class VoiceService(LoggerMixin):
     
     def _infer_gender(self, voice_name: str) -> str:
         """推断语音性别"""
-        voice_lower = voice_name.lower()
-        
-        # OpenAI语音性别映射
-        openai_genders = {
-            "alloy": "Neutral",
-            "echo": "Male", 
-            "fable": "Female",
-            "onyx": "Male",
-            "nova": "Female",
-            "shimmer": "Female"
-        }
-        
-        if voice_name in openai_genders:
-            return openai_genders[voice_name]
-        
-        # 基于名称模式推断性别
-        female_patterns = [
-            'xiaoxiao', 'xiaohan', 'xiaomo', 'xiaorui', 'xiaoyi', 'xiaomeng', 
-            'xiaoshuang', 'xiaoxuan', 'xiaoyan', 'xiaoyou', 'xiaozhen', 'xiaochen',
-            'hsiaoche', 'hsiaoy', 'hiugaai', 'hiumaan', 'ava', 'emma', 'jenny', 
-            'aria', 'jane', 'sara', 'nancy', 'amber', 'ana', 'ashley', 'cora',
-            'elizabeth', 'michelle', 'monica', 'sonia', 'libby', 'abbi', 'bella',
-            'hollie', 'maisie', 'olivia', 'nanami', 'aoi', 'mayu', 'shiori',
-            'sunhi', 'seohy', 'yujin', 'katja', 'amala', 'elke', 'gisela',
-            'klarissa', 'louisa', 'maja', 'tanja', 'denise', 'brigitte',
-            'celeste', 'coralie', 'eloise', 'jacqueline', 'josephine', 'yvette'
-        ]
-        
-        male_patterns = [
-            'yunxi', 'yunfeng', 'yunhao', 'yunjian', 'yunxia', 'yunyang',
-            'yunye', 'yunze', 'yunjhe', 'wanlung', 'andrew', 'brian', 'guy',
-            'davis', 'jason', 'tony', 'eric', 'jacob', 'roger', 'steffan',
-            'ryan', 'alfie', 'elliot', 'ethan', 'noah', 'oliver', 'thomas',
-            'keita', 'daichi', 'naoki', 'injoon', 'bongjin', 'gookmin',
-            'jimin', 'conrad', 'bernd', 'christoph', 'kasper', 'kilian',
-            'klaus', 'ralf', 'henri', 'alain', 'claude', 'jerome', 'maurice',
-            'yves', 'alvaro', 'arnau', 'dario', 'elias', 'nil', 'saul', 'teo'
-        ]
-        
-        for pattern in female_patterns:
-            if pattern in voice_lower:
-                return "Female"
-        
-        for pattern in male_patterns:
-            if pattern in voice_lower:
-                return "Male"
-        
-        # 默认返回中性
-        return "Neutral"
+        return infer_gender(voice_name)
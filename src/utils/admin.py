@@ -0,0 +1,27 @@
+"""管理员权限工具"""
+
+import hmac
+from functools import wraps
+from flask import request, jsonify, current_app
+
+
+def is_admin_request(req=None, config=None) -> bool:
+    """检查请求是否携带有效的管理员令牌（请求头 X-Admin-Token 或查询参数 admin_token）"""
+    req = req or request
+    config = config or current_app.config.get('VOICEFORGE_CONFIG')
+    token = config.get('ADMIN_TOKEN') if config else None
+    if not token:
+        return False
+
+    provided = req.headers.get('X-Admin-Token') or req.args.get('admin_token')
+    return bool(provided) and hmac.compare_digest(provided, token)
+
+
+def admin_required(view):
+    """要求管理员令牌的路由装饰器"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({"error": "需要管理员权限"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,399 @@
+"""
+生成日志性能分析模块
+
+把 generation_logs 中分析需要的列加载为 NumPy 数组（列式存储），
+分位数、吞吐、实时率、回归和时间序列都用向量化运算完成。
+首次使用时全量加载，之后按 ID 增量追加新记录。
+
+NumPy 为可选依赖，未安装时 analytics_available() 返回 False。
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 取决于部署环境
+    np = None
+
+
+# 延迟分位数
+PERCENTILES = (50, 90, 95, 99)
+
+# 时间序列桶大小（毫秒）
+BUCKETS = {
+    'minute': 60 * 1000,
+    'hour': 3600 * 1000,
+    'day': 86400 * 1000,
+}
+
+# 分组维度
+GROUP_COLUMNS = ('voice', 'format', 'mode')
+
+# 需要求分位数的列，存储中维护按值排序的行号
+SORTED_COLUMNS = ('duration', 'chars_per_sec', 'rtf')
+
+
+def analytics_available() -> bool:
+    """是否安装了 NumPy"""
+    return np is not None
+
+
+class _Vocabulary:
+    """把字符串列编码为整数，分组运算只处理整数编码"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value) -> int:
+        value = value if value is not None else ''
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class LogColumnStore:
+    """
+    generation_logs 的内存列式副本
+
+    只保存分析需要的列；字符串列按词表编码为整数，duration 为空时记为 NaN，
+    rtf（生成耗时 / 音频时长）在音频时长未知时记为 NaN。
+    对 SORTED_COLUMNS 额外维护按值排序的行号，新记录以归并方式插入，
+    求分位数时不需要每次重新排序。
+    """
+
+    NUMERIC_COLUMNS = (
+        ('id', 'int64'),
+        ('ts_ms', 'int64'),
+        ('text_length', 'int32'),
+        ('duration', 'float64'),
+        ('chars_per_sec', 'float64'),
+        ('audio_duration', 'float64'),
+        ('rtf', 'float64'),
+        ('error', 'bool'),
+    )
+
+    def __init__(self, db_manager, batch_size: int = 50000):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.vocab: Dict[str, _Vocabulary] = {}
+        self.columns: Dict[str, Any] = {}
+        self.sorted_index: Dict[str, Any] = {}
+        self.last_id = 0
+        self.partitions: Optional[List[str]] = None
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self._reset()
+
+    def _reset(self) -> None:
+        self.vocab = {column: _Vocabulary() for column in GROUP_COLUMNS}
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.NUMERIC_COLUMNS}
+        for column in GROUP_COLUMNS:
+            self.columns[column] = np.empty(0, dtype='int16')
+        self.sorted_index = {column: np.empty(0, dtype='int64') for column in SORTED_COLUMNS}
+        self.last_id = 0
+
+    def refresh(self) -> tuple:
+        """
+        追加上次加载之后写入的记录；分区被删除时全量重新加载
+
+        Returns:
+            (列数组, 排序行号, 各分组列的取值列表)，均为快照，可在锁外使用
+        """
+        with self._lock:
+            start_time = time.time()
+            with self.db_manager.get_connection() as conn:
+                partitions = self.db_manager.list_partitions(conn)
+                if self.partitions is not None and not set(self.partitions) <= set(partitions):
+                    self._reset()
+                self.partitions = partitions
+
+                cursor = conn.execute('''
+                    SELECT id, ts_ms, text_length, duration, status, voice, format, mode, audio_duration
+                    FROM generation_logs
+                    WHERE id > ?
+                    ORDER BY id
+                ''', (self.last_id,))
+                previous_size = self.size
+                batches = []
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    batches.append(self._encode(rows))
+
+            if batches:
+                for name in self.columns:
+                    self.columns[name] = np.concatenate([self.columns[name]] + [batch[name] for batch in batches])
+                self.last_id = int(self.columns['id'][-1])
+                for column in SORTED_COLUMNS:
+                    self.sorted_index[column] = self._merge_sorted(column, previous_size)
+                self.logger.debug(f"分析列存储加载 {self.size - previous_size} 条记录 | "
+                                  f"耗时: {time.time() - start_time:.3f}s")
+
+            self.loaded_at = time.time()
+            names = {column: list(vocab.values) for column, vocab in self.vocab.items()}
+            return dict(self.columns), dict(self.sorted_index), names
+
+    def _encode(self, rows) -> Dict[str, Any]:
+        ids, ts, lengths, durations, statuses, voices, formats, modes, audio_durations = zip(*rows)
+        voice_vocab, format_vocab, mode_vocab = (self.vocab[column] for column in GROUP_COLUMNS)
+        lengths = np.array([length or 0 for length in lengths], dtype='int32')
+        durations = np.array([np.nan if d is None else d for d in durations], dtype='float64')
+        audio_durations = np.array([np.nan if d is None else d for d in audio_durations], dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chars_per_sec = np.where(durations > 0, lengths / durations, np.nan)
+            rtf = np.where(audio_durations > 0, durations / audio_durations, np.nan)
+        return {
+            'id': np.array(ids, dtype='int64'),
+            'ts_ms': np.array(ts, dtype='int64'),
+            'text_length': lengths,
+            'duration': durations,
+            'chars_per_sec': chars_per_sec,
+            'audio_duration': audio_durations,
+            'rtf': rtf,
+            'error': np.array([status == 'error' for status in statuses], dtype='bool'),
+            'voice': np.array([voice_vocab.encode(v) for v in voices], dtype='int16'),
+            'format': np.array([format_vocab.encode(v) for v in formats], dtype='int16'),
+            'mode': np.array([mode_vocab.encode(v) for v in modes], dtype='int16'),
+        }
+
+    def _merge_sorted(self, column: str, previous_size: int):
+        """把 previous_size 之后新增的行按值归并进已排序的行号（NaN 排在最后）"""
+        values = self.columns[column]
+        existing = self.sorted_index[column]
+        added = np.argsort(values[previous_size:]) + previous_size
+        if len(existing) == 0:
+            return added
+        positions = np.searchsorted(values[existing], values[added])
+        return np.insert(existing, positions, added)
+
+    @property
+    def size(self) -> int:
+        return len(self.columns['id'])
+
+
+def group_percentiles(group_keys, sorted_values, group_count: int, percentiles=PERCENTILES):
+    """
+    按分组计算分位数（线性插值），完全向量化
+
+    sorted_values 已按值升序排列，group_keys 是对应的分组编码；
+    按分组编码做一次稳定排序（int16 编码时 NumPy 使用基数排序）后，
+    每个分组成为连续且组内有序的一段，分位数位置可以直接由段起点和段长度算出。
+
+    Returns:
+        (每组样本数, 形状为 [group_count, len(percentiles)] 的分位数矩阵)
+    """
+    q = np.asarray(percentiles, dtype='float64') / 100.0
+    counts = np.bincount(group_keys, minlength=group_count)
+    if len(sorted_values) == 0:
+        return counts, np.full((group_count, len(q)), np.nan)
+
+    grouped = sorted_values[np.argsort(group_keys, kind='stable')]
+    offsets = np.cumsum(counts) - counts
+
+    positions = offsets[:, None] + (np.maximum(counts, 1) - 1)[:, None] * q[None, :]
+    lower = np.minimum(np.floor(positions).astype('int64'), len(grouped) - 1)
+    upper = np.minimum(np.ceil(positions).astype('int64'), len(grouped) - 1)
+    weight = positions - lower
+    result = grouped[lower] * (1 - weight) + grouped[upper] * weight
+    result[counts == 0] = np.nan
+    return counts, result
+
+
+def group_regression(codes, x, y, group_count: int):
+    """
+    按分组做一元线性回归 y = intercept + slope * x
+
+    用 bincount 累加各组的 Σx、Σy、Σxx、Σxy、Σyy，一次遍历得到全部分组的闭式解。
+
+    Returns:
+        (样本数, 斜率, 截距, R²)，样本不足或 x 无变化的组为 NaN
+    """
+    n = np.bincount(codes, minlength=group_count).astype('float64')
+    sx = np.bincount(codes, weights=x, minlength=group_count)
+    sy = np.bincount(codes, weights=y, minlength=group_count)
+    sxx = np.bincount(codes, weights=x * x, minlength=group_count)
+    sxy = np.bincount(codes, weights=x * y, minlength=group_count)
+    syy = np.bincount(codes, weights=y * y, minlength=group_count)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        cov = n * sxy - sx * sy
+        slope = np.where(var_x > 0, cov / var_x, np.nan)
+        intercept = (sy - slope * sx) / n
+        r2 = np.where((var_x > 0) & (var_y > 0), cov * cov / (var_x * var_y), np.nan)
+    return n, slope, intercept, r2
+
+
+def _round(value, digits: int = 3):
+    """NaN 转为 None，便于 JSON 序列化"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+class PerformanceAnalytics:
+    """基于列式存储的性能分析"""
+
+    def __init__(self, db_manager):
+        self.store = LogColumnStore(db_manager)
+
+    def analyze(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                bucket: str = 'hour') -> Dict[str, Any]:
+        """
+        计算时间范围内的性能统计
+
+        Args:
+            start_ms: 起始时间（含），默认不限
+            end_ms: 结束时间（不含），默认不限
+            bucket: 错误率时间序列的桶大小，minute / hour / day
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"不支持的时间粒度: {bucket}")
+
+        columns, sorted_index, names = self.store.refresh()
+        start_time = time.perf_counter()
+
+        in_window = np.ones(len(columns['id']), dtype='bool')
+        if start_ms is not None:
+            in_window &= columns['ts_ms'] >= start_ms
+        if end_ms is not None:
+            in_window &= columns['ts_ms'] < end_ms
+
+        # 延迟与吞吐只统计成功且有耗时的记录（NaN 比较结果为False）
+        ok = in_window & ~columns['error'] & (columns['duration'] > 0)
+        # 按值排序的行号在各分组维度间复用
+        orders = {column: index[ok[index]] for column, index in sorted_index.items()}
+        # 音频时长未知的记录 rtf 为 NaN，排在末尾，截掉即可
+        orders['rtf'] = orders['rtf'][:np.count_nonzero(~np.isnan(columns['rtf'][orders['rtf']]))]
+        ordered = {column: columns[column][order] for column, order in orders.items()}
+        success = {name: columns[name][ok] for name in GROUP_COLUMNS + ('duration', 'text_length')}
+
+        window_ts = columns['ts_ms'][in_window]
+        window_errors = columns['error'][in_window]
+        result = {
+            "success": True,
+            "total_count": len(window_ts),
+            "error_count": int(window_errors.sum()),
+            "latency": {
+                column: self._latency_by(column, names[column], columns, orders, ordered, success)
+                for column in GROUP_COLUMNS
+            },
+            "rtf": self._rtf_by_voice(names['voice'], columns, orders, ordered),
+            "regression": self._regression_by_voice(names['voice'], success),
+            "error_rate_series": self._error_series(window_ts, window_errors, bucket),
+        }
+        result["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+        result["rows_loaded"] = len(columns['id'])
+        return result
+
+    def _latency_by(self, column: str, names: List[str], columns, orders, ordered,
+                    success) -> List[Dict[str, Any]]:
+        """按维度统计延迟分位数与每秒字符数"""
+        group_count = len(names)
+        counts, quantiles = group_percentiles(
+            columns[column][orders['duration']], ordered['duration'], group_count)
+        _, cps_quantiles = group_percentiles(
+            columns[column][orders['chars_per_sec']], ordered['chars_per_sec'], group_count, (50,))
+
+        codes = success[column]
+        duration_sum = np.bincount(codes, weights=success['duration'], minlength=group_count)
+        chars_sum = np.bincount(codes, weights=success['text_length'], minlength=group_count)
+
+        groups = []
+        for code in np.flatnonzero(counts):
+            groups.append({
+                column: names[code],
+                "count": int(counts[code]),
+                "mean": _round(duration_sum[code] / counts[code]),
+                **{f"p{p}": _round(quantiles[code, i]) for i, p in enumerate(PERCENTILES)},
+                # 总字符数 / 总耗时，以及单次请求每秒字符数的中位数
+                "chars_per_sec": _round(chars_sum[code] / duration_sum[code], 1),
+                "chars_per_sec_p50": _round(cps_quantiles[code, 0], 1),
+            })
+        groups.sort(key=lambda item: item['count'], reverse=True)
+        return groups
+
+    def _rtf_by_voice(self, names: List[str], columns, orders, ordered) -> List[Dict[str, Any]]:
+        """每个语音的实时率分位数，小于1表示生成快于播放"""
+        group_count = len(names)
+        codes = columns['voice'][orders['rtf']]
+        counts, quantiles = group_percentiles(codes, ordered['rtf'], group_count)
+        audio_sum = np.bincount(codes, weights=columns['audio_duration'][orders['rtf']], minlength=group_count)
+        duration_sum = np.bincount(codes, weights=columns['duration'][orders['rtf']], minlength=group_count)
+
+        voices = []
+        for code in np.flatnonzero(counts):
+            voices.append({
+                "voice": names[code],
+                "count": int(counts[code]),
+                "audio_duration": _round(audio_sum[code], 1),
+                # 总生成耗时 / 总音频时长
+                "rtf": _round(duration_sum[code] / audio_sum[code]),
+                **{f"p{p}": _round(quantiles[code, i]) for i, p in enumerate(PERCENTILES)},
+            })
+        voices.sort(key=lambda item: item['count'], reverse=True)
+        return voices
+
+    def _regression_by_voice(self, names: List[str], success) -> List[Dict[str, Any]]:
+        """每个语音的耗时对文本长度回归：耗时 ≈ 固定开销 + 每字符耗时 × 字符数"""
+        n, slope, intercept, r2 = group_regression(
+            success['voice'], success['text_length'].astype('float64'), success['duration'], len(names)
+        )
+        voices = []
+        for code in np.flatnonzero(n >= 2):
+            voices.append({
+                "voice": names[code],
+                "count": int(n[code]),
+                "ms_per_char": _round(slope[code] * 1000),
+                "overhead_sec": _round(intercept[code]),
+                "r2": _round(r2[code]),
+            })
+        voices.sort(key=lambda item: item['count'], reverse=True)
+        return voices
+
+    def _error_series(self, ts_ms, errors, bucket: str) -> List[Dict[str, Any]]:
+        """按时间桶统计请求数与错误率，桶边界按本地时间对齐"""
+        if len(ts_ms) == 0:
+            return []
+        size = BUCKETS[bucket]
+        offset = time.localtime().tm_gmtoff * 1000
+        local_ts = ts_ms + offset
+        first = local_ts.min() // size
+        index = local_ts // size - first
+
+        totals = np.bincount(index)
+        error_counts = np.bincount(index, weights=errors, minlength=len(totals))
+        series = []
+        for i in np.flatnonzero(totals):
+            series.append({
+                "ts_ms": int((first + i) * size - offset),
+                "count": int(totals[i]),
+                "error_count": int(error_counts[i]),
+                "error_rate": round(float(error_counts[i] / totals[i] * 100), 2),
+            })
+        return series
+
+
+# 全局分析实例
+_analytics: Optional[PerformanceAnalytics] = None
+_analytics_lock = threading.Lock()
+
+
+def get_performance_analytics(db_manager) -> PerformanceAnalytics:
+    """获取全局性能分析实例（需要 NumPy）"""
+    global _analytics
+    if np is None:
+        raise RuntimeError("性能分析需要安装 numpy")
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = PerformanceAnalytics(db_manager)
+    return _analytics
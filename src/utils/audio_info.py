@@ -0,0 +1,230 @@
+"""
+音频时长解析模块
+
+只读取容器/帧头计算音频时长，不解码音频数据：
+    mp3:  逐帧读取帧头（有 Xing/Info 头时直接取总帧数）
+    wav:  RIFF fmt 块与 data 块长度
+    pcm:  按上游默认的 24kHz 16bit 单声道换算
+    opus: Ogg 最后一页的 granule position 减去 pre-skip
+    flac: STREAMINFO 中的总采样数
+    aac:  逐帧读取 ADTS 帧头
+"""
+
+import struct
+from typing import Optional
+
+
+# 上游 pcm 格式的参数（OpenAI 兼容接口：24kHz、16bit、单声道）
+PCM_SAMPLE_RATE = 24000
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+# MPEG 版本 -> 采样率表；版本位: 0=2.5, 2=2, 3=1
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+# 比特率表（kbps），按 (是否 MPEG1, 层) 索引
+_MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_AAC_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050,
+                     16000, 12000, 11025, 8000, 7350)
+
+
+def audio_duration(data: bytes, audio_format: str) -> Optional[float]:
+    """
+    计算音频时长（秒）
+
+    Args:
+        data: 完整的音频数据
+        audio_format: mp3 / wav / pcm / opus / flac / aac
+
+    Returns:
+        时长；格式不支持或数据无法解析时返回None
+    """
+    parser = _PARSERS.get((audio_format or '').lower())
+    if parser is None or not data:
+        return None
+    try:
+        duration = parser(data)
+    except (struct.error, IndexError, ValueError, ZeroDivisionError):
+        return None
+    return round(duration, 3) if duration is not None else None
+
+
+def _skip_id3(data: bytes) -> int:
+    """跳过 ID3v2 标签，返回音频帧起始位置"""
+    if data[:3] != b'ID3' or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _mp3_frame(data: bytes, offset: int) -> Optional[tuple]:
+    """解析 offset 处的帧头，返回 (帧长度, 每帧采样数, 采样率, 声道数)"""
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack_from('>I', data, offset)[0]
+    if header & 0xffe00000 != 0xffe00000:
+        return None
+    version = (header >> 19) & 0x3
+    layer = 4 - ((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xf
+    rate_index = (header >> 10) & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 0x1
+    channels = 1 if (header >> 6) & 0x3 == 3 else 2
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, channels
+    samples = 1152 if layer == 2 or mpeg1 else 576
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, channels
+
+
+def _mp3_xing_frames(data: bytes, offset: int, mpeg1: bool, channels: int) -> Optional[int]:
+    """读取首帧中的 Xing/Info 头记录的总帧数"""
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    position = offset + 4 + side_info
+    if data[position:position + 4] not in (b'Xing', b'Info'):
+        return None
+    flags = struct.unpack_from('>I', data, position + 4)[0]
+    if not flags & 0x1:
+        return None
+    return struct.unpack_from('>I', data, position + 8)[0]
+
+
+def _mp3_duration(data: bytes) -> Optional[float]:
+    offset = _skip_id3(data)
+    # 容忍开头的少量垃圾字节
+    limit = min(len(data), offset + 4096)
+    while offset < limit and _mp3_frame(data, offset) is None:
+        offset += 1
+
+    first = _mp3_frame(data, offset)
+    if first is None:
+        return None
+    frame_length, samples, sample_rate, channels = first
+    mpeg1 = sample_rate >= 32000
+
+    frames = _mp3_xing_frames(data, offset, mpeg1, channels)
+    if frames:
+        return frames * samples / sample_rate
+
+    # 多段拼接的流式音频中间可能有新的 ID3 标签或不同采样率的帧，按帧累加
+    total = 0.0
+    end = len(data)
+    while offset < end:
+        frame = _mp3_frame(data, offset)
+        if frame is None:
+            skip = _skip_id3(data[offset:offset + 10])
+            if skip:
+                offset += skip
+                continue
+            offset += 1
+            continue
+        frame_length, samples, sample_rate, _ = frame
+        if offset + frame_length > end:
+            # 末尾不完整的帧按比例计入
+            total += samples / sample_rate * (end - offset) / frame_length
+            break
+        total += samples / sample_rate
+        offset += frame_length
+    return total
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+    offset = 12
+    byte_rate = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from('<I', data, offset + 4)[0]
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack_from('<I', data, offset + 16)[0]
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # 流式输出的 data 块长度可能是占位值，以实际数据为准
+            available = len(data) - offset - 8
+            return min(chunk_size, available) / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _pcm_duration(data: bytes) -> float:
+    return len(data) / (PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH * PCM_CHANNELS)
+
+
+def _opus_duration(data: bytes) -> Optional[float]:
+    head = data.find(b'OpusHead')
+    if head < 0:
+        return None
+    pre_skip = struct.unpack_from('<H', data, head + 10)[0]
+
+    # 最后一个 Ogg 页的 granule position 是总采样数（固定按48kHz计）
+    last_page = data.rfind(b'OggS')
+    while last_page >= 0:
+        granule = struct.unpack_from('<q', data, last_page + 6)[0]
+        if granule >= 0:
+            return max(granule - pre_skip, 0) / 48000
+        last_page = data.rfind(b'OggS', 0, last_page)
+    return None
+
+
+def _flac_duration(data: bytes) -> Optional[float]:
+    if data[:4] != b'fLaC':
+        return None
+    # 第一个元数据块必须是 STREAMINFO
+    if data[4] & 0x7f != 0:
+        return None
+    info = data[8:8 + 34]
+    sample_rate = int.from_bytes(info[10:13], 'big') >> 4
+    total_samples = int.from_bytes(info[13:18], 'big') & 0xfffffffff
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+def _aac_duration(data: bytes) -> Optional[float]:
+    offset = 0
+    total = 0.0
+    end = len(data)
+    while offset + 7 <= end:
+        if data[offset] != 0xff or data[offset + 1] & 0xf6 != 0xf0:
+            offset += 1
+            continue
+        rate_index = (data[offset + 2] >> 2) & 0xf
+        frame_length = ((data[offset + 3] & 0x3) << 11) | (data[offset + 4] << 3) | (data[offset + 5] >> 5)
+        if rate_index >= len(_AAC_SAMPLE_RATES) or frame_length < 7:
+            offset += 1
+            continue
+        blocks = (data[offset + 6] & 0x3) + 1
+        total += 1024 * blocks / _AAC_SAMPLE_RATES[rate_index]
+        offset += frame_length
+    return total or None
+
+
+_PARSERS = {
+    'mp3': _mp3_duration,
+    'wav': _wav_duration,
+    'pcm': _pcm_duration,
+    'opus': _opus_duration,
+    'flac': _flac_duration,
+    'aac': _aac_duration,
+}
@@ -0,0 +1,102 @@
+"""进程内TTL缓存模块"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .metrics import record_cache
+
+
+class TTLCache:
+    """
+    带过期时间的结果缓存
+
+    - 条目在 ttl 秒后过期，invalidate() 可立即清空（例如有新数据写入时）
+    - 同一个键同时只有一个线程重新计算：条目过期时其他线程继续返回旧值，
+      条目不存在时其他线程等待计算结果，避免缓存失效瞬间的并发击穿
+    - ttl <= 0 时不缓存
+    """
+
+    def __init__(self, name: str, ttl: float = 30.0, max_entries: int = 256, wait_timeout: float = 30.0):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+
+        # key -> (过期时间, 值)
+        self._entries: Dict[Hashable, tuple] = {}
+        # 正在计算的键 -> 计算完成事件
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        # 每次失效递增，计算期间发生失效时结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """返回缓存值，未命中时调用 compute 计算并缓存"""
+        if self.ttl <= 0:
+            return compute()
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    record_cache(self.name, True)
+                    return entry[1]
+
+                event = self._inflight.get(key)
+                if event is None:
+                    # 由当前线程负责计算
+                    event = self._inflight[key] = threading.Event()
+                    generation = self._generation
+                    break
+
+                if entry is not None:
+                    # 已有线程在重新计算，先返回过期的值
+                    record_cache(self.name, True)
+                    return entry[1]
+
+            # 没有可用的旧值，等待正在进行的计算；超时或计算失败后重新检查
+            event.wait(self.wait_timeout)
+
+        record_cache(self.name, False)
+        try:
+            value = compute()
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+            if len(self._entries) >= self.max_entries:
+                # 删除最早写入的条目
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + self.ttl, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """使指定键或全部条目失效"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取缓存状态"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "computing": len(self._inflight),
+            }
@@ -1,13 +1,126 @@
 """数据库管理模块"""
 
+import os
 import sqlite3
 import logging
+import time
+import threading
 from threading import Lock
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional
+from datetime import datetime, date, timedelta
 from contextlib import contextmanager
 
 from ..config.settings import Config
+from .metrics import DB_WRITE_SECONDS
+from .tracing import trace_span
+from .cache import TTLCache
+from . import stats_rollup
+
+
+def now_ms() -> int:
+    """当前时间的毫秒时间戳"""
+    return int(time.time() * 1000)
+
+
+def days_ago_ms(days: int, align_to_day: bool = False) -> int:
+    """
+    若干天前的毫秒时间戳
+    
+    Args:
+        days: 天数
+        align_to_day: 是否对齐到当天（本地时间）零点
+    """
+    if align_to_day:
+        start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+        return int(start.timestamp() * 1000)
+    return int((time.time() - days * 86400) * 1000)
+
+
+def month_key(ts_ms: int) -> str:
+    """毫秒时间戳所在的本地月份，格式 YYYYMM"""
+    return datetime.fromtimestamp(ts_ms / 1000).strftime('%Y%m')
+
+
+def month_range(key: str) -> tuple:
+    """
+    月份的时间范围
+    
+    Returns:
+        (起始毫秒时间戳, 下月起始毫秒时间戳, 首日, 末日)
+    """
+    first = date(int(key[:4]), int(key[4:]), 1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    start = datetime.combine(first, datetime.min.time()).timestamp()
+    end = datetime.combine(following, datetime.min.time()).timestamp()
+    return int(start * 1000), int(end * 1000), first.isoformat(), (following - timedelta(days=1)).isoformat()
+
+
+# 生成日志按月分区，generation_logs 是所有分区的 UNION ALL 视图
+LOG_PARTITION_PREFIX = 'generation_logs_'
+
+LOG_PARTITION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        text_length INTEGER NOT NULL,
+        voice TEXT NOT NULL,
+        format TEXT NOT NULL,
+        speed REAL DEFAULT 1.0,
+        mode TEXT NOT NULL,
+        duration REAL,
+        audio_size INTEGER,
+        status TEXT DEFAULT 'success',
+        error_message TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        request_id TEXT,
+        ts_ms INTEGER NOT NULL,
+        audio_duration REAL
+    )
+'''
+
+# 每个分区上的索引：(名称后缀, 列)
+LOG_PARTITION_INDEXES = (
+    ('ts', 'ts_ms'),
+    ('status_ts', 'status, ts_ms'),
+    ('voice_ts', 'voice, ts_ms'),
+    ('mode_ts', 'mode, ts_ms'),
+)
+
+# 流式请求每个分段的上游调用明细，通过 request_id 关联 generation_logs
+SEGMENT_METRICS_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS segment_metrics (
+        id INTEGER PRIMARY KEY,
+        ts_ms INTEGER NOT NULL,
+        request_id TEXT,
+        segment_index INTEGER NOT NULL,
+        segment_count INTEGER NOT NULL,
+        voice TEXT NOT NULL,
+        chars INTEGER NOT NULL,
+        upstream_seconds REAL,
+        retries INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER,
+        http_status TEXT,
+        queue_wait REAL,
+        status TEXT NOT NULL DEFAULT 'success',
+        error_message TEXT,
+        audio_duration REAL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_segment_metrics_ts ON segment_metrics (ts_ms)',
+    'CREATE INDEX IF NOT EXISTS idx_segment_metrics_request ON segment_metrics (request_id)',
+    'CREATE INDEX IF NOT EXISTS idx_segment_metrics_voice_ts ON segment_metrics (voice, ts_ms)',
+)
+
+# 分段统计的分组方式：名称 -> 分组表达式
+SEGMENT_GROUPS = {
+    'voice': 'voice',
+    # 按50字符分桶
+    'length': '(chars / 50) * 50',
+    # 本地时间的小时
+    'hour': "CAST(strftime('%H', ts_ms / 1000, 'unixepoch', 'localtime') AS INTEGER)",
+}
 
 
 class DatabaseManager:
@@ -16,6 +129,29 @@ class DatabaseManager:
     _instance = None
     _lock = Lock()
     
+    # 最新的数据库结构版本（见 _migrations）
+    SCHEMA_VERSION = 7
+    
+    # 等待其他进程完成迁移的最长时间（秒）
+    MIGRATION_LOCK_TIMEOUT = 600
+    
+    # generation_logs 中由应用写入的列
+    LOG_COLUMNS = (
+        'timestamp', 'text_length', 'voice', 'format', 'speed', 'mode',
+        'duration', 'audio_size', 'status', 'error_message', 'ip_address',
+        'user_agent', 'request_id', 'ts_ms', 'audio_duration'
+    )
+    
+    # segment_metrics 中由应用写入的列
+    SEGMENT_COLUMNS = (
+        'ts_ms', 'request_id', 'segment_index', 'segment_count', 'voice', 'chars',
+        'upstream_seconds', 'retries', 'bytes', 'http_status', 'queue_wait',
+        'status', 'error_message', 'audio_duration'
+    )
+    
+    # 按 ts_ms 换算的本地日期，用于按天分组
+    LOCAL_DATE_SQL = "DATE(ts_ms / 1000, 'unixepoch', 'localtime')"
+    
     def __new__(cls, config: Config = None):
         if cls._instance is None:
             with cls._lock:
@@ -30,6 +166,23 @@ class DatabaseManager:
         self.config = config
         self.db_path = config.get('DB_PATH') if config else 'tts_stats.db'
         self.logger = logging.getLogger(__name__)
+        
+        # 连接参数
+        self.journal_mode = config.get('DB_JOURNAL_MODE', 'WAL') if config else 'WAL'
+        self.synchronous = config.get('DB_SYNCHRONOUS', 'NORMAL') if config else 'NORMAL'
+        self.cache_size_kb = config.get('DB_CACHE_SIZE_KB', 8192) if config else 8192
+        self.busy_timeout_ms = config.get('DB_BUSY_TIMEOUT_MS', 5000) if config else 5000
+        
+        # 每个线程复用一个持久连接；内存数据库只能共享同一个连接
+        self._local = threading.local()
+        self._shared_conn = None
+        self._shared_lock = threading.RLock()
+        
+        # 已确认存在的日志分区，写入时避免重复查询 sqlite_master
+        self._known_partitions = set()
+        
+        # 统计查询结果缓存，日志写入或分区删除时失效
+        self.stats_cache = TTLCache('stats', ttl=config.get('STATS_CACHE_TTL', 30) if config else 30)
         self._initialized = True
         
         self.init_database()
@@ -56,27 +209,377 @@ class DatabaseManager:
                     )
                 ''')
                 conn.commit()
-            self.logger.info("数据库初始化完成")
+                self._migrate(conn)
+            self.logger.info(f"数据库初始化完成 | 结构版本: {self.SCHEMA_VERSION}")
         except Exception as e:
             self.logger.error(f"数据库初始化失败: {e}")
             raise
     
+    def _migrate(self, conn) -> None:
+        """
+        按版本号依次执行未应用的迁移
+        
+        当前版本记录在 PRAGMA user_version 中，每个迁移在独立的 BEGIN IMMEDIATE 事务内执行，
+        成功后才更新版本号。多个 worker 同时启动时，取得写锁后重新读取版本号，
+        已被其他进程应用的迁移直接跳过。
+        """
+        for version, description, migration in self._migrations():
+            if version <= conn.execute('PRAGMA user_version').fetchone()[0]:
+                continue
+            start_time = time.time()
+            self._begin_immediate(conn)
+            try:
+                if version <= conn.execute('PRAGMA user_version').fetchone()[0]:
+                    conn.rollback()
+                    continue
+                migration(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self.logger.info(f"数据库迁移完成 | 版本: {version} | {description} | 耗时: {time.time() - start_time:.2f}s")
+        
+        # 已有数据库需要一次完整的 VACUUM 才能启用增量回收，会长时间持有写锁，不在启动时执行
+        if not self.is_memory and conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            self.logger.warning("数据库未启用增量回收，删除分区后的空间不会归还给文件系统；"
+                                "请在低峰期执行 POST /api/admin/maintenance {\"action\": \"enable_incremental_vacuum\"}")
+    
+    def _begin_immediate(self, conn) -> None:
+        """开始写事务；其他进程正在迁移时等待其完成（单次等待受 busy_timeout 限制，超时后重试）"""
+        deadline = time.time() + self.MIGRATION_LOCK_TIMEOUT
+        waiting = False
+        while True:
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or time.time() >= deadline:
+                    raise
+                if not waiting:
+                    waiting = True
+                    self.logger.info("数据库正被其他进程迁移，等待完成...")
+    
+    def _migrations(self):
+        """迁移列表：(版本号, 说明, 迁移函数)"""
+        return [
+            (1, "添加 request_id 列", self._migrate_v1_request_id),
+            (2, "添加毫秒时间戳列与索引", self._migrate_v2_ts_ms),
+            (3, "添加统计汇总表", self._migrate_v3_rollups),
+            (4, "添加按模式查询的索引", self._migrate_v4_mode_index),
+            (5, "生成日志按月分区", self._migrate_v5_partitions),
+            (6, "添加分段上游调用明细表", self._migrate_v6_segment_metrics),
+            (7, "记录音频时长与实时率", self._migrate_v7_audio_duration),
+        ]
+    
+    def _migrate_v1_request_id(self, conn) -> None:
+        self._ensure_column(conn, 'generation_logs', 'request_id', 'TEXT')
+    
+    def _migrate_v2_ts_ms(self, conn) -> None:
+        self._ensure_column(conn, 'generation_logs', 'ts_ms', 'INTEGER')
+        # 旧记录的 timestamp 是本地时间的ISO字符串，换算为UTC毫秒时间戳
+        conn.execute('''
+            UPDATE generation_logs
+            SET ts_ms = CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+            WHERE ts_ms IS NULL
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_logs_ts ON generation_logs (ts_ms)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_logs_status_ts ON generation_logs (status, ts_ms)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_logs_voice_ts ON generation_logs (voice, ts_ms)')
+        conn.execute('ANALYZE generation_logs')
+    
+    def _migrate_v3_rollups(self, conn) -> None:
+        for statement in stats_rollup.ROLLUP_SCHEMA:
+            conn.execute(statement)
+        # 汇总数据在 v7 补齐音频时长列后统一重建
+    
+    def _migrate_v4_mode_index(self, conn) -> None:
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_logs_mode_ts ON generation_logs (mode, ts_ms)')
+    
+    def _migrate_v5_partitions(self, conn) -> None:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS log_sequence (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO log_sequence (name, value)
+            SELECT 'generation_logs', COALESCE(MAX(id), 0) FROM generation_logs
+        ''')
+        
+        # 时间戳无法解析的旧记录归入1970年分区，随保留策略清理
+        conn.execute('UPDATE generation_logs SET ts_ms = 0 WHERE ts_ms IS NULL')
+        
+        months = [row[0] for row in conn.execute('''
+            SELECT DISTINCT strftime('%Y%m', ts_ms / 1000, 'unixepoch', 'localtime') FROM generation_logs
+        ''')]
+        # v5 时旧表还没有之后版本添加的列
+        columns = 'id, ' + ', '.join(self.LOG_COLUMNS[:self.LOG_COLUMNS.index('ts_ms') + 1])
+        for key in months:
+            table = self._create_partition(conn, key)
+            start_ms, end_ms, _, _ = month_range(key)
+            conn.execute(f'''
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM generation_logs
+                WHERE ts_ms >= ? AND ts_ms < ?
+            ''', (start_ms, end_ms))
+        
+        conn.execute('DROP TABLE generation_logs')
+        self._create_partition(conn, month_key(now_ms()))
+        self._rebuild_log_view(conn)
+    
+    def _migrate_v6_segment_metrics(self, conn) -> None:
+        for statement in SEGMENT_METRICS_SCHEMA:
+            conn.execute(statement)
+    
+    def _migrate_v7_audio_duration(self, conn) -> None:
+        # 新列追加在各分区末尾，保持视图中 SELECT * 的列顺序一致
+        for table in self.list_partitions(conn):
+            self._ensure_column(conn, table, 'audio_duration', 'REAL')
+        self._rebuild_log_view(conn)
+        self._ensure_column(conn, 'segment_metrics', 'audio_duration', 'REAL')
+        for column, column_type in stats_rollup.ROLLUP_AUDIO_COLUMNS:
+            self._ensure_column(conn, 'stats_daily', column, column_type)
+        stats_rollup.rebuild(conn)
+    
+    def _ensure_column(self, conn, table: str, column: str, column_type: str) -> None:
+        """为旧版本数据库补充缺失的列"""
+        columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+            self.logger.info(f"数据表 {table} 已添加列: {column}")
+    
+    def list_partitions(self, conn) -> List[str]:
+        """按月份升序列出全部日志分区表"""
+        return [row[0] for row in conn.execute(f'''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name GLOB '{LOG_PARTITION_PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]'
+            ORDER BY name
+        ''')]
+    
+    def _create_partition(self, conn, key: str) -> str:
+        """创建月份分区表及其索引（已存在时不做任何事）"""
+        table = f"{LOG_PARTITION_PREFIX}{key}"
+        conn.execute(LOG_PARTITION_SCHEMA.format(table=table))
+        for suffix, columns in LOG_PARTITION_INDEXES:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} ON {table} ({columns})')
+        return table
+    
+    def _rebuild_log_view(self, conn) -> None:
+        """按当前分区重建 generation_logs 视图"""
+        partitions = self.list_partitions(conn)
+        conn.execute('DROP VIEW IF EXISTS generation_logs')
+        conn.execute('CREATE VIEW generation_logs AS ' +
+                     ' UNION ALL '.join(f'SELECT * FROM {table}' for table in partitions))
+        self._known_partitions = set(partitions)
+    
+    def ensure_partition(self, conn, key: str) -> str:
+        """确保月份分区存在，新建分区时同步重建视图"""
+        table = f"{LOG_PARTITION_PREFIX}{key}"
+        if table in self._known_partitions:
+            return table
+        
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if not exists:
+            self._create_partition(conn, key)
+            self._rebuild_log_view(conn)
+            self.logger.info(f"已创建日志分区: {table}")
+        self._known_partitions.add(table)
+        return table
+    
+    def _allocate_log_ids(self, conn, count: int) -> int:
+        """从序列表中分配连续的ID，返回第一个ID（需在写事务中调用）"""
+        conn.execute("UPDATE log_sequence SET value = value + ? WHERE name = 'generation_logs'", (count,))
+        last = conn.execute("SELECT value FROM log_sequence WHERE name = 'generation_logs'").fetchone()[0]
+        return last - count + 1
+    
+    @property
+    def is_memory(self) -> bool:
+        """是否为内存数据库"""
+        return self.db_path == ':memory:'
+    
+    def _connect(self) -> sqlite3.Connection:
+        """创建并调优一个新连接"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=not self.is_memory
+        )
+        conn.row_factory = sqlite3.Row
+        
+        # 新建的数据库启用增量回收，删除分区后的空闲页可以逐步归还给文件系统；
+        # 必须在设置 journal_mode 之前执行，对已有数据库无影响
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        if not self.is_memory:
+            # WAL模式下读写互不阻塞，journal_mode 会持久化到数据库文件
+            conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        """获取当前线程的持久连接（fork后的子进程会重新连接）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
+        """
+        获取数据库连接的上下文管理器
+        
+        连接在线程内持久复用，退出时未提交的事务会被回滚，
+        与每次新建并关闭连接的语义保持一致。
+        """
+        if self.is_memory:
+            with self._shared_lock:
+                if self._shared_conn is None:
+                    self._shared_conn = self._connect()
+                yield from self._use_connection(self._shared_conn)
+        else:
+            yield from self._use_connection(self._thread_connection())
+    
+    def _use_connection(self, conn: sqlite3.Connection):
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
+            conn.rollback()
             self.logger.error(f"数据库操作失败: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            if conn.in_transaction:
+                conn.rollback()
+    
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    def make_log_record(self,
+                        text_length: int,
+                        voice: str,
+                        format: str,
+                        speed: float,
+                        mode: str,
+                        duration: Optional[float] = None,
+                        audio_size: Optional[int] = None,
+                        status: str = 'success',
+                        error_message: Optional[str] = None,
+                        ip_address: Optional[str] = None,
+                        user_agent: Optional[str] = None,
+                        request_id: Optional[str] = None,
+                        audio_duration: Optional[float] = None) -> Dict[str, Any]:
+        """构建一条生成日志记录（时间戳取调用时刻，而非写入时刻）"""
+        created = time.time()
+        return {
+            "timestamp": datetime.fromtimestamp(created).isoformat(),
+            "ts_ms": int(created * 1000),
+            "text_length": text_length,
+            "voice": voice,
+            "format": format,
+            "speed": speed,
+            "mode": mode,
+            "duration": duration,
+            "audio_size": audio_size,
+            "status": status,
+            "error_message": error_message,
+            "ip_address": ip_address,
+            "user_agent": user_agent[:200] if user_agent else None,
+            "request_id": request_id,
+            "audio_duration": audio_duration,
+        }
+    
+    def insert_generation_logs(self, records: List[Dict[str, Any]]) -> int:
+        """
+        在一个事务中批量写入生成日志
+        
+        Returns:
+            最后一条记录的ID
+        """
+        if not records:
+            return 0
+        
+        columns = 'id, ' + ', '.join(self.LOG_COLUMNS)
+        placeholders = ', '.join('?' for _ in range(len(self.LOG_COLUMNS) + 1))
+        start_time = time.time()
+        try:
+            with self.get_connection() as conn:
+                # 按月份分区写入，ID由序列表统一分配
+                first_id = self._allocate_log_ids(conn, len(records))
+                by_partition: Dict[str, list] = {}
+                for offset, record in enumerate(records):
+                    row = (first_id + offset,) + tuple(record.get(column) for column in self.LOG_COLUMNS)
+                    by_partition.setdefault(month_key(record['ts_ms']), []).append(row)
+                
+                for key, rows in by_partition.items():
+                    table = self.ensure_partition(conn, key)
+                    conn.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+                
+                # 汇总表与明细在同一事务中更新
+                stats_rollup.apply_records(conn, records)
+                conn.commit()
+                return first_id + len(records) - 1
+        finally:
+            operation = 'log_generation' if len(records) == 1 else 'log_generation_batch'
+            DB_WRITE_SECONDS.labels(operation).observe(time.time() - start_time)
+    
+    def make_segment_record(self,
+                            segment_index: int,
+                            segment_count: int,
+                            voice: str,
+                            chars: int,
+                            upstream_seconds: Optional[float] = None,
+                            retries: int = 0,
+                            bytes: Optional[int] = None,
+                            http_status: Optional[str] = None,
+                            queue_wait: Optional[float] = None,
+                            status: str = 'success',
+                            error_message: Optional[str] = None,
+                            request_id: Optional[str] = None,
+                            audio_duration: Optional[float] = None) -> Dict[str, Any]:
+        """构建一条分段明细记录"""
+        return {
+            "ts_ms": now_ms(),
+            "request_id": request_id,
+            "segment_index": segment_index,
+            "segment_count": segment_count,
+            "voice": voice,
+            "chars": chars,
+            "upstream_seconds": upstream_seconds,
+            "retries": retries,
+            "bytes": bytes,
+            "http_status": http_status,
+            "queue_wait": queue_wait,
+            "status": status,
+            "error_message": error_message[:500] if error_message else None,
+            "audio_duration": audio_duration,
+        }
+    
+    def insert_segment_metrics(self, records: List[Dict[str, Any]]) -> None:
+        """在一个事务中批量写入分段明细"""
+        if not records:
+            return
+        
+        columns = ', '.join(self.SEGMENT_COLUMNS)
+        placeholders = ', '.join('?' for _ in self.SEGMENT_COLUMNS)
+        start_time = time.time()
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    f'INSERT INTO segment_metrics ({columns}) VALUES ({placeholders})',
+                    [tuple(record.get(column) for column in self.SEGMENT_COLUMNS) for record in records]
+                )
+                conn.commit()
+        finally:
+            DB_WRITE_SECONDS.labels('segment_metrics').observe(time.time() - start_time)
     
     def log_generation(self, 
                       text_length: int,
@@ -89,117 +592,359 @@ class DatabaseManager:
                       status: str = 'success',
                       error_message: Optional[str] = None,
                       ip_address: Optional[str] = None,
-                      user_agent: Optional[str] = None) -> int:
-        """记录生成日志"""
+                      user_agent: Optional[str] = None,
+                      request_id: Optional[str] = None,
+                      audio_duration: Optional[float] = None) -> int:
+        """同步记录生成日志"""
+        record = self.make_log_record(
+            text_length, voice, format, speed, mode, duration, audio_size,
+            status, error_message, ip_address, user_agent, request_id, audio_duration
+        )
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute('''
-                    INSERT INTO generation_logs 
-                    (timestamp, text_length, voice, format, speed, mode, 
-                     duration, audio_size, status, error_message, ip_address, user_agent)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    datetime.now().isoformat(),
-                    text_length, voice, format, speed, mode,
-                    duration, audio_size, status, error_message,
-                    ip_address, user_agent[:200] if user_agent else None
-                ))
-                conn.commit()
-                return cursor.lastrowid
+            with trace_span(request_id, 'db.log_generation'):
+                log_id = self.insert_generation_logs([record])
+            self.stats_cache.invalidate()
+            return log_id
         except Exception as e:
             self.logger.error(f"记录生成日志失败: {e}")
             return -1
     
-    def get_generation_stats(self) -> Dict[str, Any]:
-        """获取生成统计数据"""
+    def get_generation_stats(self, days: int = 30, recent_limit: int = 50) -> Dict[str, Any]:
+        """获取生成统计数据（汇总部分读取 stats_daily 汇总表，结果经 stats_cache 缓存）"""
         try:
-            with self.get_connection() as conn:
-                # 总体统计
-                summary = conn.execute('''
-                    SELECT 
-                        COUNT(*) as total_count,
-                        SUM(text_length) as total_chars,
-                        SUM(duration) as total_duration,
-                        SUM(audio_size) as total_size,
-                        AVG(duration) as avg_duration,
-                        AVG(text_length) as avg_chars
-                    FROM generation_logs
-                    WHERE status = 'success'
-                ''').fetchone()
-                
-                # 按语音统计
-                voice_stats = conn.execute('''
-                    SELECT voice, COUNT(*) as count, SUM(text_length) as chars
-                    FROM generation_logs
-                    WHERE status = 'success'
-                    GROUP BY voice
-                    ORDER BY count DESC
-                    LIMIT 10
-                ''').fetchall()
-                
-                # 按日期统计
-                daily_stats = conn.execute('''
-                    SELECT DATE(timestamp) as date, COUNT(*) as count, SUM(text_length) as chars
-                    FROM generation_logs
-                    WHERE status = 'success'
-                    GROUP BY DATE(timestamp)
-                    ORDER BY date DESC
-                    LIMIT 30
-                ''').fetchall()
-                
-                # 最近记录
-                recent_logs = conn.execute('''
-                    SELECT * FROM generation_logs
-                    ORDER BY timestamp DESC
-                    LIMIT 50
-                ''').fetchall()
-                
-                return {
-                    "success": True,
-                    "summary": {
-                        "total_count": summary['total_count'] or 0,
-                        "total_chars": summary['total_chars'] or 0,
-                        "total_duration": round(summary['total_duration'] or 0, 2),
-                        "total_size_mb": round((summary['total_size'] or 0) / 1024 / 1024, 2),
-                        "avg_duration": round(summary['avg_duration'] or 0, 2),
-                        "avg_chars": round(summary['avg_chars'] or 0, 0)
-                    },
-                    "voice_stats": [dict(row) for row in voice_stats],
-                    "daily_stats": [dict(row) for row in daily_stats],
-                    "recent_logs": [dict(row) for row in recent_logs]
-                }
+            return self.stats_cache.get_or_compute(
+                ('generation_stats', days, recent_limit),
+                lambda: self._query_generation_stats(days, recent_limit)
+            )
         except Exception as e:
             self.logger.error(f"获取统计数据失败: {e}")
             return {"success": False, "error": str(e)}
     
-    def export_logs_csv(self) -> List[Dict[str, Any]]:
-        """导出日志为CSV格式数据"""
+    def _query_generation_stats(self, days: int, recent_limit: int) -> Dict[str, Any]:
+        with self.get_connection() as conn:
+            # 总体统计
+            summary = conn.execute('''
+                SELECT 
+                    SUM(count) as total_count,
+                    SUM(chars) as total_chars,
+                    SUM(duration_sum) as total_duration,
+                    SUM(audio_size_sum) as total_size,
+                    SUM(duration_sum) / NULLIF(SUM(duration_count), 0) as avg_duration,
+                    CAST(SUM(chars) AS REAL) / NULLIF(SUM(count), 0) as avg_chars,
+                    SUM(audio_duration_sum) as total_audio_duration,
+                    SUM(rtf_duration_sum) / NULLIF(SUM(audio_duration_sum), 0) as rtf
+                FROM stats_daily
+                WHERE status = 'success'
+            ''').fetchone()
+            
+            # 按语音统计
+            voice_stats = conn.execute('''
+                SELECT voice, SUM(count) as count, SUM(chars) as chars,
+                       ROUND(SUM(audio_duration_sum), 1) as audio_duration,
+                       ROUND(SUM(rtf_duration_sum) / NULLIF(SUM(audio_duration_sum), 0), 3) as rtf
+                FROM stats_daily
+                WHERE status = 'success'
+                GROUP BY voice
+                ORDER BY count DESC
+                LIMIT 10
+            ''').fetchall()
+            
+            # 按日期统计（最近 days 天）
+            daily_stats = conn.execute('''
+                SELECT date, SUM(count) as count, SUM(chars) as chars
+                FROM stats_daily
+                WHERE status = 'success' AND date >= ?
+                GROUP BY date
+                ORDER BY date DESC
+            ''', ((date.today() - timedelta(days=days - 1)).isoformat(),)).fetchall()
+            
+            # 最近记录（完整分页见 /api/history）
+            recent_logs = conn.execute('''
+                SELECT * FROM generation_logs
+                ORDER BY ts_ms DESC
+                LIMIT ?
+            ''', (recent_limit,)).fetchall() if recent_limit > 0 else []
+            
+            return {
+                "success": True,
+                "summary": {
+                    "total_count": summary['total_count'] or 0,
+                    "total_chars": summary['total_chars'] or 0,
+                    "total_duration": round(summary['total_duration'] or 0, 2),
+                    "total_size_mb": round((summary['total_size'] or 0) / 1024 / 1024, 2),
+                    "avg_duration": round(summary['avg_duration'] or 0, 2),
+                    "avg_chars": round(summary['avg_chars'] or 0, 0),
+                    "total_audio_duration": round(summary['total_audio_duration'] or 0, 2),
+                    # 实时率：生成耗时 / 音频时长，小于1表示生成快于播放
+                    "rtf": round(summary['rtf'], 3) if summary['rtf'] is not None else None
+                },
+                "voice_stats": [dict(row) for row in voice_stats],
+                "daily_stats": [dict(row) for row in daily_stats],
+                "recent_logs": [dict(row) for row in recent_logs]
+            }
+    
+    def get_log_columns(self) -> List[str]:
+        """generation_logs 的全部列名"""
+        with self.get_connection() as conn:
+            return [row['name'] for row in conn.execute('PRAGMA table_info(generation_logs)')]
+    
+    def _log_filters(self,
+                     start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None,
+                     **equals) -> tuple:
+        """构建 generation_logs / segment_metrics 的过滤条件，返回 (WHERE子句, 参数)"""
+        conditions, params = [], []
+        if start_ms is not None:
+            conditions.append('ts_ms >= ?')
+            params.append(start_ms)
+        if end_ms is not None:
+            conditions.append('ts_ms < ?')
+            params.append(end_ms)
+        for column, value in equals.items():
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        return conditions, params
+    
+    def iter_logs(self,
+                  start_ms: Optional[int] = None,
+                  end_ms: Optional[int] = None,
+                  batch_size: int = 1000) -> Iterator[List[sqlite3.Row]]:
+        """
+        按时间倒序分批遍历生成日志
+        
+        Args:
+            start_ms: 起始时间（含）
+            end_ms: 结束时间（不含）
+            batch_size: 每批行数
+        """
+        conditions, params = self._log_filters(start_ms, end_ms)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute(f'SELECT * FROM generation_logs {where} ORDER BY ts_ms DESC', params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+    
+    def page_logs(self,
+                  columns: List[str],
+                  limit: int = 50,
+                  before: Optional[tuple] = None,
+                  start_ms: Optional[int] = None,
+                  end_ms: Optional[int] = None,
+                  voice: Optional[str] = None,
+                  status: Optional[str] = None,
+                  mode: Optional[str] = None) -> List[sqlite3.Row]:
+        """
+        按 (ts_ms, id) 倒序的键集分页查询
+        
+        Args:
+            columns: 返回的列
+            limit: 每页行数
+            before: 上一页最后一行的 (ts_ms, id)，只返回排在其后的行
+        """
+        conditions, params = self._log_filters(start_ms, end_ms, voice=voice, status=status, mode=mode)
+        if before is not None:
+            # 行值比较可直接利用 (…, ts_ms) 索引中隐含的 rowid 做范围扫描
+            conditions.append('(ts_ms, id) < (?, ?)')
+            params.extend(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        with self.get_connection() as conn:
+            return conn.execute(f'''
+                SELECT {', '.join(columns)} FROM generation_logs
+                {where}
+                ORDER BY ts_ms DESC, id DESC
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+    
+    def get_segment_stats(self,
+                          group_by: str = 'voice',
+                          start_ms: Optional[int] = None,
+                          end_ms: Optional[int] = None,
+                          slow_seconds: float = 5.0) -> List[Dict[str, Any]]:
+        """
+        按语音、分段长度或小时汇总上游调用表现
+        
+        Args:
+            group_by: voice / length / hour（见 SEGMENT_GROUPS）
+            slow_seconds: 上游耗时超过该值的调用计为慢调用
+        """
+        if group_by not in SEGMENT_GROUPS:
+            raise ValueError(f"不支持的分组方式: {group_by}")
+        
+        conditions, params = self._log_filters(start_ms, end_ms)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self.get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT
+                    {SEGMENT_GROUPS[group_by]} as grp,
+                    COUNT(*) as count,
+                    SUM(status = 'error') as error_count,
+                    SUM(upstream_seconds > ?) as slow_count,
+                    AVG(upstream_seconds) as avg_upstream,
+                    MAX(upstream_seconds) as max_upstream,
+                    AVG(queue_wait) as avg_queue_wait,
+                    SUM(retries) as retries,
+                    AVG(chars) as avg_chars,
+                    SUM(chars) / NULLIF(SUM(upstream_seconds), 0) as chars_per_sec,
+                    AVG(bytes) as avg_bytes,
+                    SUM(audio_duration) as audio_duration,
+                    SUM(CASE WHEN audio_duration > 0 THEN upstream_seconds END)
+                        / NULLIF(SUM(CASE WHEN upstream_seconds IS NOT NULL THEN audio_duration END), 0) as rtf
+                FROM segment_metrics
+                {where}
+                GROUP BY grp
+                ORDER BY grp
+            ''', [slow_seconds] + params).fetchall()
+        
+        stats = []
+        for row in rows:
+            item = dict(row)
+            item[group_by] = item.pop('grp')
+            item['error_rate'] = round(item['error_count'] / item['count'] * 100, 2) if item['count'] else 0
+            item['slow_rate'] = round((item['slow_count'] or 0) / item['count'] * 100, 2) if item['count'] else 0
+            for key in ('avg_upstream', 'max_upstream', 'avg_queue_wait', 'rtf'):
+                item[key] = round(item[key], 3) if item[key] is not None else None
+            for key in ('avg_chars', 'chars_per_sec', 'avg_bytes', 'audio_duration'):
+                item[key] = round(item[key], 1) if item[key] is not None else None
+            stats.append(item)
+        return stats
+    
+    def get_request_segments(self, request_id: str) -> List[Dict[str, Any]]:
+        """某次请求的全部分段明细"""
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                SELECT * FROM segment_metrics
+                WHERE request_id = ?
+                ORDER BY segment_index, id
+            ''', (request_id,)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def delete_expired_segments(self, days: int) -> int:
+        """删除 days 天前的分段明细，返回删除的记录数"""
+        with self.get_connection() as conn:
+            cursor = conn.execute('DELETE FROM segment_metrics WHERE ts_ms < ?', (days_ago_ms(days),))
+            conn.commit()
+            return cursor.rowcount
+    
+    def rebuild_rollups(self) -> bool:
+        """根据明细重新计算统计汇总表"""
         try:
             with self.get_connection() as conn:
-                cursor = conn.execute('SELECT * FROM generation_logs ORDER BY timestamp DESC')
-                columns = [description[0] for description in cursor.description]
-                rows = cursor.fetchall()
-                
-                return {
-                    "columns": columns,
-                    "rows": [dict(row) for row in rows]
-                }
+                stats_rollup.rebuild(conn)
+                conn.commit()
+            self.stats_cache.invalidate()
+            self.logger.info("统计汇总表已重建")
+            return True
         except Exception as e:
-            self.logger.error(f"导出日志失败: {e}")
-            return {"columns": [], "rows": []}
+            self.logger.error(f"重建统计汇总表失败: {e}")
+            return False
     
     def cleanup_old_logs(self, days: int = 30) -> int:
-        """清理旧日志"""
+        """
+        清理旧日志
+        
+        以月份分区为单位删除：只删除整月都早于保留期限的分区，
+        每个分区在独立的短事务中 DROP，不会长时间阻塞写入。
+        
+        Returns:
+            删除的记录数
+        """
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute('''
-                    DELETE FROM generation_logs 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                conn.commit()
-                deleted_count = cursor.rowcount
-                self.logger.info(f"清理了 {deleted_count} 条旧日志")
-                return deleted_count
+            partitions, deleted_count = self.drop_expired_partitions(days)
+            self.delete_expired_segments(days)
+            if partitions:
+                self.logger.info(f"清理了 {partitions} 个日志分区，共 {deleted_count} 条旧日志")
+            return deleted_count
         except Exception as e:
             self.logger.error(f"清理旧日志失败: {e}")
             return 0
+    
+    def drop_expired_partitions(self, days: int) -> tuple:
+        """
+        删除整月早于 days 天前的分区
+        
+        Returns:
+            (删除的分区数, 删除的记录数)
+        """
+        cutoff_key = month_key(days_ago_ms(days))
+        with self.get_connection() as conn:
+            expired = [table for table in self.list_partitions(conn)
+                       if table[len(LOG_PARTITION_PREFIX):] < cutoff_key]
+        
+        deleted_count = 0
+        for table in expired:
+            deleted_count += self.drop_partition(table)
+        return len(expired), deleted_count
+    
+    def drop_partition(self, table: str) -> int:
+        """删除一个日志分区并扣除其汇总数据，返回删除的记录数"""
+        key = table[len(LOG_PARTITION_PREFIX):]
+        _, _, first_date, last_date = month_range(key)
+        
+        with self.get_connection() as conn:
+            count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            conn.execute('BEGIN IMMEDIATE')
+            stats_rollup.remove_partition(conn, table, first_date, last_date)
+            conn.execute(f'DROP TABLE {table}')
+            if not self.list_partitions(conn):
+                # 视图至少需要一个分区
+                self._create_partition(conn, month_key(now_ms()))
+            self._rebuild_log_view(conn)
+            conn.commit()
+        self.stats_cache.invalidate()
+        
+        self.logger.info(f"已删除日志分区: {table} | 记录数: {count}")
+        return count
+    
+    def enable_incremental_vacuum(self) -> Dict[str, Any]:
+        """
+        为已有数据库启用增量回收（auto_vacuum 只对新建的数据库直接生效，
+        已有数据库需要设置后执行一次完整的 VACUUM，期间会阻塞写入）
+        
+        Returns:
+            {"enabled": 是否已启用, "changed": 本次是否执行了切换, "duration": 耗时}
+        """
+        with self.get_connection() as conn:
+            return self._enable_incremental_vacuum(conn)
+    
+    def _enable_incremental_vacuum(self, conn) -> Dict[str, Any]:
+        if self.is_memory or conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return {"enabled": not self.is_memory, "changed": False, "duration": 0.0}
+        
+        start_time = time.time()
+        size_before = os.path.getsize(self.db_path)
+        self.logger.info(f"数据库切换到增量回收，执行 VACUUM | 文件大小: {size_before / 1024 / 1024:.1f}MB")
+        # VACUUM 不能在事务内执行
+        conn.commit()
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        enabled = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        duration = time.time() - start_time
+        
+        if enabled:
+            self.logger.info(f"数据库已启用增量回收 | 文件大小: {size_before / 1024 / 1024:.1f}MB -> "
+                             f"{os.path.getsize(self.db_path) / 1024 / 1024:.1f}MB | 耗时: {duration:.2f}s")
+        else:
+            self.logger.warning(f"数据库启用增量回收失败 | 耗时: {duration:.2f}s")
+        return {"enabled": enabled, "changed": enabled, "duration": round(duration, 3)}
+    
+    def incremental_vacuum(self, pages: int = 1000) -> int:
+        """
+        回收最多 pages 个空闲页
+        
+        Returns:
+            剩余的空闲页数；数据库未启用增量回收时返回-1
+        """
+        with self.get_connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                return -1
+            conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+            return conn.execute('PRAGMA freelist_count').fetchone()[0]
@@ -0,0 +1,186 @@
+"""队列服务时间估计器"""
+
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class ServiceTimeModel:
+    """
+    单个维度的服务时间模型
+
+    使用指数加权的线性回归（耗时 = 固定开销 + 每字符耗时 × 字符数）
+    估计任务耗时，同时保留最近的每字符耗时样本用于分位数统计。
+    """
+
+    def __init__(self, alpha: float = 0.1, window: int = 200):
+        self.alpha = alpha
+        self.count = 0
+        self.rate_ewma = None     # 秒/字符
+        self.seconds_ewma = None  # 秒/任务
+        self.rates = deque(maxlen=window)
+
+        # 指数加权回归累加量
+        self._sw = 0.0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    def observe(self, chars: int, seconds: float) -> None:
+        """记录一次完成的任务"""
+        chars = max(int(chars), 1)
+        rate = seconds / chars
+        decay = 1.0 - self.alpha
+
+        if self.rate_ewma is None:
+            self.rate_ewma = rate
+            self.seconds_ewma = seconds
+        else:
+            self.rate_ewma = decay * self.rate_ewma + self.alpha * rate
+            self.seconds_ewma = decay * self.seconds_ewma + self.alpha * seconds
+
+        self._sw = decay * self._sw + 1.0
+        self._sx = decay * self._sx + chars
+        self._sy = decay * self._sy + seconds
+        self._sxx = decay * self._sxx + chars * chars
+        self._sxy = decay * self._sxy + chars * seconds
+
+        self.rates.append(rate)
+        self.count += 1
+
+    def coefficients(self) -> Optional[tuple]:
+        """返回回归系数 (固定开销, 每字符耗时)，样本不足时返回None"""
+        if self.count < 2 or self._sw <= 0:
+            return None
+
+        mean_x = self._sx / self._sw
+        mean_y = self._sy / self._sw
+        var_x = self._sxx / self._sw - mean_x * mean_x
+        if var_x <= 1e-6 * max(mean_x * mean_x, 1.0):
+            return None
+
+        slope = (self._sxy / self._sw - mean_x * mean_y) / var_x
+        intercept = mean_y - slope * mean_x
+        if slope < 0 or intercept < 0:
+            return None
+        return intercept, slope
+
+    def predict(self, chars: int) -> Optional[float]:
+        """预测指定字符数的任务耗时"""
+        if self.count == 0:
+            return None
+
+        coefficients = self.coefficients()
+        if coefficients:
+            intercept, slope = coefficients
+            return intercept + slope * max(int(chars), 1)
+
+        return self.rate_ewma * max(int(chars), 1)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """每字符耗时的分位数"""
+        if not self.rates:
+            return None
+        ordered = sorted(self.rates)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        coefficients = self.coefficients()
+        p50 = self.percentile(50)
+        p90 = self.percentile(90)
+        return {
+            "samples": self.count,
+            "seconds_per_char_ewma": round(self.rate_ewma, 5) if self.rate_ewma is not None else None,
+            "seconds_per_task_ewma": round(self.seconds_ewma, 3) if self.seconds_ewma is not None else None,
+            "seconds_per_char_p50": round(p50, 5) if p50 is not None else None,
+            "seconds_per_char_p90": round(p90, 5) if p90 is not None else None,
+            "overhead_seconds": round(coefficients[0], 3) if coefficients else None,
+            "per_char_seconds": round(coefficients[1], 5) if coefficients else None,
+        }
+
+
+class ServiceTimeEstimator:
+    """服务时间估计器 - 按全局和按语音维护耗时模型"""
+
+    # 没有任何样本时的默认估计：0.5秒固定开销 + 每字符10毫秒
+    DEFAULT_OVERHEAD = 0.5
+    DEFAULT_PER_CHAR = 0.01
+
+    def __init__(self, alpha: float = 0.1, window: int = 200, min_voice_samples: int = 5, max_voices: int = 200):
+        self.alpha = alpha
+        self.window = window
+        self.min_voice_samples = min_voice_samples
+        self.max_voices = max_voices
+        self.lock = threading.Lock()
+        self.global_model = ServiceTimeModel(alpha, window)
+        self.voice_models: Dict[str, ServiceTimeModel] = {}
+        self.bootstrapped = False
+        self.logger = logging.getLogger(__name__)
+
+    def observe(self, chars: int, voice: str, seconds: float) -> None:
+        """记录一次成功完成的任务耗时"""
+        if seconds is None or seconds <= 0:
+            return
+
+        with self.lock:
+            self.global_model.observe(chars, seconds)
+
+            if voice:
+                model = self.voice_models.get(voice)
+                if model is None:
+                    if len(self.voice_models) >= self.max_voices:
+                        return
+                    model = ServiceTimeModel(self.alpha, self.window)
+                    self.voice_models[voice] = model
+                model.observe(chars, seconds)
+
+    def estimate(self, chars: int, voice: str = "") -> float:
+        """估计单个任务的服务时间（秒）"""
+        with self.lock:
+            model = self.voice_models.get(voice) if voice else None
+            if model is not None and model.count >= self.min_voice_samples:
+                predicted = model.predict(chars)
+            else:
+                predicted = self.global_model.predict(chars)
+
+        if predicted is None:
+            predicted = self.DEFAULT_OVERHEAD + self.DEFAULT_PER_CHAR * max(int(chars), 1)
+        return predicted
+
+    def bootstrap_from_db(self, db_manager, limit: int = 500) -> int:
+        """从 generation_logs 中的历史记录预热模型"""
+        if not db_manager or self.bootstrapped:
+            return 0
+
+        try:
+            with db_manager.get_connection() as conn:
+                rows = conn.execute('''
+                    SELECT text_length, voice, duration FROM generation_logs
+                    WHERE status = 'success' AND mode = '普通' AND duration > 0
+                    ORDER BY ts_ms DESC
+                    LIMIT ?
+                ''', (limit,)).fetchall()
+        except Exception as e:
+            self.logger.warning(f"从历史记录预热耗时模型失败: {e}")
+            return 0
+
+        # 按时间顺序回放，使EWMA偏向最近的记录
+        for row in reversed(rows):
+            self.observe(row['text_length'], row['voice'], row['duration'])
+
+        self.bootstrapped = True
+        self.logger.info(f"耗时模型已从历史记录预热 | 样本数: {len(rows)}")
+        return len(rows)
+
+    def to_dict(self, top_voices: int = 10) -> Dict[str, Any]:
+        """转换为字典"""
+        with self.lock:
+            voices = sorted(self.voice_models.items(), key=lambda item: item[1].count, reverse=True)
+            return {
+                "global": self.global_model.to_dict(),
+                "voices": {voice: model.to_dict() for voice, model in voices[:top_voices]},
+            }
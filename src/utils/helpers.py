@@ -2,8 +2,8 @@
 
 import re
 import time
-from typing import List, Iterator, Dict, Any
-from datetime import datetime
+from typing import List, Iterator, Dict, Any, Optional
+from datetime import datetime, timedelta
 
 
 def split_text_for_streaming(text: str, max_length: int = 300) -> List[str]:
@@ -221,6 +221,29 @@ def generate_filename(prefix: str = "speech", format: str = "mp3") -> str:
     return f"{prefix}_{timestamp}.{format}"
 
 
+def parse_time_param(value: Optional[str], end_of_day: bool = False) -> Optional[int]:
+    """
+    解析查询参数中的时间，返回毫秒时间戳
+    
+    支持毫秒时间戳、YYYY-MM-DD（本地日期）和ISO格式时间。
+    end_of_day 为True时，纯日期按当天结束（次日零点）处理，便于作为开区间上界。
+    
+    Raises:
+        ValueError: 无法解析时
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    
+    dt = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        dt += timedelta(days=1)
+    return int(dt.timestamp() * 1000)
+
+
 def calculate_timeout(text_length: int) -> int:
     """根据文本长度计算超时时间，支持10万字长文本"""
     if text_length > 100000:
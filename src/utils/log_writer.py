@@ -0,0 +1,265 @@
+"""生成日志异步批量写入模块"""
+
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from .metrics import LOG_WRITER_QUEUE_DEPTH, LOG_WRITER_RECORDS, LOG_WRITER_BATCH_SIZE
+
+
+# 队列满时的处理策略
+OVERFLOW_POLICIES = ('block', 'drop', 'sync')
+
+
+class GenerationLogWriter:
+    """
+    生成日志后台写入线程
+
+    请求线程只把日志记录放入内存队列，写入线程按条数或时间凑批，
+    在一个事务中写入数据库，请求延迟中不再包含磁盘同步。
+    生成日志与分段明细共用同一个队列，写入时按记录类型分别批量插入。
+
+    队列满时按 overflow_policy 处理：
+        block: 最多等待 block_timeout 秒，仍无空位则丢弃
+        drop:  直接丢弃
+        sync:  在调用线程同步写入
+    """
+
+    def __init__(self, db_manager, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_queue: int = 10000, overflow_policy: str = 'block', block_timeout: float = 1.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的溢出策略: {overflow_policy}")
+
+        self.db_manager = db_manager
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        # 已提交 / 已处理的记录数，用于 flush 等待
+        self._submitted = 0
+        self._processed = 0
+        self._progress = threading.Condition()
+
+        self.stats = {
+            "queued": 0,
+            "written": 0,
+            "failed": 0,
+            "dropped": 0,
+            "sync_writes": 0,
+            "batches": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+        self.running = False
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+        LOG_WRITER_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def start(self) -> None:
+        """启动写入线程"""
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="GenerationLogWriter", daemon=True)
+        self._thread.start()
+        self.logger.info(f"生成日志写入线程已启动 | 批量: {self.batch_size} | 间隔: {self.flush_interval}s | "
+                         f"队列上限: {self._queue.maxsize} | 溢出策略: {self.overflow_policy}")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止写入线程，退出前写完队列中剩余的记录"""
+        if not self.running:
+            return
+        self.running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                self.logger.warning(f"生成日志写入线程未能在 {timeout}s 内退出，剩余 {self._queue.qsize()} 条未写入")
+            self._thread = None
+        self.logger.info(f"生成日志写入线程已停止 | 已写入: {self.stats['written']} | 丢弃: {self.stats['dropped']}")
+
+    def add_flush_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """注册生成日志批量写入成功后的回调（例如让统计缓存失效），回调参数为本批生成日志"""
+        self._listeners.append(listener)
+
+    def log_generation(self, **fields) -> bool:
+        """
+        提交一条生成日志，参数同 DatabaseManager.log_generation
+
+        Returns:
+            记录已入队或已同步写入时返回True，被丢弃时返回False
+        """
+        return self.submit(self.db_manager.make_log_record(**fields))
+
+    def log_segment(self, **fields) -> bool:
+        """提交一条分段明细，参数同 DatabaseManager.make_segment_record"""
+        return self.submit(self.db_manager.make_segment_record(**fields), kind='segment')
+    
+    def submit(self, record: Dict[str, Any], kind: str = 'log') -> bool:
+        """
+        提交一条已构建的记录
+        
+        Args:
+            record: 记录
+            kind: log（生成日志）或 segment（分段明细）
+        """
+        item = (kind, record)
+        if not self.running:
+            return self._write_sync(item)
+
+        with self._progress:
+            self._submitted += 1
+        try:
+            if self.overflow_policy == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self._mark_processed(1)
+            if self.overflow_policy == 'sync':
+                return self._write_sync(item)
+            self._count('dropped')
+            LOG_WRITER_RECORDS.labels('dropped').inc()
+            self.logger.warning(f"生成日志队列已满，丢弃记录 | 请求ID: {record.get('request_id')}")
+            return False
+
+        self._count('queued')
+        LOG_WRITER_RECORDS.labels('queued').inc()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待当前已提交的记录全部处理完毕"""
+        deadline = time.time() + timeout
+        with self._progress:
+            target = self._submitted
+            while self._processed < target:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._progress.wait(remaining)
+        return True
+
+    def _write_sync(self, item: tuple) -> bool:
+        self._count('sync_writes')
+        return self._write_batch([item])
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _mark_processed(self, count: int) -> None:
+        with self._progress:
+            self._processed += count
+            self._progress.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._write_batch(batch)
+                self._mark_processed(len(batch))
+            elif self._stop_event.is_set() and self._queue.empty():
+                break
+
+    def _collect_batch(self) -> List[tuple]:
+        """凑满 batch_size 条或等待 flush_interval 秒后返回一批记录"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining <= 0 or self._stop_event.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: List[tuple]) -> bool:
+        logs = [record for kind, record in batch if kind == 'log']
+        segments = [record for kind, record in batch if kind == 'segment']
+        written = self._insert(self.db_manager.insert_generation_logs, logs, '生成日志')
+        if written and logs:
+            for listener in self._listeners:
+                try:
+                    listener(logs)
+                except Exception as e:
+                    self.logger.error(f"生成日志写入回调失败: {e}")
+        return self._insert(self.db_manager.insert_segment_metrics, segments, '分段明细') and written
+
+    def _insert(self, insert: Callable[[List[Dict[str, Any]]], Any], records: List[Dict[str, Any]],
+                label: str) -> bool:
+        if not records:
+            return True
+        try:
+            insert(records)
+        except Exception as e:
+            self._count('failed', len(records))
+            LOG_WRITER_RECORDS.labels('failed').inc(len(records))
+            self.logger.error(f"批量写入{label}失败 | 条数: {len(records)} | 错误: {e}")
+            return False
+
+        self._count('written', len(records))
+        self._count('batches')
+        LOG_WRITER_RECORDS.labels('written').inc(len(records))
+        LOG_WRITER_BATCH_SIZE.observe(len(records))
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取写入线程状态"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            "running": self.running,
+            "queue_size": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "overflow_policy": self.overflow_policy,
+            **stats,
+        }
+
+
+# 全局写入线程实例
+_log_writer: Optional[GenerationLogWriter] = None
+
+
+def get_log_writer() -> Optional[GenerationLogWriter]:
+    """获取全局生成日志写入线程（未启动时为None）"""
+    return _log_writer
+
+
+def start_log_writer(db_manager, config=None) -> Optional[GenerationLogWriter]:
+    """按配置创建并启动全局生成日志写入线程"""
+    global _log_writer
+    if config is not None and not config.get('LOG_WRITER_ENABLED', True):
+        return None
+    if _log_writer is not None:
+        return _log_writer
+
+    get = config.get if config is not None else (lambda key, default=None: default)
+    _log_writer = GenerationLogWriter(
+        db_manager,
+        batch_size=get('LOG_WRITER_BATCH_SIZE', 100),
+        flush_interval=get('LOG_WRITER_FLUSH_INTERVAL', 1.0),
+        max_queue=get('LOG_WRITER_MAX_QUEUE', 10000),
+        overflow_policy=get('LOG_WRITER_OVERFLOW', 'block'),
+    )
+    _log_writer.start()
+    atexit.register(_log_writer.stop)
+    return _log_writer
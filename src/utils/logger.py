@@ -1,14 +1,109 @@
 """日志工具模块"""
 
+import json
+import atexit
 import logging
-import os
-from typing import Optional
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from typing import Optional, Dict
 
 from ..config.settings import Config
 
 
+# 本包模块（src.*）使用的日志记录器根名称
+PACKAGE_LOGGER_NAME = __name__.rsplit('.', 2)[0]
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化JSON日志格式化器"""
+
+    EXTRA_FIELDS = ('request_id', 'job_id', 'sample_key')
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value:
+                data[field] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LogSampler(logging.Filter):
+    """
+    逐段日志采样过滤器
+
+    带有 sample_key 与 job_id 的日志按 (job_id, sample_key) 计数：每个作业的每类消息
+    只输出前 first 条以及之后每隔 every 条，其余的只计数，
+    由调用方在作业结束时通过 pop_summary 汇总输出。
+    """
+
+    def __init__(self, first: int = 3, every: int = 100, max_jobs: int = 1000):
+        super().__init__()
+        self.first = first
+        self.every = every
+        self.max_jobs = max_jobs
+        self._counts: Dict[str, Dict[str, list]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample_key', None)
+        job_id = getattr(record, 'job_id', None)
+        # 没有作业ID的日志（如语音预览）无法按作业汇总，不采样
+        if key is None or not job_id:
+            return True
+
+        with self._lock:
+            job_counts = self._counts.get(job_id)
+            if job_counts is None:
+                if len(self._counts) >= self.max_jobs:
+                    # 丢弃最早的作业计数，防止未结束的作业无限累积
+                    self._counts.pop(next(iter(self._counts)))
+                job_counts = self._counts[job_id] = {}
+            counter = job_counts.setdefault(key, [0, 0])  # [总数, 已省略]
+            counter[0] += 1
+            seen = counter[0]
+            if seen <= self.first or (self.every and seen % self.every == 0):
+                return True
+            counter[1] += 1
+            return False
+
+    def pop_summary(self, job_id: str) -> Dict[str, Dict[str, int]]:
+        """取出并清除作业的采样统计"""
+        with self._lock:
+            job_counts = self._counts.pop(job_id or '', {})
+        return {key: {"total": total, "suppressed": suppressed}
+                for key, (total, suppressed) in job_counts.items()}
+
+
+# 全局逐段日志采样器
+LOG_SAMPLER = LogSampler()
+
+_listeners = []
+
+
+def _stop_listeners() -> None:
+    """进程退出时停止监听线程，确保队列中的日志全部写出"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
 def setup_logger(config: Config, name: Optional[str] = None) -> logging.Logger:
-    """设置日志记录器"""
+    """
+    设置日志记录器
+
+    调用线程只把日志记录放入内存队列，由后台监听线程写入
+    滚动文件和控制台，避免请求线程被同步磁盘写入阻塞。
+    """
     
     logger_name = name or __name__
     logger = logging.getLogger(logger_name)
@@ -26,20 +121,50 @@ def setup_logger(config: Config, name: Optional[str] = None) -> logging.Logger:
     logger.setLevel(log_level)
     
     # 创建格式化器
-    formatter = logging.Formatter(log_format)
+    if config.get('LOG_JSON'):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(log_format)
+    
+    handlers = []
     
-    # 文件处理器
+    # 滚动文件处理器
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=config.get('LOG_BACKUP_COUNT', 5),
+            encoding='utf-8'
+        )
         file_handler.setLevel(log_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     
     # 控制台处理器
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
+    
+    # 异步队列处理器，逐段日志在入队前采样
+    LOG_SAMPLER.first = config.get('LOG_SAMPLE_FIRST', LOG_SAMPLER.first)
+    LOG_SAMPLER.every = config.get('LOG_SAMPLE_EVERY', LOG_SAMPLER.every)
+    queue_handler = logging.handlers.QueueHandler(queue.Queue(-1))
+    queue_handler.setLevel(log_level)
+    queue_handler.addFilter(LOG_SAMPLER)
+    logger.addHandler(queue_handler)
+    
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(_stop_listeners)
+    _listeners.append(listener)
+    
+    # 本包各模块的日志也走同一管道
+    package_logger = logging.getLogger(PACKAGE_LOGGER_NAME)
+    if package_logger is not logger and not package_logger.handlers:
+        package_logger.setLevel(log_level)
+        package_logger.addHandler(queue_handler)
     
     return logger
 
@@ -51,5 +176,5 @@ class LoggerMixin:
     def logger(self) -> logging.Logger:
         """获取日志记录器"""
         if not hasattr(self, '_logger'):
-            self._logger = logging.getLogger(self.__class__.__name__)
+            self._logger = logging.getLogger(f"{PACKAGE_LOGGER_NAME}.{self.__class__.__name__}")
         return self._logger
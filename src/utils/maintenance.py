@@ -0,0 +1,153 @@
+"""数据库后台维护模块"""
+
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from .database import month_key, month_range
+
+
+class MaintenanceWorker:
+    """
+    数据库维护线程
+
+    周期性地：
+        1. 预先创建下个月的日志分区，避免跨月时在写入路径上执行DDL
+        2. 按保留天数删除过期的整月分区和分段明细
+        3. 增量回收空闲页，每次只回收少量页以免长时间持有写锁
+    """
+
+    def __init__(self, db_manager, interval: float = 3600, retention_days: int = 0,
+                 vacuum_pages: int = 1000):
+        self.db_manager = db_manager
+        self.interval = interval
+        self.retention_days = retention_days
+        self.vacuum_pages = vacuum_pages
+
+        self.last_run = None
+        self.last_error = None
+        self.runs = 0
+        self.partitions_dropped = 0
+        self.rows_dropped = 0
+        self.free_pages = None
+
+        self.running = False
+        self._thread = None
+        self._wakeup = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> None:
+        """启动维护线程"""
+        if self.running:
+            return
+        self.running = True
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name="DatabaseMaintenance", daemon=True)
+        self._thread.start()
+        retention = f"{self.retention_days}天" if self.retention_days > 0 else "不限"
+        self.logger.info(f"数据库维护线程已启动 | 间隔: {self.interval}s | 日志保留: {retention}")
+
+    def stop(self) -> None:
+        """停止维护线程"""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def trigger(self) -> None:
+        """立即执行一次维护"""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while self.running:
+            self.run_once()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def run_once(self) -> None:
+        """执行一轮维护"""
+        start_time = time.time()
+        try:
+            self._ensure_upcoming_partition()
+
+            if self.retention_days > 0:
+                partitions, rows = self.db_manager.drop_expired_partitions(self.retention_days)
+                self.partitions_dropped += partitions
+                self.rows_dropped += rows
+                self.db_manager.delete_expired_segments(self.retention_days)
+
+            if self.vacuum_pages > 0:
+                free_pages = self.db_manager.incremental_vacuum(self.vacuum_pages)
+                if free_pages == -1 and self.free_pages is None:
+                    self.logger.warning("数据库未启用增量回收，删除分区后的空间将留在文件内复用；"
+                                        "可通过 POST /api/admin/maintenance {\"action\": \"enable_incremental_vacuum\"} 启用")
+                self.free_pages = free_pages
+
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"数据库维护失败: {e}")
+        finally:
+            self.runs += 1
+            self.last_run = time.time()
+            self.logger.debug(f"数据库维护完成 | 耗时: {time.time() - start_time:.2f}s")
+
+    def _ensure_upcoming_partition(self) -> None:
+        current = month_key(int(time.time() * 1000))
+        _, next_month_start, _, _ = month_range(current)
+        with self.db_manager.get_connection() as conn:
+            for key in (current, month_key(next_month_start)):
+                self.db_manager.ensure_partition(conn, key)
+            conn.commit()
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取维护线程状态"""
+        with self.db_manager.get_connection() as conn:
+            partitions = self.db_manager.list_partitions(conn)
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+            "partitions": partitions,
+            "partitions_dropped": self.partitions_dropped,
+            "rows_dropped": self.rows_dropped,
+            # -1 表示数据库未启用增量回收（旧数据库需执行一次 VACUUM）
+            "free_pages": self.free_pages,
+        }
+
+
+# 全局维护线程实例
+_maintenance: Optional[MaintenanceWorker] = None
+
+
+def get_maintenance_worker() -> Optional[MaintenanceWorker]:
+    """获取全局维护线程（未启动时为None）"""
+    return _maintenance
+
+
+def start_maintenance(db_manager, config=None) -> Optional[MaintenanceWorker]:
+    """按配置创建并启动全局维护线程"""
+    global _maintenance
+    if config is not None and not config.get('MAINTENANCE_ENABLED', True):
+        return None
+    if _maintenance is not None:
+        return _maintenance
+
+    get = config.get if config is not None else (lambda key, default=None: default)
+    _maintenance = MaintenanceWorker(
+        db_manager,
+        interval=get('MAINTENANCE_INTERVAL', 3600),
+        retention_days=get('LOG_RETENTION_DAYS', 0),
+        vacuum_pages=get('DB_VACUUM_PAGES', 1000),
+    )
+    _maintenance.start()
+    atexit.register(_maintenance.stop)
+    return _maintenance
@@ -0,0 +1,393 @@
+"""指标统计模块"""
+
+import bisect
+import threading
+from typing import Dict, Any, Optional, Sequence, Callable
+
+
+# 默认延迟分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+class LatencyHistogram:
+    """固定分桶直方图 - 常数内存，支持近似分位数"""
+
+    def __init__(self, buckets: Optional[Sequence[float]] = None):
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为溢出桶
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """记录一个观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """按分桶线性插值计算近似分位数"""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            low_value, high_value = self.min, self.max
+
+        if count == 0:
+            return None
+
+        rank = q / 100.0 * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else high_value
+                lower = max(lower, low_value)
+                upper = min(upper, high_value)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+
+        return high_value
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        p50, p95, p99 = self.percentile(50), self.percentile(95), self.percentile(99)
+
+        def _round(value):
+            return round(value, 4) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": _round(self.total / self.count) if self.count else None,
+            "p50": _round(p50),
+            "p95": _round(p95),
+            "p99": _round(p99),
+            "max": _round(self.max),
+        }
+
+
+def _escape_label_value(value: str) -> str:
+    """转义Prometheus标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """格式化Prometheus样本值"""
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedValues:
+    """
+    按线程分片的累加数组
+
+    每个线程只写自己的分片，热路径上无需加锁；
+    读取时汇总所有分片，已结束线程的分片会被合并回基础分片。
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._base = [0.0] * size
+        self._shards: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, index: int, amount: float = 1.0) -> None:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(ident, [0.0] * self.size)
+        shard[index] += amount
+
+    def totals(self) -> list:
+        alive = {thread.ident for thread in threading.enumerate()}
+        with self._lock:
+            for ident in [ident for ident in self._shards if ident not in alive]:
+                shard = self._shards.pop(ident)
+                for index, value in enumerate(shard):
+                    self._base[index] += value
+
+            totals = list(self._base)
+            for shard in self._shards.values():
+                for index, value in enumerate(shard):
+                    totals[index] += value
+        return totals
+
+
+class _Metric:
+    """指标基类"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """获取指定标签值的子指标"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"指标 {self.name} 需要标签: {self.labelnames}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _default_child(self):
+        """无标签指标的子指标"""
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: tuple, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.extend(extra.items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + '}'
+
+    def collect(self) -> list:
+        """返回指标样本行"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.collect())
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._values.add(0, amount)
+
+    @property
+    def value(self) -> float:
+        return self._values.totals()[0]
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default_child().inc(amount)
+
+    def collect(self) -> list:
+        return [f"{self.name}{self._label_text(key)} {_format_value(child.value)}"
+                for key, child in list(self._children.items())]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """采集时调用函数获取当前值"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float('nan')
+        return self.value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default_child().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default_child().set_function(function)
+
+    def collect(self) -> list:
+        return [f"{self.name}{self._label_text(key)} {_format_value(child.get())}"
+                for key, child in list(self._children.items())]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # 各分桶计数 + 溢出桶 + 总和
+        self._values = _ShardedValues(len(buckets) + 2)
+        self._sum_index = len(buckets) + 1
+
+    def observe(self, value: float) -> None:
+        self._values.add(bisect.bisect_left(self.buckets, value))
+        self._values.add(self._sum_index, value)
+
+    def snapshot(self) -> tuple:
+        totals = self._values.totals()
+        return totals[:self._sum_index], totals[self._sum_index]
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Optional[Sequence[float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default_child().observe(value)
+
+    def collect(self) -> list:
+        lines = []
+        for key, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = {"le": _format_value(bound)}
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """生成Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# 全局指标注册表
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'voiceforge_http_requests_total', 'HTTP请求数', ['endpoint', 'method', 'status'])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'voiceforge_http_request_duration_seconds', 'HTTP请求处理耗时（至响应头）', ['endpoint'])
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'voiceforge_upstream_requests_total', '语音服务器请求数', ['status'])
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    'voiceforge_upstream_request_duration_seconds', '语音服务器请求耗时', ['status'])
+STREAM_TTFB_SECONDS = REGISTRY.histogram(
+    'voiceforge_stream_ttfb_seconds', '流式响应首字节耗时')
+STREAM_SEGMENTS = REGISTRY.histogram(
+    'voiceforge_stream_segments', '每个流式请求的分段数',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'voiceforge_queue_depth', '请求队列中等待的任务数')
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'voiceforge_queue_wait_seconds', '任务从入队到开始执行的等待时间')
+QUEUE_TASK_SECONDS = REGISTRY.histogram(
+    'voiceforge_queue_task_duration_seconds', '任务执行耗时', ['status'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'voiceforge_cache_requests_total', '缓存查询次数', ['cache', 'result'])
+DB_WRITE_SECONDS = REGISTRY.histogram(
+    'voiceforge_db_write_duration_seconds', '数据库写入耗时', ['operation'])
+LOG_WRITER_QUEUE_DEPTH = REGISTRY.gauge(
+    'voiceforge_log_writer_queue_depth', '等待批量写入的生成日志数')
+LOG_WRITER_RECORDS = REGISTRY.counter(
+    'voiceforge_log_writer_records_total', '生成日志写入线程处理的记录数', ['result'])
+LOG_WRITER_BATCH_SIZE = REGISTRY.histogram(
+    'voiceforge_log_writer_batch_size', '每批写入的生成日志数',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存命中或未命中"""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
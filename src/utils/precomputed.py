@@ -0,0 +1,73 @@
+"""
+预计算响应模块
+
+对内容不随请求变化的JSON接口，只序列化一次并预先压缩，
+请求时按 Accept-Encoding 直接返回对应的字节，并用强 ETag 支持 304。
+
+Brotli 为可选依赖，未安装时只提供 gzip。
+"""
+
+import json
+import gzip
+import hashlib
+from typing import Any, Dict
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 取决于部署环境
+    brotli = None
+
+
+class PrecomputedResponse:
+    """
+    一份序列化并压缩好的响应体
+
+    每种编码使用不同的强 ETag（"<摘要>"、"<摘要>-gzip"、"<摘要>-br"），
+    If-None-Match 命中任意一种都返回 304。
+    """
+
+    def __init__(self, payload: Any, mimetype: str = 'application/json'):
+        self.mimetype = mimetype
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+
+        # 内容编码 -> (响应体, ETag)，按优先顺序排列
+        self.encodings: Dict[str, tuple] = {}
+        if brotli is not None:
+            self.encodings['br'] = (brotli.compress(self.body, quality=11), f'{self.digest}-br')
+        self.encodings['gzip'] = (gzip.compress(self.body, compresslevel=9, mtime=0), f'{self.digest}-gzip')
+        self.encodings['identity'] = (self.body, self.digest)
+
+    @property
+    def etags(self):
+        return [etag for _, etag in self.encodings.values()]
+
+    def to_response(self, request, max_age: int = 0) -> Response:
+        """按请求的 Accept-Encoding 与 If-None-Match 生成响应"""
+        # 按客户端给出的质量值选择（q=0 表示拒绝），质量相同时按 self.encodings 的顺序；都不接受时不压缩
+        encoding = request.accept_encodings.best_match(
+            [name for name in self.encodings if name != 'identity']
+        ) or 'identity'
+        body, etag = self.encodings[encoding]
+
+        if any(request.if_none_match.contains(candidate) for candidate in self.etags):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response
+
+    def get_status(self) -> Dict[str, Any]:
+        """各编码的大小"""
+        return {
+            "etag": self.digest,
+            "sizes": {name: len(body) for name, (body, _) in self.encodings.items()},
+        }
@@ -0,0 +1,258 @@
+"""
+语音预览缓存模块
+
+默认预览文本的试听音频对每个语音都是固定的，生成一次后持久保存：
+    - 缓存目录：每个 (语音, 文本) 一个文件，首次试听时写入
+    - 预览包：scripts/warm_previews.py 为目录中全部语音预先生成后打包成单个文件，
+      各 worker 以只读方式 mmap，同一份页缓存在进程间共享
+
+预览包格式（小端）：
+    文件头  magic(8) 版本(u32) 条目数(u32)
+    索引    每个条目 (键(16), 偏移(u64), 长度(u32))，偏移相对文件开头
+    数据    各条目的音频依次拼接
+"""
+
+import os
+import mmap
+import logging
+import time
+import struct
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import record_cache
+
+
+PACK_MAGIC = b'VFPREVW\x00'
+PACK_VERSION = 1
+
+_PACK_HEADER = struct.Struct('<8sII')
+_PACK_ENTRY = struct.Struct('<16sQI')
+
+# 预览包变化的检查间隔（秒）
+PACK_CHECK_INTERVAL = 10.0
+
+
+def preview_key(voice: str, text: str) -> bytes:
+    """(语音, 文本) 的缓存键"""
+    return hashlib.sha256(f"{voice}\x00{text}".encode('utf-8')).digest()[:16]
+
+
+def write_preview_pack(entries: Iterable[Tuple[bytes, bytes]], path: str) -> Dict[str, int]:
+    """
+    把 (键, 音频) 写成预览包（先写临时文件再原子替换，正在读取旧文件的进程不受影响）
+
+    Returns:
+        {"entries": 条目数, "size": 文件大小}
+    """
+    entries = list(entries)
+    position = _PACK_HEADER.size + _PACK_ENTRY.size * len(entries)
+    index = []
+    for key, data in entries:
+        index.append(_PACK_ENTRY.pack(key, position, len(data)))
+        position += len(data)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries)))
+        f.write(b''.join(index))
+        for _, data in entries:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return {"entries": len(entries), "size": position}
+
+
+class PreviewPack:
+    """只读映射的预览包"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.signature = (stat.st_mtime_ns, stat.st_size)
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _PACK_HEADER.unpack_from(self._buffer, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"不是预览包文件: {path}")
+
+        # 键 -> (偏移, 长度)
+        self._index: Dict[bytes, Tuple[int, int]] = {
+            key: (offset, length)
+            for key, offset, length in _PACK_ENTRY.iter_unpack(
+                self._buffer[_PACK_HEADER.size:_PACK_HEADER.size + _PACK_ENTRY.size * count])
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._buffer[offset:offset + length]
+
+
+class PreviewCache:
+    """
+    默认文本预览音频的持久缓存
+
+    查找顺序：预览包 -> 缓存目录 -> 调用 render 生成并写入缓存目录。
+    同一个键同时只有一个线程生成，其他线程等待结果。
+    """
+
+    def __init__(self, directory: str = '', pack_path: str = ''):
+        self.directory = directory
+        self.pack_path = pack_path
+        self.logger = logging.getLogger(__name__)
+
+        self._pack: Optional[PreviewPack] = None
+        self._pack_checked = 0.0
+        self._lock = threading.Lock()
+        # 正在生成的键 -> 锁
+        self._rendering: Dict[bytes, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _file_path(self, key: bytes) -> str:
+        return os.path.join(self.directory, key.hex() + '.mp3')
+
+    def _current_pack(self) -> Optional[PreviewPack]:
+        """当前预览包，文件被替换后重新映射"""
+        if not self.pack_path:
+            return None
+        now = time.monotonic()
+        if now - self._pack_checked < PACK_CHECK_INTERVAL:
+            return self._pack
+
+        with self._lock:
+            if now - self._pack_checked < PACK_CHECK_INTERVAL:
+                return self._pack
+            self._pack_checked = now
+            try:
+                stat = os.stat(self.pack_path)
+            except OSError:
+                self._pack = None
+                return None
+            if self._pack is None or self._pack.signature != (stat.st_mtime_ns, stat.st_size):
+                try:
+                    # 旧的映射不主动关闭，正在读取的线程用完后由垃圾回收释放
+                    self._pack = PreviewPack(self.pack_path)
+                except (OSError, ValueError, struct.error) as e:
+                    self.logger.warning(f"加载预览包失败: {self.pack_path} | {e}")
+                    self._pack = None
+            return self._pack
+
+    def get(self, voice: str, text: str) -> Optional[bytes]:
+        """读取缓存的预览音频，未缓存时返回None"""
+        key = preview_key(voice, text)
+        pack = self._current_pack()
+        if pack is not None:
+            data = pack.get(key)
+            if data is not None:
+                return data
+
+        if self.directory:
+            try:
+                with open(self._file_path(key), 'rb') as f:
+                    return f.read()
+            except OSError:
+                pass
+        return None
+
+    def put(self, voice: str, text: str, data: bytes) -> None:
+        """把预览音频写入缓存目录"""
+        if not self.directory or not data:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._file_path(preview_key(voice, text))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_or_render(self, voice: str, text: str,
+                      render: Callable[[], Optional[bytes]]) -> Tuple[Optional[bytes], bool]:
+        """
+        读取缓存，未命中时调用 render 生成并缓存
+
+        Returns:
+            (音频数据, 是否命中缓存)；render 返回None（生成失败）时不缓存
+        """
+        data = self.get(voice, text)
+        if data is not None:
+            self._record(True)
+            return data, True
+
+        key = preview_key(voice, text)
+        with self._lock:
+            lock = self._rendering.setdefault(key, threading.Lock())
+        with lock:
+            try:
+                # 等待期间其他线程可能已经生成
+                data = self.get(voice, text)
+                if data is not None:
+                    self._record(True)
+                    return data, True
+
+                self._record(False)
+                data = render()
+                if data:
+                    try:
+                        self.put(voice, text, data)
+                    except OSError as e:
+                        self.logger.warning(f"写入预览缓存失败: {voice} | {e}")
+                return data, False
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+
+    def _record(self, hit: bool) -> None:
+        record_cache('preview', hit)
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取缓存状态"""
+        pack = self._current_pack()
+        files = 0
+        if self.directory and os.path.isdir(self.directory):
+            files = sum(1 for name in os.listdir(self.directory) if name.endswith('.mp3'))
+        return {
+            "directory": self.directory,
+            "files": files,
+            "pack_path": self.pack_path,
+            "pack_entries": len(pack) if pack is not None else 0,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+# 全局预览缓存实例
+_preview_cache: Optional[PreviewCache] = None
+
+
+def get_preview_cache() -> PreviewCache:
+    """获取全局预览缓存实例（未配置时不做持久缓存）"""
+    global _preview_cache
+    if _preview_cache is None:
+        _preview_cache = PreviewCache()
+    return _preview_cache
+
+
+def start_preview_cache(config) -> PreviewCache:
+    """按配置设置全局预览缓存的目录与预览包路径"""
+    cache = get_preview_cache()
+    if config:
+        cache.directory = config.get('PREVIEW_CACHE_DIR', cache.directory)
+        cache.pack_path = config.get('PREVIEW_PACK_PATH', cache.pack_path)
+        cache._pack_checked = 0.0
+    return cache
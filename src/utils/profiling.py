@@ -0,0 +1,89 @@
+"""按需请求性能分析模块"""
+
+import os
+import io
+import cProfile
+import pstats
+import logging
+import threading
+from typing import List, Optional
+
+
+class RequestProfiler:
+    """
+    单个请求的性能分析器
+
+    请求线程和队列工作线程各自使用独立的 cProfile.Profile，
+    请求结束时合并为一个 .prof 文件，并附带按累计耗时排序的文本摘要。
+    """
+
+    def __init__(self, request_id: str, output_dir: str):
+        self.request_id = request_id
+        self.output_dir = output_dir
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.logger = logging.getLogger(__name__)
+
+    def _enable(self) -> Optional[cProfile.Profile]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # 同一线程已有其他分析器在运行
+            self.logger.warning(f"无法启用性能分析 | ID: {self.request_id} | {e}")
+            return None
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def start(self) -> None:
+        """在当前线程开始分析"""
+        if getattr(self._local, 'profile', None) is None:
+            self._local.profile = self._enable()
+
+    def stop(self) -> None:
+        """停止当前线程的分析"""
+        profile = getattr(self._local, 'profile', None)
+        if profile is not None:
+            profile.disable()
+            self._local.profile = None
+
+    def run(self, func, *args, **kwargs):
+        """在分析器下执行函数（用于队列工作线程）"""
+        if getattr(self._local, 'profile', None) is not None:
+            return func(*args, **kwargs)
+
+        profile = self._enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def dump(self) -> Optional[str]:
+        """合并所有线程的分析结果并写入输出目录"""
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stats_path = os.path.join(self.output_dir, f"{self.request_id}.prof")
+
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(stats_path)
+
+            summary = io.StringIO()
+            pstats.Stats(stats_path, stream=summary).sort_stats('cumulative').print_stats(60)
+            with open(os.path.join(self.output_dir, f"{self.request_id}.txt"), 'w', encoding='utf-8') as f:
+                f.write(summary.getvalue())
+
+            self.logger.info(f"性能分析结果已保存 | ID: {self.request_id} | 文件: {stats_path}")
+            return stats_path
+        except Exception as e:
+            self.logger.error(f"保存性能分析结果失败 | ID: {self.request_id} | {e}")
+            return None
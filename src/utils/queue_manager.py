@@ -3,9 +3,17 @@
 import threading
 import time
 import queue
-from typing import Optional, Callable, Any
+import itertools
+from collections import deque
+from typing import Optional, Callable, Any, Dict
 from dataclasses import dataclass
 from ..utils.logger import LoggerMixin
+from ..utils.estimator import ServiceTimeEstimator
+from ..utils.tracing import get_trace
+from ..utils.metrics import LatencyHistogram, QUEUE_DEPTH, QUEUE_WAIT_SECONDS, QUEUE_TASK_SECONDS
+
+# 重试次数分桶
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
 
 
 @dataclass
@@ -17,6 +25,14 @@ class QueueTask:
     kwargs: dict
     callback: Optional[Callable] = None
     priority: int = 0  # 优先级，数字越小优先级越高
+    job_id: str = ""  # 所属作业（如一次流式请求）
+    text_length: int = 0
+    voice: str = ""
+    estimated_seconds: float = 0.0
+    submit_time: float = 0.0
+    start_time: float = 0.0
+    retries: int = 0
+    request_id: str = ""  # 所属请求ID，用于追踪
 
 
 class RequestQueueManager(LoggerMixin):
@@ -36,10 +52,28 @@ class RequestQueueManager(LoggerMixin):
         self.lock = threading.Lock()
         self.current_task = None
         
-        # 统计信息
+        # 耗时估计
+        self.estimator = ServiceTimeEstimator()
+        self._sequence = itertools.count()
+        self._pending: Dict[tuple, QueueTask] = {}
+        self._running: Dict[str, tuple] = {}
+        
+        # 统计信息（由 _stats_lock 保护）
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
         self.total_tasks = 0
         self.completed_tasks = 0
         self.failed_tasks = 0
+        self.total_retries = 0
+        self.wait_time = LatencyHistogram()
+        self.execution_time = LatencyHistogram()
+        self.callback_time = LatencyHistogram()
+        self.retry_count = LatencyHistogram(RETRY_BUCKETS)
+        self._worker_stats: Dict[str, Dict[str, float]] = {}
+        self.depth_samples = deque(maxlen=300)
+        self.depth_sample_interval = 1.0
+        self._last_depth_sample = 0.0
+        QUEUE_DEPTH.set_function(self.task_queue.qsize)
         
         self.logger.info(f"请求队列管理器初始化 | 最大工作线程: {max_workers}")
     
@@ -73,7 +107,7 @@ class RequestQueueManager(LoggerMixin):
             
             # 向队列添加停止信号
             for _ in range(self.max_workers):
-                self.task_queue.put((0, time.time(), None))
+                self.task_queue.put((0, time.time(), next(self._sequence), None))
         
         # 等待所有工作线程结束
         for worker in self.workers:
@@ -88,7 +122,11 @@ class RequestQueueManager(LoggerMixin):
                    args: tuple = (),
                    kwargs: dict = None,
                    callback: Optional[Callable] = None,
-                   priority: int = 0) -> bool:
+                   priority: int = 0,
+                   job_id: str = "",
+                   text_length: int = 0,
+                   voice: str = "",
+                   request_id: str = "") -> bool:
         """
         提交任务到队列
         
@@ -99,6 +137,10 @@ class RequestQueueManager(LoggerMixin):
             kwargs: 函数关键字参数
             callback: 完成回调函数
             priority: 优先级（数字越小优先级越高）
+            job_id: 所属作业ID，用于估计作业完成时间
+            text_length: 任务字符数，用于估计服务时间
+            voice: 任务使用的语音
+            request_id: 所属请求ID，用于追踪
         
         Returns:
             bool: 是否成功提交
@@ -109,27 +151,42 @@ class RequestQueueManager(LoggerMixin):
         if kwargs is None:
             kwargs = {}
         
+        submit_time = time.time()
         task = QueueTask(
             task_id=task_id,
             func=func,
             args=args,
             kwargs=kwargs,
             callback=callback,
-            priority=priority
+            priority=priority,
+            job_id=job_id,
+            text_length=text_length,
+            voice=voice,
+            estimated_seconds=self.estimator.estimate(text_length, voice),
+            submit_time=submit_time,
+            request_id=request_id
         )
         
-        # 使用优先级队列，优先级相同时按提交时间排序
-        queue_item = (priority, time.time(), task)
+        # 使用优先级队列，优先级相同时按提交时间和提交顺序排序
+        queue_key = (priority, submit_time, next(self._sequence))
+        queue_item = queue_key + (task,)
         
         try:
+            with self.lock:
+                self._pending[queue_key] = task
             self.task_queue.put(queue_item, timeout=1.0)
-            self.total_tasks += 1
+            with self._stats_lock:
+                self.total_tasks += 1
             
             queue_size = self.task_queue.qsize()
-            self.logger.info(f"任务已提交到队列 | ID: {task_id} | 队列长度: {queue_size}")
+            self._sample_depth(submit_time, queue_size)
+            self.logger.info(f"任务已提交到队列 | ID: {task_id} | 队列长度: {queue_size}",
+                             extra={'sample_key': 'queue.submit', 'job_id': job_id})
             
             return True
         except queue.Full:
+            with self.lock:
+                self._pending.pop(queue_key, None)
             self.logger.error(f"队列已满，任务提交失败 | ID: {task_id}")
             return False
     
@@ -138,40 +195,85 @@ class RequestQueueManager(LoggerMixin):
         thread_name = threading.current_thread().name
         self.logger.info(f"工作线程启动: {thread_name}")
         
+        with self._stats_lock:
+            worker_stats = {"started": time.time(), "busy": 0.0, "tasks": 0, "busy_since": 0.0}
+            self._worker_stats[thread_name] = worker_stats
+        
         while self.running:
             try:
                 # 获取任务，超时1秒
                 queue_item = self.task_queue.get(timeout=1.0)
-                priority, submit_time, task = queue_item
+                priority, submit_time, sequence, task = queue_item
                 
                 # 检查停止信号
                 if task is None:
                     break
                 
+                start_time = time.time()
+                with self.lock:
+                    self._pending.pop((priority, submit_time, sequence), None)
+                    self._running[thread_name] = (task, start_time)
+                
+                task.start_time = start_time
                 self.current_task = task
+                self._local.task = task
                 queue_size = self.task_queue.qsize()
+                self.wait_time.observe(start_time - submit_time)
+                QUEUE_WAIT_SECONDS.observe(start_time - submit_time)
+                self._sample_depth(start_time, queue_size)
+                with self._stats_lock:
+                    worker_stats["busy_since"] = start_time
                 
-                self.logger.info(f"开始处理任务 | ID: {task.task_id} | 剩余队列: {queue_size}")
+                self.logger.info(f"开始处理任务 | ID: {task.task_id} | 剩余队列: {queue_size}",
+                                 extra={'sample_key': 'queue.start', 'job_id': task.job_id})
                 
-                start_time = time.time()
                 result = None
                 error = None
                 
+                # 在请求追踪中记录排队等待与执行片段
+                trace = get_trace(task.request_id)
+                execute_span = None
+                if trace is not None:
+                    trace.start_span('queue.wait', start=submit_time, task_id=task.task_id).finish(start_time)
+                    execute_span = trace.start_span('queue.execute', start=start_time, task_id=task.task_id)
+                
                 try:
                     # 执行任务
-                    result = task.func(*task.args, **task.kwargs)
-                    self.completed_tasks += 1
+                    if execute_span is not None:
+                        with trace.activate(execute_span):
+                            if trace.profiler is not None:
+                                result = trace.profiler.run(task.func, *task.args, **task.kwargs)
+                            else:
+                                result = task.func(*task.args, **task.kwargs)
+                    else:
+                        result = task.func(*task.args, **task.kwargs)
                     
                     elapsed = time.time() - start_time
-                    self.logger.info(f"任务完成 | ID: {task.task_id} | 耗时: {elapsed:.2f}s")
+                    with self._stats_lock:
+                        self.completed_tasks += 1
+                    if task.text_length:
+                        self.estimator.observe(task.text_length, task.voice, elapsed)
+                    self.logger.info(f"任务完成 | ID: {task.task_id} | 耗时: {elapsed:.2f}s",
+                                     extra={'sample_key': 'queue.done', 'job_id': task.job_id})
                     
                 except Exception as e:
                     error = e
-                    self.failed_tasks += 1
+                    with self._stats_lock:
+                        self.failed_tasks += 1
                     self.logger.error(f"任务执行失败 | ID: {task.task_id} | 错误: {str(e)}")
                 
                 finally:
                     self.current_task = None
+                    self._local.task = None
+                    with self.lock:
+                        self._running.pop(thread_name, None)
+                    
+                    execution_end = time.time()
+                    if execute_span is not None:
+                        execute_span.finish(execution_end, retries=task.retries, success=error is None)
+                    self.execution_time.observe(execution_end - start_time)
+                    QUEUE_TASK_SECONDS.labels('error' if error else 'success').observe(execution_end - start_time)
+                    self.retry_count.observe(task.retries)
                     
                     # 调用回调函数
                     if task.callback:
@@ -180,6 +282,14 @@ class RequestQueueManager(LoggerMixin):
                         except Exception as e:
                             self.logger.error(f"回调函数执行失败 | ID: {task.task_id} | 错误: {str(e)}")
                     
+                    finished = time.time()
+                    self.callback_time.observe(finished - execution_end)
+                    with self._stats_lock:
+                        self.total_retries += task.retries
+                        worker_stats["busy"] += finished - start_time
+                        worker_stats["tasks"] += 1
+                        worker_stats["busy_since"] = 0.0
+                    
                     # 标记任务完成
                     self.task_queue.task_done()
                 
@@ -191,16 +301,155 @@ class RequestQueueManager(LoggerMixin):
         
         self.logger.info(f"工作线程结束: {thread_name}")
     
+    def current_worker_task(self) -> Optional[QueueTask]:
+        """当前工作线程正在执行的任务（不在工作线程内调用时为None）"""
+        return getattr(self._local, 'task', None)
+    
+    def note_retry(self) -> None:
+        """由任务函数在工作线程内调用，记录当前任务的一次重试"""
+        task = getattr(self._local, 'task', None)
+        if task is not None:
+            task.retries += 1
+    
+    def _sample_depth(self, now: float, depth: int) -> None:
+        """按固定间隔记录队列深度"""
+        if now - self._last_depth_sample < self.depth_sample_interval:
+            return
+        with self._stats_lock:
+            if now - self._last_depth_sample >= self.depth_sample_interval:
+                self._last_depth_sample = now
+                self.depth_samples.append((round(now, 3), depth))
+    
+    def _worker_utilization(self, now: float) -> Dict[str, Dict[str, Any]]:
+        """各工作线程的繁忙比例"""
+        utilization = {}
+        with self._stats_lock:
+            for name, stats in self._worker_stats.items():
+                busy = stats["busy"]
+                if stats["busy_since"]:
+                    busy += now - stats["busy_since"]
+                uptime = max(now - stats["started"], 1e-9)
+                utilization[name] = {
+                    "tasks": stats["tasks"],
+                    "busy_seconds": round(busy, 3),
+                    "busy_ratio": round(min(busy / uptime, 1.0), 4)
+                }
+        return utilization
+    
+    def _in_progress_seconds(self, now: float) -> float:
+        """正在执行的任务预计剩余耗时之和（需持有锁）"""
+        remaining = 0.0
+        for task, start_time in self._running.values():
+            remaining += max(task.estimated_seconds - (now - start_time), 0.0)
+        return remaining
+    
+    def estimate_drain_seconds(self) -> float:
+        """估计清空当前队列所需的时间（秒）"""
+        now = time.time()
+        with self.lock:
+            backlog = sum(task.estimated_seconds for task in self._pending.values())
+            backlog += self._in_progress_seconds(now)
+        return backlog / max(self.max_workers, 1)
+    
+    def estimate_submission(self, text_length: int, voice: str = "", segments: int = 1) -> Dict[str, Any]:
+        """
+        估计一个新作业在当前队列状况下的等待与完成时间
+        
+        Args:
+            text_length: 作业总字符数
+            voice: 使用的语音
+            segments: 作业将拆分成的任务数
+        
+        Returns:
+            dict: 排队等待、服务耗时与预计完成时间
+        """
+        segments = max(int(segments), 1)
+        per_segment_chars = max(int(text_length) // segments, 1)
+        service_seconds = self.estimator.estimate(per_segment_chars, voice) * segments / max(self.max_workers, 1)
+        wait_seconds = self.estimate_drain_seconds()
+        now = time.time()
+        
+        return {
+            "queue_size": self.task_queue.qsize(),
+            "wait_seconds": round(wait_seconds, 2),
+            "service_seconds": round(service_seconds, 2),
+            "eta_seconds": round(wait_seconds + service_seconds, 2),
+            "predicted_completion": now + wait_seconds + service_seconds
+        }
+    
+    def get_job_eta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        估计指定作业的剩余完成时间
+        
+        作业之前（按队列顺序）的所有待处理任务加上作业自身的任务
+        都需要完成，作业才算完成。
+        """
+        if not job_id:
+            return None
+        
+        now = time.time()
+        with self.lock:
+            job_keys = [key for key, task in self._pending.items() if task.job_id == job_id]
+            running = [task for task, _ in self._running.values() if task.job_id == job_id]
+            if not job_keys and not running:
+                return None
+            
+            backlog = self._in_progress_seconds(now)
+            if job_keys:
+                last_key = max(job_keys)
+                backlog += sum(task.estimated_seconds for key, task in self._pending.items() if key <= last_key)
+        
+        eta_seconds = backlog / max(self.max_workers, 1)
+        return {
+            "job_id": job_id,
+            "pending_tasks": len(job_keys),
+            "running_tasks": len(running),
+            "eta_seconds": round(eta_seconds, 2),
+            "predicted_completion": now + eta_seconds
+        }
+    
     def get_status(self) -> dict:
         """获取队列状态"""
+        with self.lock:
+            job_ids = {task.job_id for task in self._pending.values() if task.job_id}
+            job_ids.update(task.job_id for task, _ in self._running.values() if task.job_id)
+        
+        jobs = [self.get_job_eta(job_id) for job_id in sorted(job_ids)]
+        
+        now = time.time()
+        queue_size = self.task_queue.qsize()
+        self._sample_depth(now, queue_size)
+        
+        with self._stats_lock:
+            counters = {
+                "total_tasks": self.total_tasks,
+                "completed_tasks": self.completed_tasks,
+                "failed_tasks": self.failed_tasks,
+                "total_retries": self.total_retries,
+            }
+            depth_history = list(self.depth_samples)
+        
+        current_task = self.current_task
+        
         return {
             "running": self.running,
-            "queue_size": self.task_queue.qsize(),
-            "total_tasks": self.total_tasks,
-            "completed_tasks": self.completed_tasks,
-            "failed_tasks": self.failed_tasks,
-            "current_task": self.current_task.task_id if self.current_task else None,
-            "workers": len(self.workers)
+            "queue_size": queue_size,
+            **counters,
+            "current_task": current_task.task_id if current_task else None,
+            "workers": len(self.workers),
+            "latency": {
+                "wait": self.wait_time.to_dict(),
+                "execution": self.execution_time.to_dict(),
+                "callback": self.callback_time.to_dict(),
+                "retries": self.retry_count.to_dict()
+            },
+            "utilization": self._worker_utilization(now),
+            "depth_history": depth_history,
+            "estimates": {
+                "drain_seconds": round(self.estimate_drain_seconds(), 2),
+                "jobs": [job for job in jobs if job],
+                "service_time": self.estimator.to_dict()
+            }
         }
     
     def wait_for_completion(self, timeout: Optional[float] = None):
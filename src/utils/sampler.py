@@ -0,0 +1,195 @@
+"""常驻低开销采样分析器"""
+
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+
+# 叶子帧为这些函数时视为线程处于等待状态（不占用CPU/GIL）
+IDLE_FUNCTIONS = frozenset({
+    'wait', 'sleep', 'select', 'poll', 'epoll', 'accept', 'recv', 'recv_into',
+    'read', 'readinto', 'get', 'acquire', '_wait_for_tstate_lock', 'join',
+})
+
+# 超出栈表上限时，新出现的栈计入此条目
+OVERFLOW_STACK = '[truncated]'
+
+_THREAD_NUMBER = re.compile(r'\d+')
+
+
+class StackSampler:
+    """
+    周期性采集所有线程的调用栈并聚合为折叠栈（collapsed stacks）
+
+    采样间隔会根据单次采样耗时自动放大，使采样线程的耗时占比
+    不超过 target_overhead。输出格式可直接交给 flamegraph.pl 或 speedscope。
+    """
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 5000,
+                 max_depth: int = 64, target_overhead: float = 0.01):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.target_overhead = target_overhead
+
+        self.stacks: Dict[str, int] = {}
+        self.idle_stacks: Dict[str, int] = {}
+        self.runnable_threads: Dict[int, int] = {}
+        self.samples = 0
+        self.dropped = 0
+        self.sampling_time = 0.0
+        self.started_at = None
+
+        self.running = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> None:
+        """启动采样线程"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+            self._thread.start()
+        self.logger.info(f"采样分析器已启动 | 间隔: {self.interval * 1000:.0f}ms | 目标开销: {self.target_overhead:.1%}")
+
+    def stop(self) -> None:
+        """停止采样线程"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def reset(self) -> None:
+        """清空已聚合的数据"""
+        with self._lock:
+            self.stacks = {}
+            self.idle_stacks = {}
+            self.runnable_threads = {}
+            self.samples = 0
+            self.dropped = 0
+            self.sampling_time = 0.0
+            self.started_at = time.time()
+
+    def _run(self) -> None:
+        while self.running:
+            begin = time.perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                self.logger.error(f"采样失败: {e}")
+            cost = time.perf_counter() - begin
+
+            # 自适应间隔：cost / (cost + sleep) <= target_overhead
+            time.sleep(max(self.interval, cost / self.target_overhead - cost))
+
+    def _frame_label(self, code) -> str:
+        filename = os.path.basename(code.co_filename)
+        return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+    def sample(self) -> None:
+        """采集一次所有线程的调用栈"""
+        begin = time.perf_counter()
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        collected = []
+        runnable = 0
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+
+            idle = frame.f_code.co_name in IDLE_FUNCTIONS
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(_THREAD_NUMBER.sub('N', names.get(ident, 'unknown')))
+            labels.reverse()
+
+            collected.append((';'.join(labels), idle))
+            if not idle:
+                runnable += 1
+
+        with self._lock:
+            for stack, idle in collected:
+                table = self.idle_stacks if idle else self.stacks
+                if stack in table:
+                    table[stack] += 1
+                elif len(self.stacks) + len(self.idle_stacks) < self.max_stacks:
+                    table[stack] = 1
+                else:
+                    self.dropped += 1
+                    self.stacks[OVERFLOW_STACK] = self.stacks.get(OVERFLOW_STACK, 0) + 1
+            self.runnable_threads[runnable] = self.runnable_threads.get(runnable, 0) + 1
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - begin
+
+    def collapsed(self, mode: str = 'wall') -> str:
+        """
+        输出折叠栈文本
+
+        Args:
+            mode: 'wall' 包含等待中的线程（墙钟时间），'cpu' 只包含运行中的线程
+        """
+        with self._lock:
+            stacks = dict(self.stacks)
+            if mode == 'wall':
+                for stack, count in self.idle_stacks.items():
+                    stacks[stack] = stacks.get(stack, 0) + count
+
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取采样器状态"""
+        with self._lock:
+            elapsed = time.time() - self.started_at if self.started_at else 0.0
+            contended = sum(count for threads, count in self.runnable_threads.items() if threads > 1)
+            return {
+                "running": self.running,
+                "samples": self.samples,
+                "elapsed_seconds": round(elapsed, 1),
+                "effective_interval_ms": round(elapsed / self.samples * 1000, 2) if self.samples else None,
+                "overhead_ratio": round(self.sampling_time / elapsed, 5) if elapsed else None,
+                "unique_stacks": len(self.stacks) + len(self.idle_stacks),
+                "dropped_samples": self.dropped,
+                "runnable_threads": {str(k): v for k, v in sorted(self.runnable_threads.items())},
+                # 同时有多个线程在执行Python代码的采样占比，反映GIL争用程度
+                "gil_contention_ratio": round(contended / self.samples, 4) if self.samples else None,
+            }
+
+
+# 全局采样器实例
+_sampler: Optional[StackSampler] = None
+
+
+def get_sampler() -> StackSampler:
+    """获取全局采样器实例"""
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler()
+    return _sampler
+
+
+def start_sampler(config) -> Optional[StackSampler]:
+    """按配置启动全局采样器"""
+    if not config or not config.get('SAMPLER_ENABLED'):
+        return None
+
+    sampler = get_sampler()
+    sampler.interval = config.get('SAMPLER_INTERVAL', sampler.interval)
+    sampler.max_stacks = config.get('SAMPLER_MAX_STACKS', sampler.max_stacks)
+    sampler.target_overhead = config.get('SAMPLER_MAX_OVERHEAD', sampler.target_overhead)
+    sampler.start()
+    return sampler
@@ -0,0 +1,195 @@
+"""统计汇总表维护模块"""
+
+import re
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, Iterable, Tuple
+
+
+# 错误消息中会变化的部分（数字、十六进制ID、引号内容），归一化后作为错误指纹
+_VOLATILE_PATTERNS = (
+    (re.compile(r'[0-9a-fA-F]{8,}'), '<hex>'),
+    (re.compile(r'\d+(\.\d+)?'), '<n>'),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), '<s>'),
+)
+
+ROLLUP_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        date TEXT NOT NULL,
+        voice TEXT NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        chars INTEGER NOT NULL DEFAULT 0,
+        duration_sum REAL NOT NULL DEFAULT 0,
+        duration_count INTEGER NOT NULL DEFAULT 0,
+        audio_size_sum INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (date, voice, status)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS error_fingerprints (
+        fingerprint TEXT PRIMARY KEY,
+        pattern TEXT NOT NULL,
+        sample_message TEXT,
+        count INTEGER NOT NULL DEFAULT 0,
+        first_seen_ms INTEGER,
+        last_seen_ms INTEGER
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_error_fingerprints_count ON error_fingerprints (count)',
+)
+
+# v7 为 stats_daily 补充的音频时长列：
+#   audio_duration_sum: 可解析时长的音频总秒数
+#   rtf_duration_sum:   这些记录的生成耗时之和，与上一列相除即实时率（RTF）
+ROLLUP_AUDIO_COLUMNS = (
+    ('audio_duration_sum', 'REAL NOT NULL DEFAULT 0'),
+    ('rtf_duration_sum', 'REAL NOT NULL DEFAULT 0'),
+)
+
+
+def normalize_error(message: str) -> str:
+    """去掉错误消息中会变化的部分"""
+    pattern = (message or '').strip()[:500]
+    for regex, replacement in _VOLATILE_PATTERNS:
+        pattern = regex.sub(replacement, pattern)
+    return pattern[:200]
+
+
+def error_fingerprint(message: str) -> Tuple[str, str]:
+    """计算错误指纹，返回 (指纹, 归一化后的消息)"""
+    pattern = normalize_error(message)
+    return hashlib.sha1(pattern.encode('utf-8')).hexdigest()[:16], pattern
+
+
+def local_date(ts_ms: int) -> str:
+    """毫秒时间戳对应的本地日期"""
+    return datetime.fromtimestamp(ts_ms / 1000).date().isoformat()
+
+
+def aggregate(records: Iterable[Dict[str, Any]]) -> Tuple[Dict[tuple, list], Dict[str, list]]:
+    """
+    把一批日志记录聚合为汇总表的增量
+
+    Returns:
+        (按 (日期, 语音, 状态) 的增量, 按错误指纹的增量)
+    """
+    daily: Dict[tuple, list] = {}
+    errors: Dict[str, list] = {}
+
+    for record in records:
+        key = (local_date(record['ts_ms']), record['voice'], record['status'] or 'success')
+        # [count, chars, duration_sum, duration_count, audio_size_sum, audio_duration_sum, rtf_duration_sum]
+        totals = daily.setdefault(key, [0, 0, 0.0, 0, 0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += record['text_length'] or 0
+        if record['duration'] is not None:
+            totals[2] += record['duration']
+            totals[3] += 1
+        totals[4] += record['audio_size'] or 0
+        if record.get('audio_duration') and record['duration'] is not None:
+            totals[5] += record['audio_duration']
+            totals[6] += record['duration']
+
+        if record['status'] == 'error' and record['error_message']:
+            fingerprint, pattern = error_fingerprint(record['error_message'])
+            # [pattern, sample_message, count, first_seen_ms, last_seen_ms]
+            entry = errors.get(fingerprint)
+            if entry is None:
+                errors[fingerprint] = [pattern, record['error_message'][:500], 1, record['ts_ms'], record['ts_ms']]
+            else:
+                entry[2] += 1
+                entry[3] = min(entry[3], record['ts_ms'])
+                if record['ts_ms'] >= entry[4]:
+                    entry[1] = record['error_message'][:500]
+                    entry[4] = record['ts_ms']
+
+    return daily, errors
+
+
+_UPSERT_ERROR_SQL = '''
+    INSERT INTO error_fingerprints (fingerprint, pattern, sample_message, count, first_seen_ms, last_seen_ms)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (fingerprint) DO UPDATE SET
+        count = count + excluded.count,
+        first_seen_ms = MIN(first_seen_ms, excluded.first_seen_ms),
+        sample_message = CASE WHEN excluded.last_seen_ms >= last_seen_ms
+                              THEN excluded.sample_message ELSE sample_message END,
+        last_seen_ms = MAX(last_seen_ms, excluded.last_seen_ms)
+'''
+
+
+def _upsert_errors(conn, errors: Dict[str, list]) -> None:
+    conn.executemany(_UPSERT_ERROR_SQL, [(fingerprint, *entry) for fingerprint, entry in errors.items()])
+
+
+def apply_records(conn, records: Iterable[Dict[str, Any]]) -> None:
+    """把新写入的记录累加到汇总表（应在写入记录的同一事务中调用）"""
+    daily, errors = aggregate(records)
+
+    conn.executemany('''
+        INSERT INTO stats_daily (date, voice, status, count, chars, duration_sum, duration_count, audio_size_sum,
+                                 audio_duration_sum, rtf_duration_sum)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (date, voice, status) DO UPDATE SET
+            count = count + excluded.count,
+            chars = chars + excluded.chars,
+            duration_sum = duration_sum + excluded.duration_sum,
+            duration_count = duration_count + excluded.duration_count,
+            audio_size_sum = audio_size_sum + excluded.audio_size_sum,
+            audio_duration_sum = audio_duration_sum + excluded.audio_duration_sum,
+            rtf_duration_sum = rtf_duration_sum + excluded.rtf_duration_sum
+    ''', [key + tuple(totals) for key, totals in daily.items()])
+    _upsert_errors(conn, errors)
+
+
+def remove_partition(conn, table: str, first_date: str, last_date: str) -> None:
+    """
+    从汇总表中扣除即将删除的整个分区（应在删除分区的同一事务中调用）
+
+    分区按本地月份划分，stats_daily 中该月份的行可以整体删除；
+    错误指纹只需扫描分区中的错误记录。
+    """
+    conn.execute('DELETE FROM stats_daily WHERE date >= ? AND date <= ?', (first_date, last_date))
+
+    _, errors = aggregate(dict(row) for row in conn.execute(f'''
+        SELECT ts_ms, voice, status, text_length, duration, audio_size, error_message
+        FROM {table}
+        WHERE status = 'error' AND error_message IS NOT NULL
+    '''))
+    conn.executemany('UPDATE error_fingerprints SET count = count - ? WHERE fingerprint = ?',
+                     [(entry[2], fingerprint) for fingerprint, entry in errors.items()])
+    conn.execute('DELETE FROM error_fingerprints WHERE count <= 0')
+
+
+def rebuild(conn, batch_size: int = 10000) -> None:
+    """根据 generation_logs 重新计算全部汇总表"""
+    conn.execute('DELETE FROM stats_daily')
+    conn.execute('DELETE FROM error_fingerprints')
+
+    # 按天汇总直接在SQL中完成
+    conn.execute('''
+        INSERT INTO stats_daily (date, voice, status, count, chars, duration_sum, duration_count, audio_size_sum,
+                                 audio_duration_sum, rtf_duration_sum)
+        SELECT DATE(ts_ms / 1000, 'unixepoch', 'localtime'), voice, COALESCE(status, 'success'),
+               COUNT(*), COALESCE(SUM(text_length), 0), COALESCE(SUM(duration), 0),
+               COUNT(duration), COALESCE(SUM(audio_size), 0),
+               COALESCE(SUM(CASE WHEN audio_duration > 0 AND duration IS NOT NULL THEN audio_duration END), 0),
+               COALESCE(SUM(CASE WHEN audio_duration > 0 THEN duration END), 0)
+        FROM generation_logs
+        GROUP BY 1, 2, 3
+    ''')
+
+    # 错误指纹需要在Python中归一化，只扫描错误记录
+    cursor = conn.execute('''
+        SELECT ts_ms, voice, status, text_length, duration, audio_size, error_message
+        FROM generation_logs
+        WHERE status = 'error' AND error_message IS NOT NULL
+    ''')
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        _, errors = aggregate(dict(row) for row in rows)
+        _upsert_errors(conn, errors)
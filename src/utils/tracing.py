@@ -0,0 +1,240 @@
+"""请求追踪模块"""
+
+import re
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+
+# 单个请求最多记录的span数量，防止超长文本撑爆内存
+MAX_SPANS_PER_TRACE = 10000
+
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# 当前线程（上下文）中正在进行的span
+_current_span: contextvars.ContextVar = contextvars.ContextVar('voiceforge_current_span', default=None)
+
+# 进行中的追踪，按请求ID索引
+_active_traces: Dict[str, 'Trace'] = {}
+_active_lock = threading.Lock()
+
+
+def new_request_id() -> str:
+    """生成请求ID"""
+    return uuid.uuid4().hex
+
+
+def normalize_request_id(value: Optional[str]) -> str:
+    """校验客户端传入的请求ID，不合法时生成新的ID"""
+    if value and _REQUEST_ID_PATTERN.match(value):
+        return value
+    return new_request_id()
+
+
+class Span:
+    """追踪片段"""
+
+    __slots__ = ('span_id', 'parent_id', 'name', 'start', 'end', 'thread', 'attributes')
+
+    def __init__(self, span_id: int, name: str, parent_id: Optional[int] = None,
+                 start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start if start is not None else time.time()
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attributes = attributes or {}
+
+    @property
+    def duration(self) -> Optional[float]:
+        """片段耗时（秒）"""
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def finish(self, end: Optional[float] = None, **attributes) -> None:
+        """结束片段"""
+        if attributes:
+            self.attributes.update(attributes)
+        if self.end is None:
+            self.end = end if end is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "thread": self.thread,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """
+    单个请求的追踪记录
+
+    请求ID总是由服务端生成，作为追踪、队列任务和日志的关联键；
+    客户端传入的ID（X-Request-Id）可能重复，只作为根片段的 client_request_id 属性记录。
+    """
+
+    def __init__(self, name: str = 'request', client_request_id: Optional[str] = None, **attributes):
+        self.request_id = new_request_id()
+        self.client_request_id = (
+            client_request_id if client_request_id and _REQUEST_ID_PATTERN.match(client_request_id) else None
+        )
+        if self.client_request_id:
+            attributes['client_request_id'] = self.client_request_id
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.finished = False
+        self.profiler = None  # 按需性能分析器（RequestProfiler）
+        self._ids = 0
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, parent=None, **attributes)
+
+        with _active_lock:
+            _active_traces[self.request_id] = self
+
+    def start_span(self, name: str, parent: Optional[Span] = None, start: Optional[float] = None,
+                   **attributes) -> Span:
+        """开始一个新片段，未指定父片段时挂在当前上下文的片段下"""
+        if parent is None:
+            current = _current_span.get()
+            if current is not None and current[0] is self:
+                parent = current[1]
+            elif self.spans:
+                parent = self.root
+
+        with self._lock:
+            self._ids += 1
+            span = Span(self._ids, name, parent.span_id if parent else None, start, attributes)
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+        return span
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes):
+        """在上下文中记录一个片段，嵌套的片段会自动成为其子片段"""
+        span = self.start_span(name, parent=parent, **attributes)
+        token = _current_span.set((self, span))
+        try:
+            yield span
+        except Exception as e:
+            span.attributes['error'] = str(e)[:200]
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+    @contextmanager
+    def activate(self, span: Span):
+        """将已有片段设为当前上下文的父片段（用于跨线程延续追踪）"""
+        token = _current_span.set((self, span))
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @property
+    def duration(self) -> float:
+        """请求总耗时（秒）"""
+        end = self.root.end or time.time()
+        return end - self.root.start
+
+    def finish(self) -> None:
+        """结束追踪"""
+        if self.finished:
+            return
+        self.finished = True
+        self.root.finish()
+        with _active_lock:
+            if _active_traces.get(self.request_id) is self:
+                del _active_traces[self.request_id]
+
+    def format_tree(self) -> str:
+        """以缩进树的形式输出所有片段"""
+        with self._lock:
+            spans = list(self.spans)
+
+        children: Dict[Optional[int], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        origin = self.root.start
+        lines = []
+
+        def walk(parent_id: Optional[int], depth: int) -> None:
+            for span in sorted(children.get(parent_id, []), key=lambda s: s.start):
+                duration = f"{span.duration:.3f}s" if span.duration is not None else "未结束"
+                attributes = ' '.join(f"{key}={value}" for key, value in span.attributes.items())
+                lines.append(f"{'  ' * depth}{span.name} +{span.start - origin:.3f}s {duration} "
+                             f"[{span.thread}] {attributes}".rstrip())
+                walk(span.span_id, depth + 1)
+
+        walk(None, 0)
+        if self.dropped_spans:
+            lines.append(f"（另有 {self.dropped_spans} 个片段因超出上限未记录）")
+        return '\n'.join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "request_id": self.request_id,
+            "duration": self.duration,
+            "dropped_spans": self.dropped_spans,
+            "spans": spans,
+        }
+
+
+def get_trace(request_id: Optional[str]) -> Optional[Trace]:
+    """根据请求ID获取进行中的追踪"""
+    if not request_id:
+        return None
+    return _active_traces.get(request_id)
+
+
+def current_span() -> Optional[Span]:
+    """当前上下文中的片段"""
+    current = _current_span.get()
+    return current[1] if current else None
+
+
+@contextmanager
+def trace_span(request_id: Optional[str], name: str, **attributes):
+    """在请求ID对应的追踪中记录片段；没有追踪时不做任何事"""
+    trace = get_trace(request_id)
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as span:
+        yield span
+
+
+def finish_trace(trace: Optional[Trace], threshold: Optional[float] = None) -> None:
+    """结束追踪，超过阈值时把完整的片段树写入慢请求日志"""
+    if trace is None or trace.finished:
+        return
+    trace.finish()
+
+    if trace.profiler is not None:
+        trace.profiler.stop()
+        trace.profiler.dump()
+
+    if threshold and trace.duration >= threshold:
+        logging.getLogger('voiceforge.slow_requests').warning(
+            f"慢请求 | ID: {trace.request_id} | 耗时: {trace.duration:.2f}s | 阈值: {threshold}s\n"
+            f"{trace.format_tree()}"
+        )
@@ -4,7 +4,8 @@ import re
 from typing import List, Optional, Dict, Any
 from urllib.parse import urlparse
 
-from ..config.constants import SUPPORTED_FORMATS, SUPPORTED_MODELS, VOICES, ALLOWED_FILE_TYPES
+from ..config.constants import SUPPORTED_FORMATS, SUPPORTED_MODELS, ALLOWED_FILE_TYPES
+from ..models.voice_catalog import get_voice_catalog
 
 
 class TTSValidator:
@@ -28,7 +29,7 @@ class TTSValidator:
         if not voice:
             return {"valid": False, "error": "语音参数不能为空"}
         
-        if voice not in VOICES:
+        if voice not in get_voice_catalog().valid_names:
             return {"valid": False, "error": f"不支持的语音: {voice}"}
         
         return {"valid": True, "voice": voice}
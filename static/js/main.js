@@ -356,30 +356,15 @@ class VoiceForgeApp {
             
             this.notificationManager.show('正在生成语音预览...', 'info');
             
-            const result = await this.ttsClient.previewVoice(voice);
+            const audioBlob = await this.ttsClient.previewVoiceAudio(voice);
+            const audioUrl = URL.createObjectURL(audioBlob);
             
-            if (result.success) {
-                if (result.audio) {
-                    // 如果返回了base64音频数据
-                    const audioData = atob(result.audio);
-                    const audioArray = new Uint8Array(audioData.length);
-                    for (let i = 0; i < audioData.length; i++) {
-                        audioArray[i] = audioData.charCodeAt(i);
-                    }
-                    const audioBlob = new Blob([audioArray], { type: `audio/${result.format}` });
-                    const audioUrl = URL.createObjectURL(audioBlob);
-                    
-                    // 播放预览音频
-                    const audio = new Audio(audioUrl);
-                    audio.play();
-                    
-                    this.notificationManager.show(`语音预览: "${result.text}"`, 'success');
-                } else {
-                    this.notificationManager.show(result.message || '预览功能暂不可用', 'info');
-                }
-            } else {
-                this.notificationManager.show('预览失败: ' + result.error, 'error');
-            }
+            // 播放预览音频
+            const audio = new Audio(audioUrl);
+            audio.addEventListener('ended', () => URL.revokeObjectURL(audioUrl));
+            audio.play();
+            
+            this.notificationManager.show(`语音预览: ${voice}`, 'success');
         } catch (error) {
             this.notificationManager.show('语音预览失败: ' + error.message, 'error');
         }
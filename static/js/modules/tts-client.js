@@ -91,6 +91,26 @@ export class TTSClient {
         }
     }
     
+    async previewVoiceAudio(voice) {
+        // 默认文本预览直接获取二进制音频（服务端持久缓存，浏览器按缓存头复用）
+        try {
+            const response = await fetch(`${this.baseUrl}/preview/${encodeURIComponent(voice)}.mp3`, {
+                headers: {
+                    'Authorization': `Bearer ${this.getApiKey()}`
+                }
+            });
+            
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.error || `HTTP ${response.status}`);
+            }
+            
+            return await response.blob();
+        } catch (error) {
+            throw new Error(`语音预览失败: ${error.message}`);
+        }
+    }
+    
     async generateSpeech(requestData) {
         try {
             const response = await fetch(`${this.baseUrl}/generate`, {